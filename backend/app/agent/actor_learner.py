@@ -0,0 +1,459 @@
+"""
+Actor-learner PPO training.
+
+`PPOAgent.train` alternates between collecting a rollout and optimizing on
+it, so the CPU is either stepping environments or running backprop. Here
+actor processes keep stepping LandingEnv with their latest copy of the
+policy while the learner optimizes on segments they have already written:
+
+- Policy parameters live in a shared-memory vector stamped with a version.
+  Actors copy it at the start of each segment when the version has moved.
+- Rollout segments of `segment_steps` steps go into a shared-memory ring of
+  slots. Only slot indices travel over queues (free -> actor -> full ->
+  learner -> free), and the learner copies a segment out and frees its slot
+  immediately, so actors never wait for an update to finish.
+- Segments record the policy version that produced them. Policy lag is the
+  number of updates made since then. PPO's clipped importance ratio
+  corrects for small lags; segments older than `max_policy_lag` are
+  dropped.
+
+Everything runs on the CPU with one torch thread per process, and the
+result is a regular SB3 PPO zip that `PPOAgent.load` reads:
+
+    python -m app.agent.actor_learner --actors 3 --total-timesteps 200000
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.agent.ppo_agent import TRAIN_BANK_SIZE, TRAIN_EARLY_TERMINATION, PPOAgent
+from app.logging_config import configure_logging
+from app.rl_env.landing_env import LandingEnv
+from app.rl_env.scenarios import ResetBank, get_scenario
+
+logger = logging.getLogger("app.agent.actor_learner")
+
+# Per-slot metadata columns
+META_VERSION, META_ACTOR, META_EPISODES, META_RETURN_SUM, META_SUCCESSES, META_WAIT_SECONDS = range(6)
+META_SIZE = 6
+
+
+class RolloutRing:
+    """Fixed slots of rollout segments in one shared-memory block"""
+    
+    def __init__(self, shm: SharedMemory, slots: int, segment_steps: int, obs_dim: int, action_dim: int):
+        self.shm = shm
+        self.slots = slots
+        self.segment_steps = segment_steps
+        self.obs_dim = obs_dim
+        self.action_dim = action_dim
+        self.arrays: Dict[str, np.ndarray] = {}
+        offset = 0
+        for name, shape, dtype in self.layout(slots, segment_steps, obs_dim, action_dim):
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            self.arrays[name] = array
+            offset += array.nbytes
+    
+    @staticmethod
+    def layout(slots: int, steps: int, obs_dim: int, action_dim: int):
+        return [
+            ("obs", (slots, steps, obs_dim), np.float32),
+            ("actions", (slots, steps, action_dim), np.float32),
+            ("log_probs", (slots, steps), np.float32),
+            ("values", (slots, steps), np.float32),
+            ("rewards", (slots, steps), np.float32),
+            # 1.0 where the episode ended after that step
+            ("dones", (slots, steps), np.float32),
+            # Value of the observation following the segment, for bootstrapping
+            ("last_values", (slots,), np.float32),
+            ("meta", (slots, META_SIZE), np.float64),
+        ]
+    
+    @classmethod
+    def nbytes(cls, slots: int, steps: int, obs_dim: int, action_dim: int) -> int:
+        return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in cls.layout(slots, steps, obs_dim, action_dim))
+    
+    @classmethod
+    def create(cls, slots: int, steps: int, obs_dim: int, action_dim: int) -> "RolloutRing":
+        shm = SharedMemory(create=True, size=cls.nbytes(slots, steps, obs_dim, action_dim))
+        return cls(shm, slots, steps, obs_dim, action_dim)
+    
+    @classmethod
+    def attach(cls, name: str, slots: int, steps: int, obs_dim: int, action_dim: int) -> "RolloutRing":
+        return cls(SharedMemory(name=name), slots, steps, obs_dim, action_dim)
+    
+    def copy_slot(self, slot: int) -> Dict[str, np.ndarray]:
+        return {name: array[slot].copy() for name, array in self.arrays.items()}
+
+
+class SharedParameters:
+    """Flat float32 policy parameter vector with a version counter, in shared memory"""
+    
+    def __init__(self, shm: SharedMemory, size: int, lock):
+        self.shm = shm
+        self.lock = lock
+        self.version = np.ndarray((1,), dtype=np.int64, buffer=shm.buf, offset=0)
+        self.vector = np.ndarray((size,), dtype=np.float32, buffer=shm.buf, offset=8)
+    
+    @classmethod
+    def create(cls, size: int, lock) -> "SharedParameters":
+        return cls(SharedMemory(create=True, size=8 + size * 4), size, lock)
+    
+    @classmethod
+    def attach(cls, name: str, size: int, lock) -> "SharedParameters":
+        return cls(SharedMemory(name=name), size, lock)
+    
+    def publish(self, vector: np.ndarray) -> int:
+        with self.lock:
+            self.vector[:] = vector
+            self.version[0] += 1
+            return int(self.version[0])
+    
+    def read_if_newer(self, version: int) -> Optional[tuple]:
+        """(version, copy of the vector), or None when `version` is current"""
+        with self.lock:
+            current = int(self.version[0])
+            if current == version:
+                return None
+            return current, self.vector.copy()
+
+
+def build_policy(env: LandingEnv, device: str = "cpu"):
+    """Policy with the same architecture as PPOAgent's models"""
+    from stable_baselines3.common.policies import ActorCriticPolicy
+    
+    return ActorCriticPolicy(env.observation_space, env.action_space, lr_schedule=lambda _: 0.0).to(device)
+
+
+def parameters_to_numpy(policy) -> np.ndarray:
+    import torch
+    
+    return torch.nn.utils.parameters_to_vector(policy.parameters()).detach().cpu().numpy().astype(np.float32)
+
+
+def run_actor(actor_id: int, ring_name: str, params_name: str, params_size: int, lock, free_slots, full_slots, stop, slots: int, segment_steps: int, seed: int, scenario: str):
+    """Actor process: step LandingEnv with the latest policy and fill ring slots"""
+    import torch
+    
+    torch.set_num_threads(1)
+    # Episodes start from a bank of initial states drawn from the actor's seed
+    bank = ResetBank(scenario, TRAIN_BANK_SIZE, seed)
+    env = LandingEnv(record_trajectory=False, early_termination=TRAIN_EARLY_TERMINATION, reset_bank=bank)
+    ring = RolloutRing.attach(ring_name, slots, segment_steps, env.observation_space.shape[0], env.action_space.shape[0])
+    params = SharedParameters.attach(params_name, params_size, lock)
+    policy = build_policy(env)
+    policy.set_training_mode(False)
+    low, high = env.action_space.low, env.action_space.high
+    
+    version = -1
+    obs, _ = env.reset()
+    episode_return = 0.0
+    try:
+        while not stop.is_set():
+            waited = time.perf_counter()
+            try:
+                slot = free_slots.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            waited = time.perf_counter() - waited
+            
+            latest = params.read_if_newer(version)
+            if latest is not None:
+                version, vector = latest
+                torch.nn.utils.vector_to_parameters(torch.from_numpy(vector), policy.parameters())
+            
+            arrays = {name: array[slot] for name, array in ring.arrays.items()}
+            episodes, return_sum, successes = 0, 0.0, 0
+            for t in range(segment_steps):
+                with torch.no_grad():
+                    action, value, log_prob = policy(torch.as_tensor(obs).unsqueeze(0))
+                action = action.numpy()[0]
+                next_obs, reward, terminated, truncated, info = env.step(np.clip(action, low, high))
+                done = terminated or truncated
+                
+                arrays["obs"][t] = obs
+                arrays["actions"][t] = action
+                arrays["log_probs"][t] = log_prob.item()
+                arrays["values"][t] = value.item()
+                arrays["rewards"][t] = reward
+                arrays["dones"][t] = done
+                
+                episode_return += reward
+                if done:
+                    episodes += 1
+                    return_sum += episode_return
+                    successes += bool(info.get("success"))
+                    episode_return = 0.0
+                    next_obs, _ = env.reset()
+                obs = next_obs
+            
+            with torch.no_grad():
+                ring.arrays["last_values"][slot] = policy.predict_values(torch.as_tensor(obs).unsqueeze(0)).item()
+            arrays["meta"][:] = (version, actor_id, episodes, return_sum, successes, waited)
+            full_slots.put(slot)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.shm.close()
+        params.shm.close()
+
+
+def compute_advantages(segment: Dict[str, np.ndarray], gamma: float, gae_lambda: float):
+    """GAE advantages and returns for one segment, bootstrapped from its last value"""
+    rewards, values, dones = segment["rewards"], segment["values"], segment["dones"]
+    advantages = np.zeros_like(rewards)
+    last_advantage = 0.0
+    for t in reversed(range(len(rewards))):
+        next_value = segment["last_values"] if t == len(rewards) - 1 else values[t + 1]
+        not_done = 1.0 - dones[t]
+        delta = rewards[t] + gamma * next_value * not_done - values[t]
+        last_advantage = delta + gamma * gae_lambda * not_done * last_advantage
+        advantages[t] = last_advantage
+    return advantages, advantages + values
+
+
+class Learner:
+    """PPO updates on segments from the ring, using an SB3 model's policy and optimizer"""
+    
+    def __init__(self, model):
+        import torch
+        
+        self.torch = torch
+        self.model = model
+        self.policy = model.policy
+        self.clip_range = model.clip_range(1.0)
+    
+    def update(self, segments: List[Dict[str, np.ndarray]]) -> Dict[str, float]:
+        torch, model, policy = self.torch, self.model, self.policy
+        advantages, returns = zip(*(compute_advantages(s, model.gamma, model.gae_lambda) for s in segments))
+        obs = torch.as_tensor(np.concatenate([s["obs"] for s in segments]))
+        actions = torch.as_tensor(np.concatenate([s["actions"] for s in segments]))
+        old_log_probs = torch.as_tensor(np.concatenate([s["log_probs"] for s in segments]))
+        advantages = torch.as_tensor(np.concatenate(advantages))
+        returns = torch.as_tensor(np.concatenate(returns))
+        
+        policy.set_training_mode(True)
+        losses = []
+        clipped = []
+        for _ in range(model.n_epochs):
+            for batch in torch.randperm(len(obs)).split(model.batch_size):
+                values, log_prob, entropy = policy.evaluate_actions(obs[batch], actions[batch])
+                batch_advantages = advantages[batch]
+                if len(batch) > 1:
+                    batch_advantages = (batch_advantages - batch_advantages.mean()) / (batch_advantages.std() + 1e-8)
+                
+                # Importance ratio against the (possibly stale) policy that acted
+                ratio = torch.exp(log_prob - old_log_probs[batch])
+                policy_loss = -torch.min(
+                    batch_advantages * ratio,
+                    batch_advantages * torch.clamp(ratio, 1 - self.clip_range, 1 + self.clip_range),
+                ).mean()
+                value_loss = torch.nn.functional.mse_loss(returns[batch], values.flatten())
+                entropy_loss = -torch.mean(entropy) if entropy is not None else -torch.mean(-log_prob)
+                loss = policy_loss + model.ent_coef * entropy_loss + model.vf_coef * value_loss
+                
+                policy.optimizer.zero_grad()
+                loss.backward()
+                torch.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+                policy.optimizer.step()
+                losses.append(loss.item())
+                clipped.append(torch.mean((torch.abs(ratio - 1) > self.clip_range).float()).item())
+        
+        policy.set_training_mode(False)
+        model._n_updates += model.n_epochs
+        model.num_timesteps += len(obs)
+        return {"loss": float(np.mean(losses)), "clip_fraction": float(np.mean(clipped))}
+
+
+def train(
+    total_timesteps: int = 100_000,
+    actors: Optional[int] = None,
+    segment_steps: int = 256,
+    segments_per_update: Optional[int] = None,
+    slots: Optional[int] = None,
+    max_policy_lag: int = 4,
+    model_path: Optional[str] = None,
+    seed: int = 0,
+    log_every: int = 10,
+    scenario: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Train a PPO model with `actors` actor processes and save it to `model_path`.
+    
+    Returns a summary of throughput and policy lag.
+    """
+    if total_timesteps <= 0:
+        raise ValueError(f"total_timesteps must be positive, got {total_timesteps}")
+    
+    import torch
+    
+    torch.set_num_threads(1)
+    scenario = get_scenario(scenario).name
+    actors = actors or max(1, (os.cpu_count() or 1) - 1)
+    segments_per_update = segments_per_update or max(1, 2048 // segment_steps)
+    # Enough slots for every actor to keep writing while a full update's worth waits
+    slots = slots or segments_per_update + 2 * actors
+    
+    agent = PPOAgent(model_path)
+    env = LandingEnv(record_trajectory=False, scenario=scenario)
+    model = agent.create_model(env, verbose=0, device="cpu")
+    model.set_random_seed(seed)
+    learner = Learner(model)
+    
+    ctx = mp.get_context("spawn")
+    lock = ctx.Lock()
+    vector = parameters_to_numpy(model.policy)
+    ring = RolloutRing.create(slots, segment_steps, env.observation_space.shape[0], env.action_space.shape[0])
+    params = SharedParameters.create(vector.size, lock)
+    version = params.publish(vector)
+    free_slots, full_slots, stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+    for slot in range(slots):
+        free_slots.put(slot)
+    
+    processes = [
+        ctx.Process(
+            target=run_actor,
+            args=(i, ring.shm.name, params.shm.name, vector.size, lock, free_slots, full_slots, stop, slots, segment_steps, seed + 1 + i, scenario),
+            daemon=True,
+        )
+        for i in range(actors)
+    ]
+    
+    consumed = dropped = episodes = successes = updates = 0
+    lag_sum = lag_count = lag_max = 0
+    return_sum = learn_seconds = actor_wait_seconds = 0.0
+    started = time.perf_counter()
+    # Set when the first segment arrives, so throughput excludes actor start-up (importing torch)
+    first_segment: Optional[float] = None
+    try:
+        for process in processes:
+            process.start()
+        logger.info("Started %d actors, %d ring slots of %d steps (%.1f MB)", actors, slots, segment_steps, ring.shm.size / 1e6)
+        
+        while consumed < total_timesteps:
+            batch = []
+            while len(batch) < segments_per_update:
+                try:
+                    slot = full_slots.get(timeout=1.0)
+                except queue.Empty:
+                    dead = [p for p in processes if not p.is_alive()]
+                    if dead:
+                        raise RuntimeError(f"Actor process exited with code {dead[0].exitcode}")
+                    continue
+                segment = ring.copy_slot(slot)
+                free_slots.put(slot)
+                if first_segment is None:
+                    first_segment = time.perf_counter()
+                
+                meta = segment["meta"]
+                lag = version - int(meta[META_VERSION])
+                episodes += int(meta[META_EPISODES])
+                return_sum += meta[META_RETURN_SUM]
+                successes += int(meta[META_SUCCESSES])
+                actor_wait_seconds += meta[META_WAIT_SECONDS]
+                if lag > max_policy_lag:
+                    dropped += 1
+                    continue
+                lag_sum += lag
+                lag_count += 1
+                lag_max = max(lag_max, lag)
+                batch.append(segment)
+            
+            update_started = time.perf_counter()
+            stats = learner.update(batch)
+            version = params.publish(parameters_to_numpy(model.policy))
+            learn_seconds += time.perf_counter() - update_started
+            consumed += len(batch) * segment_steps
+            updates += 1
+            
+            if updates % log_every == 0 or consumed >= total_timesteps:
+                elapsed = time.perf_counter() - first_segment
+                logger.info(
+                    "steps %d  %.0f steps/s  loss %.3f  lag mean %.2f max %d  dropped %d  episodes %d  mean return %.1f",
+                    consumed, consumed / elapsed, stats["loss"], lag_sum / lag_count, lag_max, dropped,
+                    episodes, return_sum / episodes if episodes else float("nan"),
+                )
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for shared in (ring.shm, params.shm):
+            shared.close()
+            shared.unlink()
+    
+    agent.model = model
+    agent.save()
+    elapsed = time.perf_counter() - first_segment
+    return {
+        "scenario": scenario,
+        # Actor i's reset bank is drawn from seed + 1 + i
+        "bank_seeds": [seed + 1 + i for i in range(actors)],
+        "actors": actors,
+        "timesteps": consumed,
+        "updates": updates,
+        "startup_seconds": first_segment - started,
+        "seconds": elapsed,
+        "steps_per_sec": consumed / elapsed,
+        # Fraction of wall time the learner spent optimizing rather than waiting for segments
+        "learner_busy": learn_seconds / elapsed,
+        "actor_wait_seconds": actor_wait_seconds,
+        "policy_lag_mean": lag_sum / lag_count if lag_count else 0.0,
+        "policy_lag_max": lag_max,
+        "segments_dropped": dropped,
+        "episodes": episodes,
+        "success_rate": successes / episodes if episodes else 0.0,
+        "mean_return": return_sum / episodes if episodes else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a PPO agent with parallel actor processes")
+    parser.add_argument("--total-timesteps", type=int, default=100_000)
+    parser.add_argument("--actors", type=int, default=None, help="Actor processes (default: CPUs - 1, at least 1)")
+    parser.add_argument("--segment-steps", type=int, default=256, help="Steps per rollout segment")
+    parser.add_argument("--segments-per-update", type=int, default=None, help="Segments per PPO update (default: 2048 steps' worth)")
+    parser.add_argument("--slots", type=int, default=None, help="Ring buffer slots")
+    parser.add_argument("--max-policy-lag", type=int, default=4, help="Drop segments more than this many updates old")
+    parser.add_argument("--model-path", default=None, help="Where to save the model (default: PPOAgent's)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", default=None, help="Scenario to train on (default: default)")
+    parser.add_argument("--json", default=None, help="Also write the summary to this file")
+    args = parser.parse_args()
+    if args.total_timesteps <= 0:
+        parser.error("--total-timesteps must be positive")
+    
+    configure_logging()
+    summary = train(
+        total_timesteps=args.total_timesteps,
+        actors=args.actors,
+        segment_steps=args.segment_steps,
+        segments_per_update=args.segments_per_update,
+        slots=args.slots,
+        max_policy_lag=args.max_policy_lag,
+        model_path=args.model_path,
+        seed=args.seed,
+        scenario=args.scenario,
+    )
+    print(json.dumps(summary, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Periodic, non-blocking training checkpoints that training can resume from exactly.
+
+`AsyncCheckpointCallback` snapshots a PPO run every CHECKPOINT_EVERY_STEPS
+environment steps, at the start of a rollout (after the previous update,
+before any new environment step):
+
+- policy weights and optimizer state, copied tensor by tensor;
+- the pickled vectorized environment, so the physics state of unfinished
+  episodes, the environments' RNGs and any VecNormalize statistics carry
+  over;
+- the last observations, episode counters and statistics buffers;
+- the torch, NumPy and Python global RNG states (action sampling and
+  minibatch shuffling draw from them).
+
+Copying the tensors takes milliseconds. Serializing and writing happen on a
+`CheckpointWriter` thread while the learner keeps collecting. The writer
+writes to a temporary file, fsyncs it, renames it into place and keeps the
+newest CHECKPOINT_KEEP checkpoints. If the previous snapshot is still being
+written when the next one is due, the writer keeps only the newest one.
+
+`restore_checkpoint` rebuilds the model and environment from a checkpoint.
+`model.learn(remaining, reset_num_timesteps=False)` then continues as the
+interrupted run would have.
+"""
+
+import copy
+import glob
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+import numpy as np
+import torch
+from stable_baselines3.common.callbacks import BaseCallback
+
+if TYPE_CHECKING:
+    from stable_baselines3 import PPO
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "models/checkpoints")
+# Environment steps between checkpoints (rounded up to whole rollouts)
+CHECKPOINT_EVERY_STEPS = int(os.getenv("CHECKPOINT_EVERY_STEPS", "20480"))
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "3"))
+
+FORMAT_VERSION = 1
+_PATTERN = "checkpoint_*.pt"
+
+
+def checkpoint_path(directory: str, timesteps: int) -> str:
+    # Zero-padded so names sort by timestep
+    return os.path.join(directory, f"checkpoint_{timesteps:012d}.pt")
+
+
+def list_checkpoints(directory: str) -> list:
+    """Checkpoint files in `directory`, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, _PATTERN)))
+
+
+def latest_checkpoint(directory: str) -> Optional[str]:
+    checkpoints = list_checkpoints(directory)
+    return checkpoints[-1] if checkpoints else None
+
+
+def snapshot(model: "PPO", run: dict) -> dict:
+    """Copy everything a resumed run needs; `run` records how training was started"""
+    vec_normalize = model._vec_normalize_env
+    return {
+        "version": FORMAT_VERSION,
+        "run": run,
+        "num_timesteps": model.num_timesteps,
+        "n_updates": model._n_updates,
+        "episode_num": model._episode_num,
+        "policy": {name: tensor.detach().clone() for name, tensor in model.policy.state_dict().items()},
+        "optimizer": copy.deepcopy(model.policy.optimizer.state_dict()),
+        "env": pickle.dumps(model.get_env()),
+        "last_obs": copy.deepcopy(model._last_obs),
+        "last_episode_starts": np.copy(model._last_episode_starts),
+        "last_original_obs": copy.deepcopy(model._last_original_obs) if vec_normalize is not None else None,
+        "ep_info_buffer": list(model.ep_info_buffer or ()),
+        "ep_success_buffer": list(model.ep_success_buffer or ()),
+        "rng": {"torch": torch.get_rng_state(), "numpy": np.random.get_state(), "python": random.getstate()},
+    }
+
+
+def load_checkpoint(path: str) -> dict:
+    # Our own files; they hold pickled environments and NumPy state, not just tensors
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    if state.get("version") != FORMAT_VERSION:
+        raise ValueError(f"{path} has checkpoint format {state.get('version')}, expected {FORMAT_VERSION}")
+    return state
+
+
+def restore_checkpoint(state: dict, create_model: Callable[[object, dict], "PPO"]) -> Tuple["PPO", object]:
+    """
+    (model, vectorized env) of a loaded checkpoint.
+    
+    `create_model(env, hyperparams)` builds a fresh model for the restored
+    environment; its weights, optimizer and counters are then replaced.
+    """
+    env = pickle.loads(state["env"])
+    model = create_model(env, state["run"]["hyperparams"])
+    model.policy.load_state_dict(state["policy"])
+    model.policy.optimizer.load_state_dict(state["optimizer"])
+    model.num_timesteps = state["num_timesteps"]
+    model._n_updates = state["n_updates"]
+    model._episode_num = state["episode_num"]
+    model._last_obs = state["last_obs"]
+    model._last_episode_starts = state["last_episode_starts"]
+    if state["last_original_obs"] is not None:
+        model._last_original_obs = state["last_original_obs"]
+    model.ep_info_buffer = deque(state["ep_info_buffer"], maxlen=model._stats_window_size)
+    model.ep_success_buffer = deque(state["ep_success_buffer"], maxlen=model._stats_window_size)
+    # Last, since building the model drew from the global RNGs
+    torch.set_rng_state(state["rng"]["torch"])
+    np.random.set_state(state["rng"]["numpy"])
+    random.setstate(state["rng"]["python"])
+    return model, env
+
+
+class CheckpointWriter:
+    """Background thread writing snapshots to `directory`, keeping the newest `keep`"""
+    
+    def __init__(self, directory: str, keep: int = CHECKPOINT_KEEP):
+        if keep < 1:
+            # [:-0] would select nothing to delete and silently keep every checkpoint
+            raise ValueError(f"CheckpointWriter must keep at least 1 checkpoint, got {keep}")
+        self.directory = directory
+        self.keep = keep
+        self.written = 0
+        self._pending: Optional[dict] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, state: dict):
+        with self._condition:
+            if self._pending is not None:
+                logger.warning(
+                    "Checkpoint at %d steps still waiting to be written; replacing it with %d",
+                    self._pending["num_timesteps"], state["num_timesteps"],
+                )
+            self._pending = state
+            self._condition.notify_all()
+    
+    def close(self):
+        """Write any pending snapshot, then stop the thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+            try:
+                self._write(state)
+            except Exception:
+                # Training goes on; the next checkpoint may succeed
+                logger.exception("Failed to write checkpoint at %d steps", state["num_timesteps"])
+    
+    def _write(self, state: dict):
+        started = time.perf_counter()
+        path = checkpoint_path(self.directory, state["num_timesteps"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        # Persist the rename itself
+        dir_fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self.written += 1
+        logger.info(
+            "Checkpoint at %d steps written to %s in %.3fs (%.1f KB)",
+            state["num_timesteps"], path, time.perf_counter() - started, os.path.getsize(path) / 1024,
+        )
+        
+        for old in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old)
+
+
+class AsyncCheckpointCallback(BaseCallback):
+    """Submit a snapshot to `writer` every `every` environment steps, at rollout boundaries"""
+    
+    def __init__(self, writer: CheckpointWriter, run: dict, every: int = CHECKPOINT_EVERY_STEPS):
+        super().__init__()
+        self.writer = writer
+        self.run = run
+        self.every = every
+        self._last = 0
+    
+    def _on_training_start(self):
+        # A resumed run starts from the checkpoint it was restored from
+        self._last = self.model.num_timesteps
+    
+    def _on_rollout_start(self):
+        if self.model.num_timesteps - self._last < self.every:
+            return
+        started = time.perf_counter()
+        self.writer.submit(snapshot(self.model, self.run))
+        self._last = self.model.num_timesteps
+        logger.info("Snapshot at %d steps took %.1fms of training time", self._last, (time.perf_counter() - started) * 1000)
+    
+    def _on_step(self) -> bool:
+        return True
@@ -0,0 +1,292 @@
+"""
+Distill a PPO model into a compact actor-only student for serving.
+
+Serving only needs the deterministic action, yet an SB3 PPO model carries
+the critic too and answers every step through torch. The student is a
+small tanh MLP (DISTILL_HIDDEN) trained by supervised regression on the
+teacher's deterministic actions, with DAgger-style data collection:
+
+1. roll out the teacher from `episodes` start states (a ResetBank whose
+   seed is drawn from `seed`, never the evaluation bank's), recording every
+   observation with the teacher's action;
+2. fit the student on everything recorded so far;
+3. roll out again, now acting with the student with probability
+   1 - 0.5**iteration, still labelling each state with the teacher's
+   action, so the student learns the states its own mistakes lead to.
+
+The student is exported as an `.npz` (app/agent/student_policy.py), with
+the input normalization folded into its first layer. Both models are then
+scored on the same evaluation bank (app/agent/evaluation.py), and the
+report gives the success-rate gap with a paired test, action error,
+per-step latency and weight bytes. From the command line:
+
+    python -m app.agent.distill models/ppo_landing.zip --out models/ppo_landing_student.npz
+
+Serve the student with SERVE_MODEL_PATH=models/ppo_landing_student.npz.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.agent.evaluation import EVAL_BANK_SIZE, EVAL_SEED_BASE, compare_reports, evaluate_file, file_hash, print_reports
+from app.agent.student_policy import StudentPolicy
+from app.logging_config import configure_logging
+from app.rl_env.landing_env import ENV_VERSION, LandingEnv
+from app.rl_env.scenarios import ResetBank, get_scenario
+
+logger = logging.getLogger("app.agent.distill")
+
+# Hidden layer widths of the student (the teacher's actor is 64, 64)
+DISTILL_HIDDEN = tuple(int(width) for width in os.getenv("DISTILL_HIDDEN", "32,32").split(","))
+
+# Single-observation predictions timed per model for the latency comparison
+LATENCY_SAMPLES = 2000
+
+
+def collect(
+    teacher,
+    student: Optional[StudentPolicy],
+    bank: ResetBank,
+    student_share: float,
+    rng: np.random.Generator,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (observations, teacher actions) visited in one episode per bank state.
+    
+    All episodes step together with one batched teacher call per step.
+    Each step acts with the student with probability `student_share`.
+    """
+    envs = [LandingEnv(record_trajectory=False, reset_bank=bank) for _ in range(len(bank))]
+    obs = np.stack([env.reset(options={"bank_index": index})[0] for index, env in enumerate(envs)])
+    observations, targets = [], []
+    active = np.arange(len(envs))
+    while len(active):
+        teacher_actions, _ = teacher.predict(obs[active], deterministic=True)
+        observations.append(obs[active].copy())
+        targets.append(teacher_actions)
+        actions = teacher_actions
+        if student is not None and student_share > 0:
+            student_actions, _ = student.predict(obs[active])
+            use_student = rng.random(len(active)) < student_share
+            actions = np.where(use_student[:, None], student_actions, teacher_actions)
+        still_active = []
+        for index, action in zip(active, actions):
+            obs[index], _, terminated, truncated, _ = envs[index].step(action)
+            if not (terminated or truncated):
+                still_active.append(index)
+        active = np.array(still_active, dtype=int)
+    return np.concatenate(observations), np.concatenate(targets).astype(np.float32)
+
+
+class _StudentTrainer:
+    """The torch side of the student: a normalized MLP fitted with Adam on mean squared action error"""
+    
+    def __init__(self, observation_dim: int, action_dim: int, hidden: Sequence[int], learning_rate: float, seed: int):
+        import torch
+        from torch import nn
+        
+        torch.manual_seed(seed)
+        layers: List[nn.Module] = []
+        width = observation_dim
+        for size in hidden:
+            layers += [nn.Linear(width, size), nn.Tanh()]
+            width = size
+        layers.append(nn.Linear(width, action_dim))
+        self.net = nn.Sequential(*layers)
+        self.optimizer = torch.optim.Adam(self.net.parameters(), lr=learning_rate)
+        self.mean = np.zeros(observation_dim, dtype=np.float32)
+        self.std = np.ones(observation_dim, dtype=np.float32)
+    
+    def fit(self, observations: np.ndarray, targets: np.ndarray, epochs: int, batch_size: int, rng: np.random.Generator) -> float:
+        """Train on the whole dataset; returns the last epoch's mean loss"""
+        import torch
+        
+        # Refreshed as the dataset grows; the first layer absorbs the change on export
+        self.mean = observations.mean(axis=0).astype(np.float32)
+        self.std = np.maximum(observations.std(axis=0), 1e-6).astype(np.float32)
+        x = torch.from_numpy((observations - self.mean) / self.std)
+        y = torch.from_numpy(targets)
+        loss_sum = 0.0
+        for _ in range(epochs):
+            order = torch.from_numpy(rng.permutation(len(x)))
+            loss_sum = 0.0
+            for start in range(0, len(x), batch_size):
+                batch = order[start:start + batch_size]
+                loss = torch.nn.functional.mse_loss(self.net(x[batch]), y[batch])
+                self.optimizer.zero_grad()
+                loss.backward()
+                self.optimizer.step()
+                loss_sum += loss.item() * len(batch)
+        return loss_sum / len(x)
+    
+    def export(self, action_low: np.ndarray, action_high: np.ndarray, metadata: dict) -> StudentPolicy:
+        """Plain weight matrices, with (obs - mean) / std folded into the first layer"""
+        from torch import nn
+        
+        linears = [layer for layer in self.net if isinstance(layer, nn.Linear)]
+        # torch stores (out, in); the student multiplies row vectors, so (in, out)
+        weights = [layer.weight.detach().numpy().T.copy() for layer in linears]
+        biases = [layer.bias.detach().numpy().copy() for layer in linears]
+        biases[0] = biases[0] - (self.mean / self.std) @ weights[0]
+        weights[0] = weights[0] / self.std[:, None]
+        return StudentPolicy(weights, biases, action_low, action_high, metadata)
+
+
+def _bank_seed(rng: np.random.Generator) -> int:
+    """A seed for a training bank of start states, never the evaluation bank's"""
+    while True:
+        seed = int(rng.integers(2**31))
+        if seed != EVAL_SEED_BASE:
+            return seed
+
+
+def predict_latency(predict: Callable[[np.ndarray], object], observations: np.ndarray) -> float:
+    """Mean seconds per single-observation call"""
+    started = time.perf_counter()
+    for observation in observations:
+        predict(observation)
+    return (time.perf_counter() - started) / len(observations)
+
+
+def distill(
+    teacher_path: str,
+    out_path: str,
+    hidden: Sequence[int] = DISTILL_HIDDEN,
+    iterations: int = 4,
+    episodes: int = 200,
+    epochs: int = 20,
+    batch_size: int = 256,
+    learning_rate: float = 1e-3,
+    seed: int = 0,
+    scenario: Optional[str] = None,
+    eval_episodes: int = EVAL_BANK_SIZE,
+    workers: Optional[int] = None,
+) -> Dict[str, object]:
+    """Train, export and evaluate a student of the model at `teacher_path`; returns the report"""
+    from stable_baselines3 import PPO
+    
+    teacher = PPO.load(teacher_path, device="cpu")
+    scenario = get_scenario(scenario).name
+    env = LandingEnv(scenario=scenario)
+    rng = np.random.default_rng(seed)
+    trainer = _StudentTrainer(env.observation_space.shape[0], env.action_space.shape[0], hidden, learning_rate, seed)
+    metadata = {
+        "teacher": os.path.basename(teacher_path),
+        "teacher_sha256": file_hash(teacher_path),
+        "env_version": str(ENV_VERSION),
+        "scenario": scenario,
+        "hidden": ",".join(map(str, hidden)),
+    }
+    
+    started = time.perf_counter()
+    observations = np.zeros((0, env.observation_space.shape[0]), dtype=np.float32)
+    targets = np.zeros((0, env.action_space.shape[0]), dtype=np.float32)
+    student = None
+    for iteration in range(iterations):
+        student_share = 1.0 - 0.5 ** iteration
+        # Fresh start states every round, never the evaluation bank's
+        bank = ResetBank(scenario, episodes, _bank_seed(rng))
+        new_observations, new_targets = collect(teacher, student, bank, student_share, rng)
+        observations = np.concatenate([observations, new_observations])
+        targets = np.concatenate([targets, new_targets])
+        loss = trainer.fit(observations, targets, epochs, batch_size, rng)
+        student = trainer.export(env.action_space.low, env.action_space.high, metadata)
+        logger.info(
+            "Iteration %d: %d new states (student acting %.0f%%), %d total, loss %.5f",
+            iteration, len(new_observations), student_share * 100, len(observations), loss,
+        )
+    train_seconds = time.perf_counter() - started
+    
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    student.save(out_path)
+    
+    # Action error and latency on states the teacher visits
+    held_out, held_out_targets = collect(teacher, None, ResetBank(scenario, 50, _bank_seed(rng)), 0.0, rng)
+    action_error = np.abs(student.predict(held_out)[0] - held_out_targets)
+    samples = held_out[rng.choice(len(held_out), min(LATENCY_SAMPLES, len(held_out)), replace=False)]
+    teacher_latency = predict_latency(lambda obs: teacher.predict(obs, deterministic=True), samples)
+    student_latency = predict_latency(student.predict, samples)
+    teacher_bytes = sum(p.numel() * p.element_size() for p in teacher.policy.parameters())
+    
+    reports = [
+        evaluate_file(path, eval_episodes, workers, scenario=scenario)
+        for path in (teacher_path, out_path)
+    ]
+    comparison = compare_reports(*reports)
+    return {
+        "teacher": teacher_path,
+        "student": out_path,
+        "scenario": scenario,
+        "hidden": list(hidden),
+        "dataset_states": len(observations),
+        "train_seconds": train_seconds,
+        "action_mae": action_error.mean(axis=0).tolist(),
+        "action_max_error": action_error.max(axis=0).tolist(),
+        "teacher_success_rate": reports[0]["summary"]["success_rate"],
+        "student_success_rate": reports[1]["summary"]["success_rate"],
+        "success_rate_gap": comparison["success_rate_diff"],
+        "mcnemar_p_value": comparison["mcnemar_p_value"],
+        "teacher_predict_us": teacher_latency * 1e6,
+        "student_predict_us": student_latency * 1e6,
+        "teacher_weight_bytes": teacher_bytes,
+        "student_weight_bytes": student.nbytes,
+        "reports": reports,
+        "comparison": comparison,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill a PPO model into a compact actor-only student")
+    parser.add_argument("teacher", help="PPO model zip to distill")
+    parser.add_argument("--out", default=None, help="Student .npz (default: next to the teacher, <name>_student.npz)")
+    parser.add_argument("--hidden", default=",".join(map(str, DISTILL_HIDDEN)), help="Hidden layer widths, e.g. 32,32")
+    parser.add_argument("--iterations", type=int, default=4, help="Collect-and-fit rounds")
+    parser.add_argument("--episodes", type=int, default=200, help="Episodes collected per round")
+    parser.add_argument("--epochs", type=int, default=20, help="Passes over the dataset per round")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenario", default=None, help="Scenario to distill and evaluate on (default: default)")
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_BANK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="Evaluation processes (default: one per CPU)")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+    
+    configure_logging()
+    out_path = args.out or os.path.splitext(args.teacher)[0] + "_student.npz"
+    report = distill(
+        args.teacher,
+        out_path,
+        hidden=[int(width) for width in args.hidden.split(",")],
+        iterations=args.iterations,
+        episodes=args.episodes,
+        epochs=args.epochs,
+        seed=args.seed,
+        scenario=args.scenario,
+        eval_episodes=args.eval_episodes,
+        workers=args.workers,
+    )
+    print_reports(report["reports"], report["comparison"])
+    print(f"Student saved to {out_path}")
+    print(
+        f"Success rate: teacher {report['teacher_success_rate']:.1%}, student {report['student_success_rate']:.1%} "
+        f"(gap {report['success_rate_gap']:+.1%}, McNemar p={report['mcnemar_p_value']:.3f})"
+    )
+    print(f"Action MAE (thrust, angle): {report['action_mae'][0]:.4f}, {report['action_mae'][1]:.4f}")
+    print(f"Predict per step: teacher {report['teacher_predict_us']:.1f} us, student {report['student_predict_us']:.1f} us")
+    print(f"Weights: teacher {report['teacher_weight_bytes']} bytes (actor and critic), student {report['student_weight_bytes']} bytes")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({k: v for k, v in report.items() if k != "reports"}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
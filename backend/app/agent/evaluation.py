@@ -0,0 +1,364 @@
+"""
+Policy evaluation on a fixed, seeded set of LandingEnv episodes.
+
+Every policy is scored on the same initial states, so results are directly
+comparable across training runs. The bank is a ResetBank of EVAL_BANK_SIZE
+initial states of the chosen scenario, drawn from seed EVAL_SEED_BASE, and
+episodes are identified by their index in it. Hyperparameter sweeps use
+its first few (EVAL_QUICK_EPISODES).
+
+`evaluate_file` scores a saved model on the bank with a process pool. Each
+process steps a batch of environments in lockstep and queries the policy
+once per step for the whole batch. The report gives:
+- success rate with a Wilson confidence interval
+- fuel and landing accuracy distributions
+- counts per termination reason
+
+Reports are cached by model file hash, environment version, scenario and
+bank, so re-evaluating an unchanged model is instant. `compare_reports`
+pairs two reports episode by episode. From the command line:
+
+    python -m app.agent.evaluation models/ppo_landing.zip --compare models/candidate.zip
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.agent.student_policy import is_student_artifact, load_student
+from app.rl_env.landing_env import ENV_VERSION, LandingEnv
+from app.rl_env.scenarios import ResetBank, get_scenario
+
+logger = logging.getLogger("app.agent.evaluation")
+
+# Seed the bank's initial states are drawn from
+EVAL_SEED_BASE = int(os.getenv("EVAL_SEED_BASE", "10000"))
+EVAL_BANK_SIZE = int(os.getenv("EVAL_BANK_SIZE", "2000"))
+EVAL_CACHE_DIR = os.getenv("EVAL_CACHE_DIR", "models/eval_cache")
+# Environments stepped together per batched policy call
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "64"))
+
+# The first bank episodes are the quick evaluation used during sweeps
+EVAL_QUICK_EPISODES = 20
+
+TERMINATION_REASONS = ("landed", "crash", "out_of_bounds", "fuel_depleted")
+# z for a 95% two-sided interval
+Z_95 = 1.959963984540054
+
+
+@lru_cache(maxsize=None)
+def eval_bank(scenario: Optional[str] = None) -> ResetBank:
+    """The evaluation bank of a scenario (built once per process)"""
+    return ResetBank(scenario, EVAL_BANK_SIZE, EVAL_SEED_BASE)
+
+
+def evaluate_policy(
+    predict: Callable[[np.ndarray], np.ndarray],
+    indices: Sequence[int] = range(EVAL_QUICK_EPISODES),
+    scenario: Optional[str] = None,
+) -> Dict[str, float]:
+    """Run one episode per bank index with `predict(observation) -> action` and summarize"""
+    env = LandingEnv(record_trajectory=False, reset_bank=eval_bank(scenario))
+    returns, lengths, fuel_used, successes = [], [], [], 0
+    for index in indices:
+        obs, _ = env.reset(options={"bank_index": index})
+        total, steps = 0.0, 0
+        while True:
+            obs, reward, terminated, truncated, info = env.step(predict(obs))
+            total += reward
+            steps += 1
+            if terminated or truncated:
+                break
+        successes += bool(info["success"])
+        returns.append(total)
+        lengths.append(steps)
+        fuel_used.append(info["fuel_used"])
+    return {
+        "episodes": len(indices),
+        "success_rate": successes / len(indices),
+        "mean_return": float(np.mean(returns)),
+        "mean_length": float(np.mean(lengths)),
+        "mean_fuel_used": float(np.mean(fuel_used)),
+    }
+
+
+def evaluate_model(model, indices: Sequence[int] = range(EVAL_QUICK_EPISODES), scenario: Optional[str] = None) -> Dict[str, float]:
+    """Evaluate an SB3 model with deterministic actions"""
+    return evaluate_policy(lambda obs: model.predict(obs, deterministic=True)[0], indices, scenario)
+
+
+def run_batch(model, indices: Sequence[int], scenario: Optional[str] = None) -> List[dict]:
+    """Play one episode per bank index, stepping all environments together; one record per episode"""
+    bank = eval_bank(scenario)
+    envs = [LandingEnv(record_trajectory=False, reset_bank=bank) for _ in indices]
+    obs = np.stack([env.reset(options={"bank_index": index})[0] for env, index in zip(envs, indices)])
+    returns = np.zeros(len(envs))
+    lengths = np.zeros(len(envs), dtype=int)
+    records: List[Optional[dict]] = [None] * len(envs)
+    active = np.arange(len(envs))
+    while len(active):
+        actions, _ = model.predict(obs[active], deterministic=True)
+        still_active = []
+        for index, action in zip(active, actions):
+            env = envs[index]
+            obs[index], reward, terminated, truncated, info = env.step(action)
+            returns[index] += reward
+            lengths[index] += 1
+            if terminated or truncated:
+                records[index] = {
+                    "index": indices[index],
+                    "success": bool(info["success"]),
+                    "return": float(returns[index]),
+                    "length": int(lengths[index]),
+                    "fuel_used": float(info["fuel_used"]),
+                    # Same measure as stored episodes: 1 / (1 + distance to the pad)
+                    "landing_accuracy": 1.0 / (1.0 + abs(env.x - env.pad_x)),
+                    "termination_reason": info["termination_reason"],
+                }
+            else:
+                still_active.append(index)
+        active = np.array(still_active, dtype=int)
+    return records
+
+
+_worker_model = None
+
+
+def load_model(model_path: str):
+    """A saved PPO model, or a distilled student (.npz) with the same `predict`"""
+    if is_student_artifact(model_path):
+        return load_student(model_path)
+    import torch
+    from stable_baselines3 import PPO
+    
+    torch.set_num_threads(1)
+    return PPO.load(model_path, device="cpu")
+
+
+def _load_worker_model(model_path: str):
+    """Pool initializer: load the model once per process"""
+    global _worker_model
+    _worker_model = load_model(model_path)
+
+
+def _run_worker_batch(batch: tuple) -> List[dict]:
+    indices, scenario = batch
+    return run_batch(_worker_model, indices, scenario)
+
+
+def wilson_interval(successes: int, total: int, z: float = Z_95) -> tuple:
+    """Wilson score interval for a binomial proportion"""
+    if total == 0:
+        return (0.0, 0.0)
+    p = successes / total
+    denominator = 1 + z**2 / total
+    center = (p + z**2 / (2 * total)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / total + z**2 / (4 * total**2)) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def distribution(values: Sequence[float]) -> Dict[str, float]:
+    values = np.asarray(values, dtype=np.float64)
+    p5, p25, p50, p75, p95 = np.percentile(values, [5, 25, 50, 75, 95])
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "p5": float(p5),
+        "p25": float(p25),
+        "p50": float(p50),
+        "p75": float(p75),
+        "p95": float(p95),
+    }
+
+
+def summarize(records: List[dict]) -> Dict[str, object]:
+    successes = sum(r["success"] for r in records)
+    low, high = wilson_interval(successes, len(records))
+    reasons = {reason: 0 for reason in TERMINATION_REASONS}
+    for record in records:
+        reasons[record["termination_reason"]] = reasons.get(record["termination_reason"], 0) + 1
+    return {
+        "episodes": len(records),
+        "successes": successes,
+        "success_rate": successes / len(records),
+        "success_rate_ci95": [low, high],
+        "termination_reasons": reasons,
+        "return": distribution([r["return"] for r in records]),
+        "length": distribution([r["length"] for r in records]),
+        "fuel_used": distribution([r["fuel_used"] for r in records]),
+        "landing_accuracy": distribution([r["landing_accuracy"] for r in records]),
+    }
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def evaluate_file(
+    model_path: str,
+    episodes: int = EVAL_BANK_SIZE,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    cache_dir: str = EVAL_CACHE_DIR,
+    scenario: Optional[str] = None,
+) -> Dict[str, object]:
+    """
+    Evaluate a saved PPO model (or distilled student) on the first `episodes` episodes of a scenario's bank.
+    
+    Returns a report with the summary and per-episode records, from the
+    cache when this exact model file has been evaluated on the same episodes.
+    """
+    scenario = get_scenario(scenario).name
+    model_hash = file_hash(model_path)
+    cache_path = os.path.join(cache_dir, f"{model_hash[:16]}-v{ENV_VERSION}-{scenario}-{EVAL_SEED_BASE}-{episodes}.json")
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path) as f:
+            report = json.load(f)
+        report["cached"] = True
+        return report
+    
+    indices = list(range(min(episodes, EVAL_BANK_SIZE)))
+    workers = workers or os.cpu_count() or 1
+    # At least one batch per worker, and no batch over EVAL_BATCH_SIZE environments
+    batch_size = max(1, min(EVAL_BATCH_SIZE, math.ceil(len(indices) / workers)))
+    batches = [(indices[i:i + batch_size], scenario) for i in range(0, len(indices), batch_size)]
+    
+    started = time.perf_counter()
+    if workers == 1:
+        _load_worker_model(model_path)
+        records = [record for batch in batches for record in _run_worker_batch(batch)]
+    else:
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_load_worker_model, initargs=(model_path,)) as pool:
+            records = [record for batch in pool.map(_run_worker_batch, batches) for record in batch]
+    seconds = time.perf_counter() - started
+    
+    report = {
+        "model": os.path.basename(model_path),
+        "model_sha256": model_hash,
+        "scenario": scenario,
+        "bank_seed": EVAL_SEED_BASE,
+        "seconds": seconds,
+        "episodes_per_sec": len(records) / seconds,
+        "summary": summarize(records),
+        "records": records,
+    }
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_path + ".tmp", "w") as f:
+        json.dump(report, f)
+    os.replace(cache_path + ".tmp", cache_path)
+    report["cached"] = False
+    return report
+
+
+def mcnemar_p_value(only_a: int, only_b: int) -> float:
+    """Exact two-sided McNemar test on the discordant pairs"""
+    n = only_a + only_b
+    if n == 0:
+        return 1.0
+    k = min(only_a, only_b)
+    tail = sum(math.comb(n, i) for i in range(k + 1)) / 2**n
+    return min(1.0, 2 * tail)
+
+
+def compare_reports(a: Dict[str, object], b: Dict[str, object]) -> Dict[str, object]:
+    """Paired comparison of two reports over the episodes both evaluated"""
+    if (a["scenario"], a["bank_seed"]) != (b["scenario"], b["bank_seed"]):
+        raise ValueError("Reports of different scenarios or banks cannot be paired")
+    records_b = {r["index"]: r for r in b["records"]}
+    pairs = [(r, records_b[r["index"]]) for r in a["records"] if r["index"] in records_b]
+    only_a = sum(1 for ra, rb in pairs if ra["success"] and not rb["success"])
+    only_b = sum(1 for ra, rb in pairs if rb["success"] and not ra["success"])
+    return_diff = np.array([ra["return"] - rb["return"] for ra, rb in pairs])
+    return {
+        "a": a["model"],
+        "b": b["model"],
+        "paired_episodes": len(pairs),
+        "success_rate_diff": (sum(ra["success"] for ra, _ in pairs) - sum(rb["success"] for _, rb in pairs)) / len(pairs),
+        # Episodes only one of the models lands, and whether that split could be chance
+        "only_a_succeeds": only_a,
+        "only_b_succeeds": only_b,
+        "mcnemar_p_value": mcnemar_p_value(only_a, only_b),
+        "mean_return_diff": float(return_diff.mean()),
+        "mean_return_diff_ci95": [
+            float(return_diff.mean() - Z_95 * return_diff.std(ddof=1) / math.sqrt(len(pairs))) if len(pairs) > 1 else 0.0,
+            float(return_diff.mean() + Z_95 * return_diff.std(ddof=1) / math.sqrt(len(pairs))) if len(pairs) > 1 else 0.0,
+        ],
+    }
+
+
+def print_reports(reports: List[Dict[str, object]], comparison: Optional[Dict[str, object]] = None):
+    from rich.console import Console
+    from rich.table import Table
+    
+    table = Table(title="Evaluation")
+    table.add_column("metric")
+    for report in reports:
+        table.add_column(report["model"] + (" (cached)" if report.get("cached") else ""), justify="right")
+    
+    summaries = [r["summary"] for r in reports]
+    rows = [
+        ("episodes", lambda s: str(s["episodes"])),
+        ("success rate", lambda s: f"{s['success_rate']:.3f} [{s['success_rate_ci95'][0]:.3f}, {s['success_rate_ci95'][1]:.3f}]"),
+        *[(reason, lambda s, reason=reason: str(s["termination_reasons"].get(reason, 0))) for reason in TERMINATION_REASONS],
+        ("return mean", lambda s: f"{s['return']['mean']:.1f}"),
+        ("fuel used p50 [p5, p95]", lambda s: f"{s['fuel_used']['p50']:.1f} [{s['fuel_used']['p5']:.1f}, {s['fuel_used']['p95']:.1f}]"),
+        ("landing accuracy p50 [p5, p95]", lambda s: f"{s['landing_accuracy']['p50']:.3f} [{s['landing_accuracy']['p5']:.3f}, {s['landing_accuracy']['p95']:.3f}]"),
+        ("episode length mean", lambda s: f"{s['length']['mean']:.1f}"),
+    ]
+    for name, cell in rows:
+        table.add_row(name, *(cell(s) for s in summaries))
+    console = Console()
+    console.print(table)
+    if comparison is not None:
+        console.print(
+            f"Success rate difference {comparison['success_rate_diff']:+.3f} "
+            f"({comparison['only_a_succeeds']} episodes only A lands, {comparison['only_b_succeeds']} only B; "
+            f"McNemar p = {comparison['mcnemar_p_value']:.3g}); "
+            f"mean return difference {comparison['mean_return_diff']:+.1f} "
+            f"[{comparison['mean_return_diff_ci95'][0]:+.1f}, {comparison['mean_return_diff_ci95'][1]:+.1f}]"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate PPO models on the seeded episode bank")
+    parser.add_argument("model", help="Model zip (or distilled .npz) to evaluate")
+    parser.add_argument("--compare", default=None, help="Second model zip or .npz to compare against")
+    parser.add_argument("--episodes", type=int, default=EVAL_BANK_SIZE)
+    parser.add_argument("--scenario", default=None, help="Scenario to evaluate on (default: default)")
+    parser.add_argument("--workers", type=int, default=None, help="Evaluation processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-run even when a cached report exists")
+    parser.add_argument("--json", default=None, help="Write the summaries (and comparison) to this file")
+    args = parser.parse_args()
+    
+    reports = [
+        evaluate_file(path, args.episodes, args.workers, use_cache=not args.no_cache, scenario=args.scenario)
+        for path in filter(None, [args.model, args.compare])
+    ]
+    comparison = compare_reports(*reports) if len(reports) == 2 else None
+    print_reports(reports, comparison)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"reports": [{k: v for k, v in r.items() if k != "records"} for r in reports], "comparison": comparison}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
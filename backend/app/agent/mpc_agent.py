@@ -0,0 +1,105 @@
+"""
+Model-predictive autopilot using the cross-entropy method (CEM).
+
+At every step the planner samples MPC_SAMPLES action sequences of
+MPC_HORIZON steps from a Gaussian, scores them all at once with the
+vectorized LandingEnv dynamics and reward, and refits the Gaussian to the
+best MPC_ELITES. It repeats until the per-step budget is spent, then plays
+the first action of the mean sequence. The remaining plan warm-starts the
+next step. No trained model is needed.
+"""
+
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.metrics import MPC_PLAN_SECONDS
+from app.rl_env.landing_env import LandingEnv
+from app.rl_env.vector_dynamics import LandingDynamics
+
+MPC_HORIZON = int(os.getenv("MPC_HORIZON", "30"))
+MPC_SAMPLES = int(os.getenv("MPC_SAMPLES", "256"))
+MPC_ELITES = int(os.getenv("MPC_ELITES", "25"))
+# Default and maximum planning time per step, in milliseconds
+MPC_BUDGET_MS = float(os.getenv("MPC_BUDGET_MS", "20"))
+MPC_MAX_BUDGET_MS = float(os.getenv("MPC_MAX_BUDGET_MS", "200"))
+
+ACTION_LOW = np.array([0.0, -1.0])
+ACTION_HIGH = np.array([1.0, 1.0])
+INITIAL_MEAN = np.array([0.5, 0.0])
+INITIAL_STD = np.array([0.5, 0.5])
+# Keeps the search from collapsing onto a single sequence
+MIN_STD = 0.05
+
+
+def parse_budget_ms(value) -> float:
+    """Validate a client-supplied budget, clamped to [1, MPC_MAX_BUDGET_MS]"""
+    try:
+        budget = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"mpc_budget_ms must be a number, got {value!r}")
+    if not np.isfinite(budget):
+        raise ValueError("mpc_budget_ms must be finite")
+    return min(max(budget, 1.0), MPC_MAX_BUDGET_MS)
+
+
+class MPCAgent:
+    """CEM planner over LandingEnv dynamics with a per-step time budget"""
+    
+    def __init__(
+        self,
+        budget_ms: float = MPC_BUDGET_MS,
+        horizon: int = MPC_HORIZON,
+        samples: int = MPC_SAMPLES,
+        elites: int = MPC_ELITES,
+        seed: Optional[int] = None,
+    ):
+        self.budget = budget_ms / 1000.0
+        self.horizon = horizon
+        self.samples = samples
+        self.elites = min(elites, samples)
+        self.rng = np.random.default_rng(seed)
+        self.dynamics: Optional[LandingDynamics] = None
+        # CEM iterations used for the last action, for diagnostics
+        self.last_iterations = 0
+        self.reset()
+    
+    def reset(self):
+        """Forget the warm-start plan (call at the start of each episode)"""
+        self.mean = np.tile(INITIAL_MEAN, (self.horizon, 1))
+    
+    def plan(self, env: LandingEnv) -> np.ndarray:
+        """Best first action from the environment's current state"""
+        started = time.perf_counter()
+        deadline = started + self.budget
+        if self.dynamics is None:
+            self.dynamics = LandingDynamics(env)
+        state = LandingDynamics.state_from_env(env)
+        
+        mean = self.mean
+        std = np.tile(INITIAL_STD, (self.horizon, 1))
+        iterations = 0
+        iteration_time = 0.0
+        # Always run one iteration; then stop when another would overrun the budget
+        while iterations == 0 or time.perf_counter() + iteration_time <= deadline:
+            iteration_started = time.perf_counter()
+            candidates = mean + std * self.rng.standard_normal((self.samples, self.horizon, 2))
+            # The current mean competes too, so refits never lose the best known plan
+            candidates[0] = mean
+            np.clip(candidates, ACTION_LOW, ACTION_HIGH, out=candidates)
+            
+            returns = self.dynamics.rollout(state, candidates)
+            elite = candidates[np.argpartition(returns, -self.elites)[-self.elites:]]
+            mean = elite.mean(axis=0)
+            std = np.maximum(elite.std(axis=0), MIN_STD)
+            
+            iterations += 1
+            iteration_time = time.perf_counter() - iteration_started
+        
+        # Shift the plan one step for the next call
+        self.mean = np.concatenate([mean[1:], mean[-1:]])
+        self.last_iterations = iterations
+        MPC_PLAN_SECONDS.observe(time.perf_counter() - started)
+        return mean[0].astype(np.float32)
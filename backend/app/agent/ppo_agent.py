@@ -1,8 +1,77 @@
 import os
-from typing import Optional
-from stable_baselines3 import PPO
-from stable_baselines3.common.env_util import make_vec_env
+from typing import TYPE_CHECKING, Any, Dict, Optional
 from app.rl_env.landing_env import LandingEnv
+from app.metrics import AGENT_PREDICT_SECONDS
+from app.agent.shared_weights import load_shared_model
+from app.agent.student_policy import is_student_artifact, load_student
+
+# stable_baselines3 pulls in torch (seconds and hundreds of MB), so it is only
+# imported when a model is actually trained or loaded
+if TYPE_CHECKING:
+    from stable_baselines3 import PPO
+
+
+# PPO settings used unless a caller (e.g. a hyperparameter sweep) overrides them
+DEFAULT_HYPERPARAMS: Dict[str, Any] = {
+    "learning_rate": 3e-4,
+    "n_steps": 2048,
+    "batch_size": 64,
+    "n_epochs": 10,
+    "gamma": 0.99,
+    "gae_lambda": 0.95,
+    "clip_range": 0.2,
+    "ent_coef": 0.01,
+}
+
+# End training episodes once an upright touchdown is out of reach (LandingEnv early_termination).
+# Evaluation always plays episodes out.
+TRAIN_EARLY_TERMINATION = os.getenv("TRAIN_EARLY_TERMINATION", "false").lower() in ("1", "true", "yes")
+# Initial states per reset bank of each actor-learner actor (cycled through in order)
+TRAIN_BANK_SIZE = int(os.getenv("TRAIN_BANK_SIZE", "100000"))
+# Serve loaded models from a read-only weight file mapped by every process (app/agent/shared_weights.py)
+SHARED_WEIGHTS = os.getenv("SHARED_WEIGHTS", "true").lower() in ("1", "true", "yes")
+# Intra-op threads torch may use per process (0 leaves torch's default of one per core). With several
+# API or simulation worker processes, set it so processes x threads does not exceed the cores.
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+# Model pooled agents serve: a PPO zip, or a distilled actor (.npz, app/agent/distill.py) that runs without torch
+SERVE_MODEL_PATH = os.getenv("SERVE_MODEL_PATH", "models/ppo_landing.zip")
+
+_threads_configured = False
+
+
+def configure_torch_threads():
+    """Apply TORCH_NUM_THREADS to this process (once, before torch starts its thread pools)"""
+    global _threads_configured
+    if _threads_configured or TORCH_NUM_THREADS <= 0:
+        return
+    import torch
+    
+    torch.set_num_threads(TORCH_NUM_THREADS)
+    try:
+        torch.set_num_interop_threads(TORCH_NUM_THREADS)
+    except RuntimeError:
+        # Only settable before the first inter-op parallel work
+        pass
+    _threads_configured = True
+
+
+def warm_up():
+    """Import the ML stack ahead of the first auto/train session"""
+    if is_student_artifact(SERVE_MODEL_PATH):
+        # Distilled students are served with NumPy alone
+        return
+    import stable_baselines3  # noqa: F401
+    
+    configure_torch_threads()
+
+
+def _hyperparams_of(model: "PPO") -> Dict[str, Any]:
+    """The DEFAULT_HYPERPARAMS settings of a model (constant schedules as their value)"""
+    values = {}
+    for name in DEFAULT_HYPERPARAMS:
+        value = getattr(model, name)
+        values[name] = value(1.0) if callable(value) else value
+    return values
 
 
 class PPOAgent:
@@ -10,40 +79,84 @@ class PPOAgent:
     
     def __init__(self, model_path: Optional[str] = None):
         self.model_path = model_path or "models/ppo_landing.zip"
-        self.model: Optional[PPO] = None
+        self.model: Optional["PPO"] = None
         self.env = None
-        
+    
     def create_env(self):
         """Create a new environment instance"""
         return LandingEnv()
     
-    def train(self, total_timesteps: int = 100000):
-        """Train the PPO agent"""
-        # Create vectorized environment
-        self.env = make_vec_env(LandingEnv, n_envs=1)
+    def create_model(self, env, hyperparams: Optional[Dict[str, Any]] = None, verbose: int = 1, device: str = "auto", seed: Optional[int] = None) -> "PPO":
+        """New PPO model with DEFAULT_HYPERPARAMS, updated by `hyperparams`"""
+        from stable_baselines3 import PPO
         
-        # Create or load model
-        if os.path.exists(self.model_path):
-            self.model = PPO.load(self.model_path, env=self.env)
-            print(f"Loaded existing model from {self.model_path}")
+        unknown = set(hyperparams or {}) - set(DEFAULT_HYPERPARAMS)
+        if unknown:
+            raise ValueError(f"Unknown PPO hyperparameters: {', '.join(sorted(unknown))}")
+        return PPO("MlpPolicy", env, verbose=verbose, device=device, seed=seed, **{**DEFAULT_HYPERPARAMS, **(hyperparams or {})})
+    
+    def train(
+        self,
+        total_timesteps: int = 100000,
+        hyperparams: Optional[Dict[str, Any]] = None,
+        scenario: Optional[str] = None,
+        seed: Optional[int] = None,
+        checkpoint_dir: Optional[str] = None,
+        resume: bool = False,
+    ):
+        """
+        Train the PPO agent on a scenario (`hyperparams` apply when a new model is created).
+        
+        With `checkpoint_dir`, a background thread writes checkpoints there
+        while training runs (app/agent/checkpoints.py). `resume` continues
+        the newest of them exactly where it left off; the total timesteps,
+        hyperparameters and scenario of the interrupted run then apply.
+        """
+        from stable_baselines3 import PPO
+        from stable_baselines3.common.env_util import make_vec_env
+        
+        configure_torch_threads()
+        checkpoint = None
+        if checkpoint_dir is not None:
+            from app.agent.checkpoints import AsyncCheckpointCallback, CheckpointWriter, latest_checkpoint, load_checkpoint, restore_checkpoint
+            
+            checkpoint = latest_checkpoint(checkpoint_dir) if resume else None
+            if resume and checkpoint is None:
+                print(f"No checkpoint in {checkpoint_dir}, starting a new run")
+        
+        if checkpoint is not None:
+            state = load_checkpoint(checkpoint)
+            run = state["run"]
+            self.model, self.env = restore_checkpoint(state, lambda env, params: self.create_model(env, params))
+            print(f"Resumed from {checkpoint} at {self.model.num_timesteps} of {run['total_timesteps']} timesteps")
         else:
-            self.model = PPO(
-                "MlpPolicy",
-                self.env,
-                verbose=1,
-                learning_rate=3e-4,
-                n_steps=2048,
-                batch_size=64,
-                n_epochs=10,
-                gamma=0.99,
-                gae_lambda=0.95,
-                clip_range=0.2,
-                ent_coef=0.01,
-            )
-            print("Created new PPO model")
+            # Create vectorized environment
+            env_kwargs = {"early_termination": TRAIN_EARLY_TERMINATION, "scenario": scenario}
+            self.env = make_vec_env(LandingEnv, n_envs=1, seed=seed, env_kwargs=env_kwargs)
+            
+            # Create or load model
+            if os.path.exists(self.model_path):
+                self.model = PPO.load(self.model_path, env=self.env)
+                print(f"Loaded existing model from {self.model_path}")
+            else:
+                self.model = self.create_model(self.env, hyperparams, seed=seed)
+                print("Created new PPO model")
+            run = {"total_timesteps": total_timesteps, "hyperparams": _hyperparams_of(self.model), **env_kwargs}
         
-        # Train the model
-        self.model.learn(total_timesteps=total_timesteps)
+        # Train the model, from where the checkpoint left off when resuming
+        writer = None
+        callback = None
+        if checkpoint_dir is not None:
+            writer = CheckpointWriter(checkpoint_dir)
+            callback = AsyncCheckpointCallback(writer, run)
+        try:
+            if checkpoint is not None:
+                self.model.learn(total_timesteps=run["total_timesteps"] - self.model.num_timesteps, callback=callback, reset_num_timesteps=False)
+            else:
+                self.model.learn(total_timesteps=total_timesteps, callback=callback)
+        finally:
+            if writer is not None:
+                writer.close()
         
         # Save the model
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
@@ -59,12 +172,24 @@ class PPOAgent:
             # Return random action if no model available
             return [0.5, 0.0]
         
-        action, _ = self.model.predict(observation, deterministic=True)
+        with AGENT_PREDICT_SECONDS.time():
+            action, _ = self.model.predict(observation, deterministic=True)
         return action
     
     def load(self):
         """Load model from file"""
         if os.path.exists(self.model_path):
+            if is_student_artifact(self.model_path):
+                self.model = load_student(self.model_path)
+                print(f"Loaded distilled policy from {self.model_path}")
+                return
+            from stable_baselines3 import PPO
+            
+            configure_torch_threads()
+            if SHARED_WEIGHTS:
+                # One read-only model per process, shared by every pooled agent
+                self.model = load_shared_model(self.model_path)
+                return
             self.env = self.create_env()
             self.model = PPO.load(self.model_path, env=self.env)
             print(f"Loaded model from {self.model_path}")
@@ -81,3 +206,32 @@ class PPOAgent:
         else:
             print("No model to save")
 
+
+def main():
+    import argparse
+    
+    from app.agent.checkpoints import CHECKPOINT_DIR
+    from app.logging_config import configure_logging
+    
+    parser = argparse.ArgumentParser(description="Train the PPO agent, with periodic checkpoints")
+    parser.add_argument("--total-timesteps", type=int, default=100_000)
+    parser.add_argument("--model-path", default=None, help="Where to save the model (default: PPOAgent's)")
+    parser.add_argument("--scenario", default=None, help="Scenario to train on (default: default)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR, help="Where to write checkpoints")
+    parser.add_argument("--no-checkpoints", action="store_true", help="Only save the model at the end")
+    parser.add_argument("--resume", action="store_true", help="Continue the newest checkpoint in --checkpoint-dir")
+    args = parser.parse_args()
+    
+    configure_logging()
+    PPOAgent(args.model_path).train(
+        total_timesteps=args.total_timesteps,
+        scenario=args.scenario,
+        seed=args.seed,
+        checkpoint_dir=None if args.no_checkpoints else args.checkpoint_dir,
+        resume=args.resume,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Policy weights shared read-only between processes through a memory-mapped file.
+
+Every API and simulation worker process that serves a PPO model would
+otherwise hold its own copy of the weights, and each pooled PPOAgent one
+more. With SHARED_WEIGHTS on, the first process to load a model exports its
+policy parameters to a flat weight file next to it (`<model>.weights`);
+every process then maps that file read-only and points the policy's
+parameters at the mapping. The pages live once in the OS page cache, and
+all pooled agents of a process share one model object.
+
+File layout: an 8-byte little-endian header length, a JSON header
+(source model fingerprint, then name, dtype, shape and byte offset of each
+tensor), padding to a page boundary, then the raw tensors, each aligned to
+ALIGNMENT bytes. The export is written to a temporary file and renamed
+into place, so concurrent processes never map a partial file, and a
+process that still maps a replaced file keeps its old pages.
+
+The mapping is PROT_READ: writing to a shared model's parameters (for
+example training it) faults. Training loads its own private copy. The
+optimizer state PPO.load restores is dropped, since inference never uses it.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import threading
+import warnings
+from typing import TYPE_CHECKING, Dict, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from stable_baselines3 import PPO
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 4096
+ALIGNMENT = 64
+FORMAT_VERSION = 1
+
+# Shared models of this process by model path, with the fingerprint they were loaded from
+_models: Dict[str, Tuple[Tuple[int, int], "PPO"]] = {}
+_lock = threading.Lock()
+
+
+def weights_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".weights"
+
+
+def model_fingerprint(model_path: str) -> Tuple[int, int]:
+    """(size, mtime_ns) of a model file; a retrained model gets a new weight file"""
+    stat = os.stat(model_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _data_start(header_length: int) -> int:
+    """Offset of the first tensor: the header, rounded up to a page"""
+    return -(-(8 + header_length) // PAGE_SIZE) * PAGE_SIZE
+
+
+def read_header(path: str) -> Tuple[dict, int]:
+    """(header, data start offset) of a weight file"""
+    with open(path, "rb") as f:
+        length = int.from_bytes(f.read(8), "little")
+        return json.loads(f.read(length)), _data_start(length)
+
+
+def export_weights(model: "PPO", path: str, fingerprint: Tuple[int, int]):
+    """Write the policy parameters of `model` to a weight file at `path` (atomically)"""
+    tensors = {}
+    offset = 0
+    arrays = []
+    for name, tensor in model.policy.state_dict().items():
+        array = np.ascontiguousarray(tensor.detach().cpu().numpy())
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        tensors[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        arrays.append((offset, array))
+        offset += array.nbytes
+    header = json.dumps({"version": FORMAT_VERSION, "source": list(fingerprint), "tensors": tensors}).encode()
+    data_start = _data_start(len(header))
+    
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for tensor_offset, array in arrays:
+            f.seek(data_start + tensor_offset)
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+    logger.info("Exported %d policy tensors (%d bytes) to %s", len(tensors), offset, path)
+
+
+def map_weights(path: str) -> Dict[str, "object"]:
+    """Read-only torch tensors backed by a weight file's pages, by parameter name"""
+    import torch
+    
+    header, data_start = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    mapped = {}
+    with warnings.catch_warnings():
+        # torch warns that the arrays are not writable, which is the point
+        warnings.simplefilter("ignore", UserWarning)
+        for name, spec in header["tensors"].items():
+            array = np.ndarray(spec["shape"], np.dtype(spec["dtype"]), buffer, data_start + spec["offset"])
+            mapped[name] = torch.from_numpy(array)
+    return mapped
+
+
+def release_freed_memory():
+    """Return freed heap pages to the OS (glibc only); PPO.load's temporary copies otherwise stay resident"""
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return
+    try:
+        libc = ctypes.CDLL(libc_name)
+        malloc_trim = libc.malloc_trim
+    except (OSError, AttributeError):
+        return
+    malloc_trim(0)
+
+
+def load_shared_model(model_path: str) -> "PPO":
+    """
+    This process's shared PPO model for `model_path`, with parameters mapped from its weight file.
+    
+    The weight file is exported on first use and again whenever the model
+    file changes. Callers only run inference on the result.
+    """
+    fingerprint = model_fingerprint(model_path)
+    with _lock:
+        cached = _models.get(model_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        
+        from stable_baselines3 import PPO
+        
+        model = PPO.load(model_path, device="cpu")
+        path = weights_path(model_path)
+        try:
+            header, _ = read_header(path)
+            current = header.get("version") == FORMAT_VERSION and tuple(header.get("source", ())) == fingerprint
+        except (OSError, ValueError):
+            current = False
+        if not current:
+            export_weights(model, path, fingerprint)
+        
+        # Point every parameter and buffer at the mapping; the private copies PPO.load made are freed
+        mapped = map_weights(path)
+        state = model.policy.state_dict(keep_vars=True)
+        if set(mapped) != set(state):
+            raise ValueError(f"Weight file {path} does not match the policy of {model_path}")
+        for name, tensor in state.items():
+            if tensor.shape != mapped[name].shape or tensor.dtype != mapped[name].dtype:
+                raise ValueError(f"Weight file {path} has a different {name} than {model_path}")
+            tensor.requires_grad_(False)
+            tensor.data = mapped[name]
+        model.policy.set_training_mode(False)
+        # PPO.load also restores Adam's moment estimates (about twice the parameters
+        # of a trained model) as private tensors; inference never reads them
+        model.policy.optimizer.state.clear()
+        release_freed_memory()
+        
+        _models[model_path] = (fingerprint, model)
+        logger.info("Mapped shared policy weights from %s", path)
+        return model
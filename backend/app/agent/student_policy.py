@@ -0,0 +1,90 @@
+"""
+Distilled actor-only policies, served with NumPy.
+
+A student (app/agent/distill.py) is a small tanh MLP trained to reproduce
+a PPO teacher's deterministic actions. It is exported as an `.npz` of
+plain weight matrices, with input normalization folded into the first
+layer, so serving it needs neither torch nor the critic network. A
+StudentPolicy has the `predict(observation, deterministic=True)` of SB3
+models, and PPOAgent.load returns one for `.npz` model paths.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+STUDENT_SUFFIX = ".npz"
+FORMAT_VERSION = 1
+
+
+def is_student_artifact(path: str) -> bool:
+    return path.endswith(STUDENT_SUFFIX)
+
+
+class StudentPolicy:
+    """Tanh MLP mapping observations to actions clipped to the action space"""
+    
+    def __init__(
+        self,
+        weights: List[np.ndarray],
+        biases: List[np.ndarray],
+        action_low: np.ndarray,
+        action_high: np.ndarray,
+        metadata: Optional[dict] = None,
+    ):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.action_low = np.asarray(action_low, dtype=np.float32)
+        self.action_high = np.asarray(action_high, dtype=np.float32)
+        self.metadata = metadata or {}
+    
+    @property
+    def nbytes(self) -> int:
+        return sum(w.nbytes for w in self.weights) + sum(b.nbytes for b in self.biases)
+    
+    @property
+    def hidden_sizes(self) -> Tuple[int, ...]:
+        return tuple(w.shape[1] for w in self.weights[:-1])
+    
+    def predict(self, observation, deterministic: bool = True):
+        """(action or batch of actions, None); the policy is deterministic either way"""
+        x = np.asarray(observation, dtype=np.float32)
+        single = x.ndim == 1
+        if single:
+            x = x[None, :]
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = np.tanh(x @ weight + bias)
+        actions = np.clip(x @ self.weights[-1] + self.biases[-1], self.action_low, self.action_high)
+        return (actions[0] if single else actions), None
+    
+    def save(self, path: str):
+        """Write the policy to an `.npz` at `path` (atomically)"""
+        arrays = {f"w{i}": w for i, w in enumerate(self.weights)}
+        arrays.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        metadata = np.array(list(self.metadata.items()), dtype=str).reshape(-1, 2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                format=np.array(FORMAT_VERSION),
+                action_low=self.action_low,
+                action_high=self.action_high,
+                metadata=metadata,
+                **arrays,
+            )
+        os.replace(tmp_path, path)
+
+
+def load_student(path: str) -> StudentPolicy:
+    with np.load(path, allow_pickle=False) as data:
+        if int(data["format"]) != FORMAT_VERSION:
+            raise ValueError(f"{path} has student format {int(data['format'])}, expected {FORMAT_VERSION}")
+        layers = sum(1 for name in data.files if name.startswith("w"))
+        return StudentPolicy(
+            [data[f"w{i}"] for i in range(layers)],
+            [data[f"b{i}"] for i in range(layers)],
+            data["action_low"],
+            data["action_high"],
+            {str(key): str(value) for key, value in data["metadata"]},
+        )
@@ -0,0 +1,333 @@
+"""
+Parallel PPO hyperparameter sweep with successive halving.
+
+Trials are drawn from a search space (every combination in grid mode, or
+`--trials` samples in random mode) and trained concurrently in a process
+pool. Training goes in rungs. At rung r every surviving trial trains to
+`min_timesteps * eta**r` timesteps (capped at `max_timesteps`) and is
+scored on the fixed evaluation episodes in app/agent/evaluation.py. Only
+the best 1/eta carry on to the next rung. The rest stop early, so most of
+the budget goes to promising settings.
+
+The search space is JSON mapping each PPO hyperparameter (see
+DEFAULT_HYPERPARAMS) to a list of choices, or, for random mode, to a range
+such as {"low": 1e-4, "high": 1e-3, "log": true} (add "type": "int" for
+integers).
+
+Progress is checkpointed in `<out>/trials.json` and per-trial model files
+after every rung, so rerunning the same command after a crash resumes where
+it stopped:
+
+    python -m app.agent.sweep --space space.json --mode random --trials 16 --out sweeps/lr
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import csv
+import itertools
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.agent.evaluation import EVAL_QUICK_EPISODES, evaluate_model
+from app.agent.ppo_agent import DEFAULT_HYPERPARAMS, TRAIN_EARLY_TERMINATION, PPOAgent
+from app.logging_config import configure_logging
+from app.rl_env.landing_env import LandingEnv
+from app.rl_env.scenarios import get_scenario
+
+logger = logging.getLogger("app.agent.sweep")
+
+DEFAULT_SPACE: Dict[str, Any] = {
+    "learning_rate": [1e-4, 3e-4, 1e-3],
+    "n_steps": [512, 1024, 2048],
+    "batch_size": [64, 128],
+    "ent_coef": [0.0, 0.01],
+}
+
+STATE_FILE = "trials.json"
+MODEL_FILE = "model.zip"
+
+
+def grid_trials(space: Dict[str, Any]) -> List[Dict[str, Any]]:
+    for name, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"Grid search needs a list of choices for {name}, got {values!r}")
+    names = list(space)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(space[name] for name in names))]
+
+
+def sample_value(spec, rng: np.random.Generator):
+    if isinstance(spec, list):
+        return spec[int(rng.integers(len(spec)))]
+    low, high = spec["low"], spec["high"]
+    if spec.get("log"):
+        value = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+    else:
+        value = float(rng.uniform(low, high))
+    return int(round(value)) if spec.get("type") == "int" else value
+
+
+def random_trials(space: Dict[str, Any], count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    return [{name: sample_value(spec, rng) for name, spec in space.items()} for _ in range(count)]
+
+
+def rung_budgets(min_timesteps: int, max_timesteps: int, eta: int) -> List[int]:
+    """Cumulative training timesteps at each rung, ending at max_timesteps"""
+    budgets = []
+    budget = min_timesteps
+    while budget < max_timesteps:
+        budgets.append(budget)
+        budget *= eta
+    budgets.append(max_timesteps)
+    return budgets
+
+
+def score(result: Dict[str, float]) -> tuple:
+    """Ranking key: landings first, then return"""
+    return (result["success_rate"], result["mean_return"])
+
+
+def run_rung(trial_dir: str, hyperparams: Dict[str, Any], timesteps: int, seed: int, eval_episodes: int, scenario: Optional[str] = None) -> Dict[str, float]:
+    """
+    Train one trial up to `timesteps` total and evaluate it (runs in a pool process).
+    
+    Training continues from the trial's checkpoint, which is replaced
+    atomically, so a crash at any point loses at most the current rung.
+    """
+    import torch
+    from stable_baselines3 import PPO
+    
+    torch.set_num_threads(1)
+    started = time.perf_counter()
+    env = LandingEnv(record_trajectory=False, early_termination=TRAIN_EARLY_TERMINATION, scenario=scenario)
+    checkpoint = os.path.join(trial_dir, MODEL_FILE)
+    if os.path.exists(checkpoint):
+        model = PPO.load(checkpoint, env=env, device="cpu")
+    else:
+        os.makedirs(trial_dir, exist_ok=True)
+        model = PPOAgent(checkpoint).create_model(env, hyperparams, verbose=0, device="cpu", seed=seed)
+    
+    remaining = timesteps - model.num_timesteps
+    if remaining > 0:
+        model.learn(remaining, reset_num_timesteps=False)
+        partial = os.path.join(trial_dir, "model.partial.zip")
+        model.save(partial)
+        os.replace(partial, checkpoint)
+    
+    result = evaluate_model(model, range(eval_episodes), scenario)
+    result["timesteps"] = model.num_timesteps
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+class Sweep:
+    """Trial state for one sweep directory, persisted to trials.json"""
+    
+    def __init__(self, out_dir: str, config: Dict[str, Any], trials: List[Dict[str, Any]]):
+        self.out_dir = out_dir
+        self.config = config
+        self.trials = trials
+    
+    @classmethod
+    def create(cls, out_dir: str, space: Dict[str, Any], mode: str, trials: int, min_timesteps: int, max_timesteps: int, eta: int, seed: int, eval_episodes: int, scenario: Optional[str] = None) -> "Sweep":
+        state_path = os.path.join(out_dir, STATE_FILE)
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            logger.info("Resuming sweep in %s (%d trials)", out_dir, len(state["trials"]))
+            return cls(out_dir, state["config"], state["trials"])
+        
+        unknown = set(space) - set(DEFAULT_HYPERPARAMS)
+        if unknown:
+            raise ValueError(f"Unknown PPO hyperparameters in search space: {', '.join(sorted(unknown))}")
+        params = grid_trials(space) if mode == "grid" else random_trials(space, trials, seed)
+        scenario = get_scenario(scenario).name
+        config = {
+            "space": space,
+            "mode": mode,
+            "eta": eta,
+            "budgets": rung_budgets(min_timesteps, max_timesteps, eta),
+            "seed": seed,
+            "scenario": scenario,
+            "eval_episodes": eval_episodes,
+            "promoted_rungs": [],
+        }
+        sweep = cls(out_dir, config, [
+            {"id": f"trial-{i:03d}", "params": p, "status": "running", "results": []}
+            for i, p in enumerate(params)
+        ])
+        os.makedirs(out_dir, exist_ok=True)
+        sweep.save()
+        return sweep
+    
+    def save(self):
+        path = os.path.join(self.out_dir, STATE_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"config": self.config, "trials": self.trials}, f, indent=2)
+        os.replace(path + ".tmp", path)
+    
+    def trial_dir(self, trial: Dict[str, Any]) -> str:
+        return os.path.join(self.out_dir, trial["id"])
+    
+    def run(self, workers: int):
+        budgets = self.config["budgets"]
+        ctx = mp.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            for rung, budget in enumerate(budgets):
+                if self.promoted(rung):
+                    # Finished before a restart; promoting again would cut the survivors twice
+                    continue
+                pending = [t for t in self.trials if t["status"] == "running" and len(t["results"]) <= rung]
+                logger.info("Rung %d: %d trials to train to %d timesteps", rung, len(pending), budget)
+                futures = {
+                    pool.submit(
+                        run_rung, self.trial_dir(t), t["params"], budget, self.config["seed"], self.config["eval_episodes"], self.config["scenario"]
+                    ): t
+                    for t in pending
+                }
+                for future in as_completed(futures):
+                    trial = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # A pool process died (killed, out of memory): leave the trials
+                        # running so rerunning the sweep picks them up again
+                        logger.error("Sweep interrupted; rerun the same command to resume")
+                        raise
+                    except Exception as e:
+                        logger.error("%s failed: %s", trial["id"], e)
+                        trial["status"] = "failed"
+                        trial["error"] = str(e)
+                    else:
+                        trial["results"].append(result)
+                        logger.info("%s rung %d: success %.2f, return %.1f (%.0fs)", trial["id"], rung,
+                                    result["success_rate"], result["mean_return"], result["seconds"])
+                    self.save()
+                self.promote(rung, last=rung == len(budgets) - 1)
+    
+    def promoted(self, rung: int) -> bool:
+        """Whether promotion already ran for this rung"""
+        if rung in self.config.get("promoted_rungs", []):
+            return True
+        # State saved before promoted_rungs was recorded: survivors trained past the rung
+        return any(t["status"] == "running" and len(t["results"]) > rung + 1 for t in self.trials)
+    
+    def promote(self, rung: int, last: bool):
+        """Keep the top 1/eta of this rung's trials running and stop the rest"""
+        ranked = sorted(
+            (t for t in self.trials if t["status"] == "running"),
+            key=lambda t: score(t["results"][rung]),
+            reverse=True,
+        )
+        keep = len(ranked) if last else max(1, math.ceil(len(ranked) / self.config["eta"]))
+        for trial in ranked[keep:]:
+            trial["status"] = "stopped"
+            trial["stopped_at_rung"] = rung
+        if last:
+            for trial in ranked:
+                trial["status"] = "completed"
+        self.config.setdefault("promoted_rungs", []).append(rung)
+        self.save()
+    
+    def best(self) -> Optional[Dict[str, Any]]:
+        completed = [t for t in self.trials if t["status"] == "completed"]
+        return max(completed, key=lambda t: score(t["results"][-1]), default=None)
+    
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for trial in self.trials:
+            last = trial["results"][-1] if trial["results"] else {}
+            rows.append({
+                "trial": trial["id"],
+                **trial["params"],
+                "status": trial["status"],
+                "rungs": len(trial["results"]),
+                "timesteps": last.get("timesteps", 0),
+                "success_rate": last.get("success_rate"),
+                "mean_return": last.get("mean_return"),
+                "train_seconds": sum(r["seconds"] for r in trial["results"]),
+            })
+        rows.sort(key=lambda r: (r["rungs"], r["success_rate"] or 0.0, r["mean_return"] or -math.inf), reverse=True)
+        return rows
+    
+    def write_results(self) -> Optional[Dict[str, Any]]:
+        """Write results.csv and copy the best model to best_model.zip"""
+        rows = self.rows()
+        with open(os.path.join(self.out_dir, "results.csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        
+        best = self.best()
+        if best is not None:
+            shutil.copyfile(os.path.join(self.trial_dir(best), MODEL_FILE), os.path.join(self.out_dir, "best_model.zip"))
+            with open(os.path.join(self.out_dir, "best.json"), "w") as f:
+                json.dump({"trial": best["id"], "params": best["params"], "result": best["results"][-1]}, f, indent=2)
+        return best
+
+
+def print_results(rows: List[Dict[str, Any]], param_names: List[str]):
+    from rich.console import Console
+    from rich.table import Table
+    
+    table = Table(title="Sweep results")
+    columns = ["trial", *param_names, "status", "rungs", "timesteps", "success_rate", "mean_return", "train_seconds"]
+    for column in columns:
+        table.add_column(column, justify="left" if column in ("trial", "status") else "right")
+    for row in rows:
+        table.add_row(*(f"{row[c]:.4g}" if isinstance(row[c], float) else str(row[c]) for c in columns))
+    Console().print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep PPO hyperparameters with successive halving")
+    parser.add_argument("--space", default=None, help="JSON file with the search space (default: DEFAULT_SPACE)")
+    parser.add_argument("--mode", choices=("grid", "random"), default="grid")
+    parser.add_argument("--trials", type=int, default=16, help="Trials to sample in random mode")
+    parser.add_argument("--min-timesteps", type=int, default=10_000, help="Training budget of the first rung")
+    parser.add_argument("--max-timesteps", type=int, default=100_000, help="Training budget of the last rung")
+    parser.add_argument("--eta", type=int, default=3, help="Keep the top 1/eta trials at each rung")
+    parser.add_argument("--eval-episodes", type=int, default=EVAL_QUICK_EPISODES, help="Fixed evaluation episodes per rung")
+    parser.add_argument("--scenario", default=None, help="Scenario to train and evaluate on (default: default)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Concurrent trials")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="sweeps/ppo", help="Sweep directory; an existing one is resumed")
+    parser.add_argument("--install", action="store_true", help="Also copy the best model to PPOAgent's model path")
+    args = parser.parse_args()
+    
+    configure_logging()
+    space = DEFAULT_SPACE
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+    
+    sweep = Sweep.create(args.out, space, args.mode, args.trials, args.min_timesteps, args.max_timesteps, args.eta, args.seed, args.eval_episodes, args.scenario)
+    sweep.run(args.workers)
+    best = sweep.write_results()
+    print_results(sweep.rows(), list(sweep.config["space"]))
+    if best is None:
+        logger.error("No trial completed")
+        return
+    logger.info("Best trial %s: %s", best["id"], best["params"])
+    if args.install:
+        agent = PPOAgent()
+        os.makedirs(os.path.dirname(agent.model_path), exist_ok=True)
+        shutil.copyfile(os.path.join(args.out, "best_model.zip"), agent.model_path)
+        logger.info("Installed best model at %s", agent.model_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,111 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+from fastapi import Depends, Header, HTTPException
 from jose import JWTError, jwt
+from app.metrics import CallbackMetric
+import hashlib
 import logging
 import os
+import threading
+import time
 
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_DAYS", "7"))
 
+# Comma-separated emails allowed to use admin endpoints (profiling, evaluation)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+
+# Verified token cache configuration
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "1024"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+
 logger = logging.getLogger(__name__)
 
 
+class TokenCache:
+    """
+    Bounded LRU cache of verified JWT payloads.
+    
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    never kept in memory, and expire after the configured TTL or at the
+    token's own `exp` claim, whichever comes first.
+    """
+    
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE, ttl_seconds: float = TOKEN_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    def get(self, token: str) -> Optional[dict]:
+        """Return the cached payload for a token, or None on a miss"""
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(payload)
+    
+    def put(self, token: str, payload: dict):
+        """Cache a verified payload until the TTL or the token's expiry"""
+        if self.max_size <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        exp = payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> dict:
+        """Current cache size and hit/miss counters"""
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+token_cache = TokenCache()
+
+CallbackMetric("jwt_cache_hits_total", "Token verifications served from the cache", lambda: token_cache.hits, type_name="counter")
+CallbackMetric("jwt_cache_misses_total", "Token verifications that required a full decode", lambda: token_cache.misses, type_name="counter")
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -26,30 +120,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def verify_token(token: str) -> Optional[dict]:
-    """Verify and decode a JWT token"""
+    """Verify and decode a JWT token, using the verified token cache when possible"""
     if not token:
         logger.warning("Token verification failed: token is None or empty")
         return None
     
-    # Log token preview (first 10 and last 10 chars for security)
-    token_preview = f"{token[:10]}...{token[-10:]}" if len(token) > 20 else token[:10]
-    logger.debug(f"Verifying token: {token_preview}")
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.debug(f"Token verified successfully. User ID: {payload.get('sub')}, Email: {payload.get('email')}")
+        logger.debug("Token verified successfully. User ID: %s", payload.get("sub"))
+        token_cache.put(token, payload)
         return payload
     except jwt.ExpiredSignatureError:
-        logger.warning(f"Token verification failed: Token has expired. Token preview: {token_preview}")
-        return None
-    except jwt.DecodeError as e:
-        logger.warning(f"Token verification failed: Decode error - {str(e)}. Token preview: {token_preview}")
+        logger.warning("Token verification failed: Token has expired")
         return None
     except JWTError as e:
-        logger.warning(f"Token verification failed: JWT error - {type(e).__name__}: {str(e)}. Token preview: {token_preview}")
+        logger.warning("Token verification failed: JWT error - %s: %s", type(e).__name__, e)
         return None
     except Exception as e:
-        logger.error(f"Token verification failed: Unexpected error - {type(e).__name__}: {str(e)}. Token preview: {token_preview}")
+        logger.error("Token verification failed: Unexpected error - %s: %s", type(e).__name__, e)
         return None
 
 
@@ -61,3 +153,49 @@ def get_user_id_from_token(token: str) -> Optional[int]:
         return int(user_id) if user_id else None
     return None
 
+
+def extract_bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Return the token from a "Bearer <token>" header value, or None if malformed"""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    return authorization[7:] or None
+
+
+async def get_token_payload(authorization: Optional[str] = Header(None)) -> dict:
+    """FastAPI dependency resolving the verified JWT payload of the request"""
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+    
+    token = extract_bearer_token(authorization)
+    if not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header format. Expected 'Bearer <token>'")
+    
+    payload = verify_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    
+    if not payload.get("sub"):
+        raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    
+    return payload
+
+
+async def get_current_user_id(payload: dict = Depends(get_token_payload)) -> int:
+    """FastAPI dependency resolving the authenticated user ID of the request"""
+    try:
+        return int(payload["sub"])
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token: malformed user ID")
+
+
+def is_admin(payload: dict) -> bool:
+    """Whether a verified token payload belongs to an admin user"""
+    email = payload.get("email")
+    return bool(email) and email.lower() in ADMIN_EMAILS
+
+
+async def require_admin(payload: dict = Depends(get_token_payload)) -> dict:
+    """FastAPI dependency allowing only admin users through"""
+    if not is_admin(payload):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return payload
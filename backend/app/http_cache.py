@@ -0,0 +1,145 @@
+"""
+Conditional GETs and serialized-response caching for per-user REST reads.
+
+Each user row carries a version counter (`User.data_version`) and the time
+it last changed (`User.data_modified_at`); recording an episode bumps both
+in the same commit. A cacheable response is identified by (user, route,
+page, version):
+
+- its ETag and Last-Modified come from the version, so a client
+  revalidating an unchanged resource gets a 304 after a primary-key lookup
+  of the version, without querying or serializing anything else;
+- otherwise its serialized body is served from an LRU of HTTP_CACHE_SIZE
+  responses, and only rebuilt once the version moved.
+
+The cache is per process. Versions live in the database, so every process
+agrees on them and never serves a stale entry.
+"""
+
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.metrics import HTTP_CACHE_BYTES_SAVED, HTTP_CACHE_TOTAL
+from app.models import User
+from app.serialization import dumps
+
+# Serialized responses kept in memory, across all users and pages
+HTTP_CACHE_SIZE = int(os.getenv("HTTP_CACHE_SIZE", "512"))
+# Larger responses are rebuilt on every miss instead of being cached
+HTTP_CACHE_MAX_ENTRY_BYTES = int(os.getenv("HTTP_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+
+# Clients must revalidate, and shared caches must not store per-user data
+CACHE_CONTROL = "private, no-cache"
+
+# (user_id, route, page) -> (version, body), least recently used first
+_responses: "OrderedDict[tuple, Tuple[int, bytes]]" = OrderedDict()
+
+
+def bump_user_version(db: Session, user_id: int):
+    """Mark a user's cacheable responses as changed; takes effect when the caller commits"""
+    db.query(User).filter(User.id == user_id).update(
+        {User.data_version: func.coalesce(User.data_version, 0) + 1, User.data_modified_at: datetime.utcnow()},
+        synchronize_session=False,
+    )
+
+
+def _whole_seconds(value: datetime) -> datetime:
+    """
+    A naive UTC datetime rounded up to the next whole second, as an aware datetime.
+    
+    HTTP dates have one-second resolution. Truncating would let a change made
+    later in the same second compare as not newer than a client's copy.
+    """
+    if value.microsecond:
+        value = value.replace(microsecond=0) + timedelta(seconds=1)
+    return value.replace(tzinfo=timezone.utc)
+
+
+def http_date(value: datetime) -> str:
+    """A naive UTC datetime as an HTTP date, rounded up to the next second"""
+    return format_datetime(_whole_seconds(value), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Whether the request's validators match (If-None-Match takes precedence over If-Modified-Since)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/"x" and "x" match
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return _whole_seconds(last_modified) <= since
+
+
+def cached_json(
+    request: Request,
+    db: Session,
+    user_id: int,
+    route: str,
+    page: str,
+    build: Callable[[], Any],
+) -> Response:
+    """
+    The JSON response for `route` and `page` of a user's data, conditional on its version.
+    
+    `build` runs the queries and returns the content; it is only called
+    when neither the client nor this process holds the current version.
+    """
+    row = db.query(User.data_version, User.data_modified_at, User.created_at).filter(User.id == user_id).first()
+    if row is None:
+        # Let `build` report the missing user the way the endpoint normally would
+        return Response(dumps(build()), media_type="application/json")
+    version = row.data_version or 0
+    last_modified = row.data_modified_at or row.created_at
+    
+    # Weak because GZipMiddleware may re-encode the body
+    etag = f'W/"{route}-{user_id}-{version}-{page}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None and _whole_seconds(last_modified) > datetime.now(timezone.utc):
+        # Still inside the second of the last change: a later change in the same
+        # second would share this date, so leave revalidation to the ETag
+        last_modified = None
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    
+    key = (user_id, route, page)
+    entry = _responses.get(key)
+    if entry is not None and entry[0] != version:
+        del _responses[key]
+        entry = None
+    
+    if is_not_modified(request, etag, last_modified):
+        HTTP_CACHE_TOTAL.labels(route, "not_modified").inc()
+        if entry is not None:
+            HTTP_CACHE_BYTES_SAVED.labels(route, "not_sent").inc(len(entry[1]))
+        return Response(status_code=304, headers=headers)
+    
+    if entry is not None:
+        _responses.move_to_end(key)
+        HTTP_CACHE_TOTAL.labels(route, "hit").inc()
+        HTTP_CACHE_BYTES_SAVED.labels(route, "not_serialized").inc(len(entry[1]))
+        return Response(entry[1], media_type="application/json", headers=headers)
+    
+    HTTP_CACHE_TOTAL.labels(route, "miss").inc()
+    body = dumps(build())
+    if len(body) <= HTTP_CACHE_MAX_ENTRY_BYTES:
+        _responses[key] = (version, body)
+        while len(_responses) > HTTP_CACHE_SIZE:
+            _responses.popitem(last=False)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,116 @@
+"""Logging setup: queue-backed handlers, structured output and sampled access logs."""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+
+# Fraction of successful requests that get an access log line, optionally per route
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_ROUTE_SAMPLE_RATES = os.getenv("ACCESS_LOG_ROUTE_SAMPLE_RATES", "/health=0.0,/metrics=0.0")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields"""
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records without formatting them.
+    
+    The stock QueueHandler merges the message arguments in the calling thread;
+    deferring that to the listener keeps it off the request path.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "path=rate,path=rate" into a dict of per-route sampling rates"""
+    rates = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        path, rate = item.split("=", 1)
+        rates[path.strip()] = float(rate)
+    return rates
+
+
+route_sample_rates = parse_sample_rates(ACCESS_LOG_ROUTE_SAMPLE_RATES)
+
+
+def should_log_access(path: str) -> bool:
+    """Decide whether a successful request to `path` is sampled into the access log"""
+    rate = route_sample_rates.get(path, ACCESS_LOG_SAMPLE_RATE)
+    if rate >= 1.0:
+        return True
+    if rate <= 0.0:
+        return False
+    return random.random() < rate
+
+
+def configure_logging():
+    """
+    Route all records through a queue drained by a background listener thread.
+    
+    Request handlers only pay for enqueuing a record; formatting and the
+    write to stdout happen on the listener thread. Safe to call repeatedly.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(LOG_LEVEL)
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
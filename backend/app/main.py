@@ -1,26 +1,71 @@
+from dotenv import load_dotenv
+
+# Load environment variables from .env file before any module reads its configuration
+load_dotenv()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.routers import auth, episodes, websocket
+from fastapi.middleware.gzip import GZipMiddleware
+from app.agent import ppo_agent
+from app.database import engine, Base, migrate_schema
+from app.logging_config import configure_logging, should_log_access
+from app.metrics import CONTENT_TYPE, HTTP_REQUEST_SECONDS, HTTP_REQUESTS_TOTAL, REGISTRY
+from app.pool import agent_pool, env_pool
+from app.routers import admin, auth, episodes, websocket
+from app.serialization import FastJSONResponse
+from app.workers.manager import worker_manager
+import asyncio
 import logging
 import os
-from dotenv import load_dotenv
+import time
 from datetime import datetime, timezone
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
+
+# Import torch/stable-baselines3 and pre-load pooled agents in the background once the
+# server is up, instead of on the first auto/train session (set ML_WARMUP=false to
+# load them only on demand)
+ML_WARMUP = os.getenv("ML_WARMUP", "true").lower() in ("1", "true", "yes")
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Autonomous Landing Bay RL Environment")
+async def warm_up_ml():
+    """Load the ML stack and fill the agent pool off the event loop thread"""
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(ppo_agent.warm_up)
+        await agent_pool.prefill()
+    except Exception:
+        logger.exception("ML warm-up failed; models will be loaded on demand")
+        return
+    logger.info("ML stack loaded in %.2fs", time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables
+    Base.metadata.create_all(bind=engine)
+    migrate_schema()
+    if worker_manager.enabled:
+        # Simulations run in worker processes, which warm up their own pools
+        await worker_manager.start()
+    else:
+        await env_pool.prefill()
+        if ML_WARMUP:
+            app.state.ml_warmup = asyncio.create_task(warm_up_ml())
+    yield
+    await worker_manager.stop()
+
+
+app = FastAPI(
+    title="Autonomous Landing Bay RL Environment",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS middleware
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
@@ -32,41 +77,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Gzip REST responses larger than GZIP_MIN_SIZE bytes (episode lists, trajectories)
+# for clients that accept it; WebSocket compression is negotiated by the protocol
+# class in app/ws_compression.py
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("GZIP_MIN_SIZE", "1024")),
+    compresslevel=int(os.getenv("GZIP_LEVEL", "6")),
+)
+
 
-# Request logging middleware
+# Request logging and metrics middleware
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """Log all incoming requests, especially useful for debugging CORS preflight"""
-    method = request.method
-    url = str(request.url)
-    headers = dict(request.headers)
-    
-    # Log authorization header preview if present
-    auth_header = headers.get("authorization", "Not present")
-    if auth_header != "Not present":
-        auth_preview = auth_header[:30] + "..." if len(auth_header) > 30 else auth_header
-        logger.info(f"{method} {url} - Authorization: {auth_preview}")
-    else:
-        logger.info(f"{method} {url} - No Authorization header")
+    """Record route latency and emit a single sampled access log line per request"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    duration = time.perf_counter() - started
     
-    # Log CORS preflight requests explicitly
-    if method == "OPTIONS":
-        logger.info(f"CORS preflight request: {url}")
-        origin = headers.get("origin", "Not present")
-        access_control_request_method = headers.get("access-control-request-method", "Not present")
-        access_control_request_headers = headers.get("access-control-request-headers", "Not present")
-        logger.info(f"  Origin: {origin}")
-        logger.info(f"  Access-Control-Request-Method: {access_control_request_method}")
-        logger.info(f"  Access-Control-Request-Headers: {access_control_request_headers}")
+    # Label by route template so metrics and sampling do not depend on path parameters
+    route = getattr(request.scope.get("route"), "path", None)
+    status = response.status_code
+    HTTP_REQUEST_SECONDS.labels(request.method, route or "unmatched").observe(duration)
+    HTTP_REQUESTS_TOTAL.labels(request.method, route or "unmatched", str(status)).inc()
     
-    response = await call_next(request)
-    logger.info(f"{method} {url} - Status: {response.status_code}")
+    if access_logger.isEnabledFor(logging.INFO):
+        path = route or request.url.path
+        if status >= 500 or should_log_access(path):
+            duration_ms = duration * 1000.0
+            access_logger.info(
+                "%s %s %d %.1fms",
+                request.method, path, status, duration_ms,
+                extra={"method": request.method, "path": path, "status": status, "duration_ms": round(duration_ms, 3)},
+            )
     return response
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(episodes.router)
 app.include_router(websocket.router)
+app.include_router(admin.router)
 
 
 @app.get("/health")
@@ -74,3 +124,8 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "ok", "timestamp": datetime.now(timezone.utc).isoformat()}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker process"""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
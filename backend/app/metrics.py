@@ -0,0 +1,240 @@
+"""
+Minimal in-process metrics registry rendered in the Prometheus text format.
+
+Metric updates are plain attribute arithmetic (no locks, no I/O), so they
+are cheap enough to leave on in the simulation hot path. Values are
+per-process; each worker process exposes its own `/metrics`.
+"""
+
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from sub-millisecond physics steps to slow DB commits
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, labelvalues)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer:
+    """Context manager observing the elapsed wall time into a histogram"""
+    
+    __slots__ = ("_histogram", "_started")
+    
+    def __init__(self, histogram: "Histogram"):
+        self._histogram = histogram
+        self._started = 0.0
+    
+    def __enter__(self):
+        self._started = perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._histogram.observe(perf_counter() - self._started)
+        return False
+
+
+class Metric:
+    """Base class for a metric family with optional labels"""
+    
+    type_name = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "Metric"] = {}
+        (registry or REGISTRY).register(self)
+    
+    def labels(self, *labelvalues: str) -> "Metric":
+        """Return the child metric for a combination of label values"""
+        child = self._children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._new_child()
+            self._children[labelvalues] = child
+        return child
+    
+    def _new_child(self) -> "Metric":
+        child = object.__new__(type(self))
+        child._init_value()
+        return child
+    
+    def _init_value(self):
+        raise NotImplementedError
+    
+    def _samples(self, labelvalues: Sequence[str]) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        if self.labelnames:
+            for labelvalues, child in list(self._children.items()):
+                lines.extend(child._render_samples(self.name, self.labelnames, labelvalues))
+        else:
+            lines.extend(self._render_samples(self.name, (), ()))
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing value"""
+    
+    type_name = "counter"
+    
+    def __init__(self, *args, **kwargs):
+        self._init_value()
+        super().__init__(*args, **kwargs)
+    
+    def _init_value(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def _render_samples(self, name, labelnames, labelvalues) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+    
+    type_name = "gauge"
+    
+    def __init__(self, *args, **kwargs):
+        self._init_value()
+        super().__init__(*args, **kwargs)
+    
+    def _init_value(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+    
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def _render_samples(self, name, labelnames, labelvalues) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, labelvalues)} {_format_value(self.value)}"]
+
+
+class Histogram(Metric):
+    """Distribution of observed values over fixed cumulative buckets"""
+    
+    type_name = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(buckets))
+        self._init_value()
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self) -> "Histogram":
+        child = object.__new__(type(self))
+        child.buckets = self.buckets
+        child._init_value()
+        return child
+    
+    def _init_value(self):
+        # One slot per bucket plus the implicit +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def time(self) -> _Timer:
+        """Time a block of code: `with histogram.time(): ...`"""
+        return _Timer(self)
+    
+    def _render_samples(self, name, labelnames, labelvalues) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = 'le="%s"' % _format_value(bound)
+            lines.append(f"{name}_bucket{_format_labels(labelnames, labelvalues, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, labelvalues)} {_format_value(self.sum)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, labelvalues)} {self.count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Metric whose value is read from a callable at scrape time"""
+    
+    def __init__(self, name: str, documentation: str, func: Callable[[], float], type_name: str = "gauge", registry: Optional["Registry"] = None):
+        self.func = func
+        self.type_name = type_name
+        super().__init__(name, documentation, (), registry)
+    
+    def _render_samples(self, name, labelnames, labelvalues) -> List[str]:
+        return [f"{name} {_format_value(float(self.func()))}"]
+
+
+class Registry:
+    """Collection of metric families rendered together"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+    
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Simulation hot paths
+ENV_STEP_SECONDS = Histogram("landing_env_step_seconds", "Time spent in LandingEnv.step")
+AGENT_PREDICT_SECONDS = Histogram("ppo_agent_predict_seconds", "Time spent in PPOAgent.predict")
+MPC_PLAN_SECONDS = Histogram("mpc_plan_seconds", "Time spent planning one MPC autopilot action")
+SEND_STATE_SECONDS = Histogram("websocket_send_state_seconds", "Time spent serializing and sending a state frame")
+EPISODE_COMMIT_SECONDS = Histogram("episode_commit_seconds", "Time spent committing a finished episode")
+ENV_STEPS_TOTAL = Counter("landing_env_steps_total", "Environment steps simulated for WebSocket sessions")
+FRAMES_SENT_TOTAL = Counter("websocket_frames_sent_total", "State frames sent to WebSocket clients")
+EPISODES_TOTAL = Counter("episodes_total", "Finished episodes by outcome", ["outcome"])
+RESIM_SECONDS = Histogram("episode_resimulation_seconds", "Time spent re-simulating a stored episode from its seed and actions")
+RESIM_CACHE_TOTAL = Counter("episode_resimulation_cache_total", "Lookups of re-simulated episodes by result", ["result"])
+HTTP_CACHE_TOTAL = Counter("http_cache_requests_total", "Cacheable REST reads by result (not_modified, hit, miss)", ["route", "result"])
+HTTP_CACHE_BYTES_SAVED = Counter("http_cache_bytes_saved_total", "Response bytes not sent (304s) or not re-serialized (cache hits)", ["route", "reason"])
+
+# Serving
+HTTP_REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency by route", ["method", "route"])
+HTTP_REQUESTS_TOTAL = Counter("http_requests_total", "HTTP requests by route and status", ["method", "route", "status"])
+ACTIVE_WEBSOCKETS = Gauge("websocket_sessions_active", "Open /ws/simulate connections")
+RUNNING_SIMULATIONS = Gauge("simulations_running", "Simulations currently in progress")
@@ -1,6 +1,6 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, JSON, LargeBinary
+from sqlalchemy.orm import deferred, relationship
 from app.database import Base
 
 
@@ -11,6 +11,9 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped with every change to the user's episodes; ETags and cached responses derive from it (app/http_cache.py)
+    data_version = Column(Integer, nullable=True)
+    data_modified_at = Column(DateTime, nullable=True)
     
     episodes = relationship("Episode", back_populates="user")
 
@@ -24,7 +27,18 @@ class Episode(Base):
     success = Column(Boolean, nullable=False)
     fuel_used = Column(Float, nullable=False)
     landing_accuracy = Column(Float, nullable=False)
-    trajectory_data = Column(JSON, nullable=True)  # Full state/action history
+    trajectory_data = Column(JSON, nullable=True)  # State/action history, possibly simplified
+    trajectory_error_bound = Column(Float, nullable=True)  # Max interpolation error as a fraction of channel range
+    trajectory_compression = Column(Float, nullable=True)  # Recorded steps / stored steps
+    # Stored steps packed as fixed-size float32 records (app/replay.py) for range reads; deferred so
+    # listing episodes does not load them
+    trajectory_frames = deferred(Column(LargeBinary, nullable=True))
+    trajectory_steps = Column(Integer, nullable=True)  # Stored step count (frame or action records)
+    # Episodes stored as seed + actions (TRAJECTORY_STORAGE_MODE=actions) are re-simulated on read
+    env_version = Column(Integer, nullable=True)  # landing_env.ENV_VERSION at recording time
+    seed = Column(Integer, nullable=True)  # LandingEnv reset seed
+    actions = deferred(Column(LargeBinary, nullable=True))  # (steps, 2) little-endian float32
+    scenario = Column(String, nullable=True)  # app/rl_env/scenarios.py name; None for episodes from before scenarios
     
     user = relationship("User", back_populates="episodes")
 
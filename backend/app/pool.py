@@ -0,0 +1,235 @@
+"""
+Per-process pools of reusable simulation objects.
+
+Building a `LandingEnv` (gymnasium spaces, numpy bounds) or loading a PPO
+policy is far more expensive than resetting one, so WebSocket sessions
+check objects out of a pool and return them when the episode ends instead
+of constructing fresh ones per `start` message.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Generic, Optional, Tuple, TypeVar
+
+from app.metrics import Counter, Gauge, Histogram
+from app.rl_env.landing_env import LandingEnv
+
+if TYPE_CHECKING:
+    from app.agent.ppo_agent import PPOAgent
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+ENV_POOL_MAX_SIZE = int(os.getenv("ENV_POOL_MAX_SIZE", "64"))
+ENV_POOL_MIN_IDLE = int(os.getenv("ENV_POOL_MIN_IDLE", "4"))
+AGENT_POOL_MAX_SIZE = int(os.getenv("AGENT_POOL_MAX_SIZE", "16"))
+AGENT_POOL_MIN_IDLE = int(os.getenv("AGENT_POOL_MIN_IDLE", "1"))
+# Idle objects beyond the minimum are dropped after this long
+POOL_IDLE_TIMEOUT_SECONDS = float(os.getenv("POOL_IDLE_TIMEOUT_SECONDS", "300"))
+# How long a checkout may wait for an object when the pool is at its maximum size
+POOL_ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("POOL_ACQUIRE_TIMEOUT_SECONDS", "10"))
+
+POOL_CHECKOUTS_TOTAL = Counter(
+    "object_pool_checkouts_total",
+    "Pool checkouts by result (hit = reused idle object, miss = newly built, timeout)",
+    ["pool", "result"],
+)
+POOL_WAIT_SECONDS = Histogram("object_pool_wait_seconds", "Time a checkout waited for an object to be returned", ["pool"])
+POOL_OBJECTS = Gauge("object_pool_objects", "Objects owned by a pool by state", ["pool", "state"])
+
+
+class PoolExhausted(Exception):
+    """Raised when no object became available within the acquire timeout"""
+
+
+class ObjectPool(Generic[T]):
+    """
+    Bounded pool of reusable objects for use from the event loop.
+    
+    `factory` builds a new object (in a worker thread when `build_in_thread`
+    is set, for slow constructors such as model loading). `reset` is called
+    on every returned object to drop per-session state; objects whose reset
+    raises are discarded.
+    At most `max_size` objects exist at once, and idle objects beyond
+    `min_idle` are dropped after `idle_timeout` seconds.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], T],
+        reset: Optional[Callable[[T], object]] = None,
+        max_size: int = 16,
+        min_idle: int = 0,
+        idle_timeout: float = POOL_IDLE_TIMEOUT_SECONDS,
+        acquire_timeout: float = POOL_ACQUIRE_TIMEOUT_SECONDS,
+        build_in_thread: bool = False,
+    ):
+        self.name = name
+        self.factory = factory
+        self.reset = reset
+        self.max_size = max(1, max_size)
+        self.min_idle = min(min_idle, self.max_size)
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.build_in_thread = build_in_thread
+        
+        # (returned_at, object), most recently returned on the right
+        self._idle: Deque[Tuple[float, T]] = deque()
+        self._in_use = 0
+        self._building = 0
+        self._available = asyncio.Condition()
+        self.hits = 0
+        self.misses = 0
+        
+        self._idle_gauge = POOL_OBJECTS.labels(name, "idle")
+        self._in_use_gauge = POOL_OBJECTS.labels(name, "in_use")
+        self._hit_counter = POOL_CHECKOUTS_TOTAL.labels(name, "hit")
+        self._miss_counter = POOL_CHECKOUTS_TOTAL.labels(name, "miss")
+        self._timeout_counter = POOL_CHECKOUTS_TOTAL.labels(name, "timeout")
+        self._wait_histogram = POOL_WAIT_SECONDS.labels(name)
+    
+    @property
+    def size(self) -> int:
+        return len(self._idle) + self._in_use + self._building
+    
+    async def acquire(self) -> T:
+        """Check out an idle object, building one if the pool has room"""
+        self.trim_idle()
+        async with self._available:
+            if not self._idle and self.size >= self.max_size:
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(
+                        self._available.wait_for(lambda: self._idle or self.size < self.max_size),
+                        self.acquire_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    self._timeout_counter.inc()
+                    raise PoolExhausted(f"No {self.name} available, try again shortly")
+                finally:
+                    self._wait_histogram.observe(time.perf_counter() - started)
+            
+            if self._idle:
+                # Most recently returned first, so rarely used objects age out
+                _, obj = self._idle.pop()
+                self._checked_out(obj_built=False)
+                return obj
+            self._building += 1
+        
+        try:
+            obj = await self._build()
+        except BaseException:
+            async with self._available:
+                self._building -= 1
+                self._available.notify()
+            raise
+        self._building -= 1
+        self._checked_out(obj_built=True)
+        return obj
+    
+    async def release(self, obj: T, discard: bool = False):
+        """Reset `obj` and return it to the pool, or drop it when `discard` is set"""
+        self._in_use -= 1
+        self._in_use_gauge.dec()
+        if discard:
+            obj = None
+        elif self.reset is not None:
+            try:
+                self.reset(obj)
+            except Exception:
+                logger.exception("Discarding %s that failed to reset", self.name)
+                obj = None
+        if obj is not None:
+            self._idle.append((time.monotonic(), obj))
+            self._idle_gauge.inc()
+        self.trim_idle()
+        async with self._available:
+            self._available.notify()
+    
+    async def prefill(self, count: Optional[int] = None):
+        """Build objects until `count` (default `min_idle`) are idle"""
+        count = self.min_idle if count is None else min(count, self.max_size)
+        while len(self._idle) < count and self.size < self.max_size:
+            self._building += 1
+            try:
+                obj = await self._build()
+            finally:
+                self._building -= 1
+            self._idle.append((time.monotonic(), obj))
+            self._idle_gauge.inc()
+    
+    def trim_idle(self):
+        """Drop the oldest idle objects that exceeded the idle timeout"""
+        deadline = time.monotonic() - self.idle_timeout
+        while len(self._idle) > self.min_idle and self._idle[0][0] < deadline:
+            self._idle.popleft()
+            self._idle_gauge.dec()
+    
+    def stats(self) -> dict:
+        checkouts = self.hits + self.misses
+        return {
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / checkouts if checkouts else 0.0,
+        }
+    
+    async def _build(self) -> T:
+        if self.build_in_thread:
+            return await asyncio.to_thread(self.factory)
+        return self.factory()
+    
+    def _checked_out(self, obj_built: bool):
+        self._in_use += 1
+        self._in_use_gauge.inc()
+        if obj_built:
+            self.misses += 1
+            self._miss_counter.inc()
+        else:
+            self.hits += 1
+            self._hit_counter.inc()
+            self._idle_gauge.dec()
+
+
+def _load_agent():
+    from app.agent.ppo_agent import SERVE_MODEL_PATH, PPOAgent
+    
+    agent = PPOAgent(SERVE_MODEL_PATH)
+    try:
+        agent.load()
+    except Exception:
+        # Serve random actions rather than failing the session
+        logger.exception("Failed to load PPO model from %s", agent.model_path)
+    return agent
+
+
+def _reset_env(env: LandingEnv):
+    # Sessions may have switched the environment to another scenario. No reset() here:
+    # every checkout resets with its own scenario, and an unseeded reset draws a seed
+    env.use_scenario(None)
+    env.trajectory = []
+
+
+# Shared by every session in this worker process
+env_pool: ObjectPool[LandingEnv] = ObjectPool(
+    "landing_env",
+    LandingEnv,
+    reset=_reset_env,
+    max_size=ENV_POOL_MAX_SIZE,
+    min_idle=ENV_POOL_MIN_IDLE,
+)
+# PPO.load reads the model file and builds torch modules, so agents are built off the event loop
+agent_pool: ObjectPool["PPOAgent"] = ObjectPool(
+    "ppo_agent",
+    _load_agent,
+    max_size=AGENT_POOL_MAX_SIZE,
+    min_idle=AGENT_POOL_MIN_IDLE,
+    build_in_thread=True,
+)
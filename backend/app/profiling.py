@@ -0,0 +1,212 @@
+"""
+On-demand profiling for live simulations.
+
+Nothing here runs unless a capture is requested: sessions without a
+`SessionProfile` skip all timing calls, and process-wide captures only
+exist for the duration of an admin request.
+"""
+
+import asyncio
+import base64
+import contextlib
+import cProfile
+import marshal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Per-episode timing phases reported in the "result" message
+PHASES = ("env_step", "inference", "serialization", "send", "db")
+
+# Phases that always await; cProfile must not stay enabled across an await or it
+# would attribute other sessions' work to this one. Other phases that await in
+# some modes (MPC planning in a thread) pass `awaits=True` to section()
+ASYNC_PHASES = frozenset({"send"})
+
+MAX_CAPTURE_SECONDS = 120.0
+
+# cProfile hooks are per-thread and not re-entrant, so at most one owner at a time:
+# either one process-wide cProfile capture or any number of session profiles.
+# Stack sampling does not install a hook and is not restricted.
+_capture_lock = threading.Lock()
+_process_capture_active = False
+_session_profilers = 0
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profiling capture conflicts with one already running"""
+
+
+class _Section:
+    __slots__ = ("_profile", "_phase", "_awaits", "_started")
+    
+    def __init__(self, profile: "SessionProfile", phase: str, awaits: bool):
+        self._profile = profile
+        self._phase = phase
+        self._awaits = awaits or phase in ASYNC_PHASES
+        self._started = 0.0
+    
+    def __enter__(self):
+        profiler = self._profile.profiler
+        if profiler is not None and not self._awaits:
+            profiler.enable()
+        self._started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._started
+        profiler = self._profile.profiler
+        if profiler is not None and not self._awaits:
+            profiler.disable()
+        self._profile.totals[self._phase] += elapsed
+        self._profile.counts[self._phase] += 1
+        return False
+
+
+class SessionProfile:
+    """
+    Timing breakdown for one WebSocket session, optionally with a cProfile capture.
+    
+    The cProfile hook is only enabled inside synchronous sections, so the
+    resulting stats cover this session's work and nothing else.
+    """
+    
+    def __init__(self, cprofile: bool = False):
+        global _session_profilers
+        self.totals: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.counts: Dict[str, int] = dict.fromkeys(PHASES, 0)
+        self.profiler: Optional[cProfile.Profile] = None
+        if cprofile:
+            with _capture_lock:
+                if _process_capture_active:
+                    raise ProfilerBusy("A process-wide profiling capture is running")
+                _session_profilers += 1
+            self.profiler = cProfile.Profile()
+    
+    def section(self, phase: str, awaits: bool = False) -> _Section:
+        """
+        Time a block of code under one of PHASES: `with profile.section("db"): ...`
+        
+        Blocks that await are timed by wall clock only (`awaits=True`, or a
+        phase in ASYNC_PHASES), without enabling cProfile.
+        """
+        return _Section(self, phase, awaits)
+    
+    def timings(self) -> dict:
+        """Per-phase totals in milliseconds and call counts"""
+        return {
+            phase: {"total_ms": round(self.totals[phase] * 1000.0, 3), "count": self.counts[phase]}
+            for phase in PHASES
+        }
+    
+    def merge(self, timings: dict):
+        """Add a breakdown reported by another process, in the format of `timings()`"""
+        for phase, timing in timings.items():
+            if phase in self.totals:
+                self.totals[phase] += timing["total_ms"] / 1000.0
+                self.counts[phase] += timing["count"]
+    
+    def reset(self):
+        """Start a new episode's breakdown (the cProfile capture keeps accumulating)"""
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(PHASES, 0)
+    
+    def dump_stats(self) -> Optional[bytes]:
+        """Serialized pstats data for the session's cProfile capture, if any"""
+        if self.profiler is None:
+            return None
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+    
+    def profile_message(self) -> Optional[dict]:
+        """WebSocket message carrying the base64-encoded pstats dump, if any"""
+        stats = self.dump_stats()
+        if stats is None:
+            return None
+        return {"type": "profile", "format": "pstats", "encoding": "base64", "data": base64.b64encode(stats).decode("ascii")}
+    
+    def close(self):
+        """Release the session's claim on the cProfile hook"""
+        global _session_profilers
+        if self.profiler is not None:
+            self.profiler = None
+            with _capture_lock:
+                _session_profilers -= 1
+
+
+_NO_SECTION = contextlib.nullcontext()
+
+
+def section(profile: Optional[SessionProfile], phase: str, awaits: bool = False):
+    """Time `phase` on `profile`, or do nothing when the session is not being profiled"""
+    return _NO_SECTION if profile is None else profile.section(phase, awaits)
+
+
+def _claim_process_capture():
+    global _process_capture_active
+    with _capture_lock:
+        if _process_capture_active or _session_profilers:
+            raise ProfilerBusy("Another profiling capture is running")
+        _process_capture_active = True
+
+
+def _release_process_capture():
+    global _process_capture_active
+    with _capture_lock:
+        _process_capture_active = False
+
+
+async def capture_cprofile(seconds: float) -> bytes:
+    """
+    Profile the event loop thread for `seconds` and return pstats data.
+    
+    All simulations and request handlers run on the event loop thread, so
+    this covers every live session in the process.
+    """
+    seconds = min(max(seconds, 0.1), MAX_CAPTURE_SECONDS)
+    _claim_process_capture()
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    finally:
+        _release_process_capture()
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def _frame_stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _sample_stacks(thread_id: int, seconds: float, interval: float) -> str:
+    samples: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            samples[_frame_stack(frame)] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+async def capture_sampling(seconds: float, interval: float = 0.005) -> str:
+    """
+    Sample the event loop thread's stack from a helper thread for `seconds`.
+    
+    Returns collapsed stacks ("frame;frame;frame count" per line), the input
+    format of flamegraph.pl and speedscope. Sampling adds no per-call overhead
+    to the profiled code.
+    """
+    seconds = min(max(seconds, 0.1), MAX_CAPTURE_SECONDS)
+    return await asyncio.to_thread(_sample_stacks, threading.get_ident(), seconds, interval)
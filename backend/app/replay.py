@@ -0,0 +1,354 @@
+"""
+Stored episode formats, and seekable replay over them.
+
+LandingEnv is deterministic given its reset seed and actions, so episodes
+are normally stored as (ENV_VERSION, seed, float32 actions) and their
+states re-simulated on read. The first read re-simulates the whole episode
+once: its terminal state must match the recorded success, fuel used and
+landing accuracy. Only the physics state every RESIM_CHECKPOINT_STEPS steps
+is kept (in an LRU of RESIM_CACHE_SIZE episodes), and a range of steps is
+re-simulated from the checkpoint before it, reading only the actions it
+needs, so ranged reads never hold a whole episode's frames.
+
+Either way, steps are read as fixed-size records of little-endian float32
+(FRAME). Step i starts at byte i * FRAME.itemsize, so the record layout is
+its own step index. Episodes stored with full states (other
+TRAJECTORY_STORAGE_MODEs) keep these records in a blob, and a range of
+steps is read with one SQL substr() without loading the rest.
+`ReplayCursor` walks an episode this way, holding at most
+REPLAY_CHUNK_STEPS frames at a time.
+"""
+
+import logging
+import math
+import os
+from collections import OrderedDict
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.metrics import RESIM_CACHE_TOTAL, RESIM_SECONDS
+from app.models import Episode
+from app.rl_env.landing_env import ENV_VERSION, LandingEnv
+
+logger = logging.getLogger(__name__)
+
+REPLAY_CHUNK_STEPS = int(os.getenv("REPLAY_CHUNK_STEPS", "256"))
+# Episode seconds per wall-clock second; 2.0 matches the pacing of live sessions
+REPLAY_DEFAULT_SPEED = float(os.getenv("REPLAY_DEFAULT_SPEED", "2.0"))
+REPLAY_MIN_SPEED = 0.1
+REPLAY_MAX_SPEED = 20.0
+# Re-simulated episodes whose checkpoints are kept in memory (under 1 KB each for a typical episode)
+RESIM_CACHE_SIZE = int(os.getenv("RESIM_CACHE_SIZE", "128"))
+# Steps between kept physics states; a ranged read re-simulates at most this many steps before its start
+RESIM_CHECKPOINT_STEPS = int(os.getenv("RESIM_CHECKPOINT_STEPS", "256"))
+
+FRAME = np.dtype([
+    ("altitude", "<f4"),
+    ("x", "<f4"),
+    ("vx", "<f4"),
+    ("vy", "<f4"),
+    ("tilt", "<f4"),
+    ("angular_velocity", "<f4"),
+    ("fuel", "<f4"),
+    ("pad_x", "<f4"),
+    ("time", "<f4"),
+    ("thrust", "<f4"),
+    ("angle", "<f4"),
+    ("reward", "<f4"),
+])
+
+STATE_FIELDS = ("altitude", "x", "vx", "vy", "tilt", "angular_velocity", "fuel", "pad_x", "time")
+
+# LandingEnv attributes that step() reads and updates; saved as the objects themselves,
+# since some are numpy float32 and their types affect the arithmetic
+ENV_STEP_STATE = ("altitude", "x", "vx", "vy", "tilt", "angular_velocity", "fuel", "initial_fuel", "pad_x", "time")
+
+ACTION = np.dtype("<f4")
+ACTION_SIZE = 2 * ACTION.itemsize
+
+
+class ResimIndex(NamedTuple):
+    """What is kept of a verified re-simulated episode"""
+    steps: int
+    scenario: Optional[str]
+    # ENV_STEP_STATE values before steps 0, RESIM_CHECKPOINT_STEPS, 2 * RESIM_CHECKPOINT_STEPS, ...
+    checkpoints: List[tuple]
+
+
+# Re-simulated episodes by episode id, least recently used first
+_resimulated: "OrderedDict[int, ResimIndex]" = OrderedDict()
+
+
+class ResimulationError(Exception):
+    """A stored episode cannot be re-simulated, or does not reproduce its recorded outcome"""
+
+
+def parse_speed(value) -> float:
+    """Validate a client-supplied playback speed, clamped to [REPLAY_MIN_SPEED, REPLAY_MAX_SPEED]"""
+    try:
+        speed = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"speed must be a number, got {value!r}")
+    if not np.isfinite(speed):
+        raise ValueError("speed must be finite")
+    return min(max(speed, REPLAY_MIN_SPEED), REPLAY_MAX_SPEED)
+
+
+def pack_frames(steps: List[dict]) -> bytes:
+    """Pack trajectory steps ({"state", "action", "reward"}) into FRAME records"""
+    frames = np.zeros(len(steps), dtype=FRAME)
+    for i, step in enumerate(steps):
+        state = step["state"]
+        action = step.get("action") or (0.0, 0.0)
+        frames[i] = (*(state.get(name, 0.0) for name in STATE_FIELDS), action[0], action[1], step.get("reward", 0.0))
+    return frames.tobytes()
+
+
+def unpack_frames(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=FRAME)
+
+
+def pack_actions(steps: List[dict]) -> bytes:
+    """The actions of trajectory steps as (steps, 2) little-endian float32"""
+    return np.array([step["action"] for step in steps], dtype="<f4").reshape(-1, 2).tobytes()
+
+
+def unpack_actions(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=ACTION).reshape(-1, 2)
+
+
+def landing_accuracy(x: float, pad_x: float) -> float:
+    """Inverse distance from the pad at the end of an episode, max 1.0"""
+    return 1.0 / (1.0 + abs(x - pad_x))
+
+
+def _make_env(scenario: Optional[str]) -> LandingEnv:
+    try:
+        return LandingEnv(record_trajectory=False, scenario=scenario)
+    except ValueError as e:
+        raise ResimulationError(str(e))
+
+
+def _simulate(env: LandingEnv, actions: np.ndarray, first: int, steps: int) -> Iterator[Tuple[int, tuple, dict]]:
+    """
+    Step `env` (in its state before step `first`) through `actions`, yielding (step index, FRAME values, info).
+    
+    Steps without trajectory recording, so the cost is linear in the number
+    of actions. `steps` is the episode's length, which it must end at.
+    """
+    for i, action in enumerate(actions, first):
+        _, reward, terminated, truncated, info = env.step(action)
+        if (terminated or truncated) != (i == steps - 1):
+            raise ResimulationError(f"Episode ends at step {i} on re-simulation, but {steps} actions were recorded")
+        yield i, (
+            env.altitude, env.x, env.vx, env.vy, env.tilt, env.angular_velocity,
+            env.fuel, env.pad_x, env.time, action[0], action[1], reward,
+        ), info
+
+
+def resimulate(seed: int, actions: np.ndarray, scenario: Optional[str] = None, checkpoints: Optional[List[tuple]] = None) -> Tuple[np.ndarray, dict]:
+    """
+    Replay `actions` from a reset of `scenario` with `seed`; returns (FRAME records, final step info).
+    
+    With a `checkpoints` list, also appends the env's ENV_STEP_STATE before
+    every RESIM_CHECKPOINT_STEPS-th step to it.
+    """
+    if not len(actions):
+        raise ResimulationError("Episode has no recorded actions")
+    env = _make_env(scenario)
+    env.reset(seed=seed)
+    frames = np.zeros(len(actions), dtype=FRAME)
+    info = {}
+    if checkpoints is not None:
+        checkpoints.append(tuple(getattr(env, name) for name in ENV_STEP_STATE))
+    for i, frame, info in _simulate(env, actions, 0, len(actions)):
+        frames[i] = frame
+        if checkpoints is not None and (i + 1) % RESIM_CHECKPOINT_STEPS == 0 and i + 1 < len(actions):
+            checkpoints.append(tuple(getattr(env, name) for name in ENV_STEP_STATE))
+    info["landing_accuracy"] = landing_accuracy(env.x, env.pad_x)
+    return frames, info
+
+
+def verify_outcome(info: dict, success: bool, fuel_used: float, accuracy: float):
+    """Raise ResimulationError unless a re-simulated outcome matches the recorded one"""
+    # Some state is float32, and summaries relayed from workers are rounded to its shortest repr
+    tolerance = {"rel_tol": 1e-6, "abs_tol": 1e-6}
+    mismatched = [
+        name for name, ok in (
+            ("success", bool(info["success"]) == bool(success)),
+            ("fuel_used", math.isclose(info["fuel_used"], fuel_used, **tolerance)),
+            ("landing_accuracy", math.isclose(info["landing_accuracy"], accuracy, **tolerance)),
+        ) if not ok
+    ]
+    if mismatched:
+        raise ResimulationError(f"Re-simulated terminal state does not match the recorded {', '.join(mismatched)}")
+
+
+def _resimulate_episode(db: Session, episode_id: int) -> Tuple[ResimIndex, np.ndarray]:
+    """Re-simulate and verify a whole episode stored as seed and actions, caching its ResimIndex"""
+    row = db.query(
+        Episode.env_version, Episode.seed, Episode.actions, Episode.scenario, Episode.success, Episode.fuel_used, Episode.landing_accuracy
+    ).filter(Episode.id == episode_id).one()
+    if row.env_version != ENV_VERSION:
+        raise ResimulationError(f"Episode was recorded with environment version {row.env_version}, this server runs {ENV_VERSION}")
+    actions = unpack_actions(row.actions)
+    checkpoints = []
+    with RESIM_SECONDS.time():
+        records, info = resimulate(row.seed, actions, row.scenario, checkpoints)
+    try:
+        verify_outcome(info, row.success, row.fuel_used, row.landing_accuracy)
+    except ResimulationError:
+        logger.warning("Episode %s does not reproduce its recorded outcome", episode_id)
+        raise
+    
+    index = _resimulated[episode_id] = ResimIndex(len(actions), row.scenario, checkpoints)
+    while len(_resimulated) > RESIM_CACHE_SIZE:
+        _resimulated.popitem(last=False)
+    return index, records
+
+
+def resimulation_index(db: Session, episode_id: int) -> ResimIndex:
+    """Checkpoints of an episode stored as seed and actions, re-simulated and verified on first use"""
+    index = _resimulated.get(episode_id)
+    if index is not None:
+        _resimulated.move_to_end(episode_id)
+        RESIM_CACHE_TOTAL.labels("hit").inc()
+        return index
+    RESIM_CACHE_TOTAL.labels("miss").inc()
+    return _resimulate_episode(db, episode_id)[0]
+
+
+def resimulated_frames(db: Session, episode_id: int) -> bytes:
+    """
+    Packed frames of a whole episode stored as seed and actions.
+    
+    Always re-simulates from the seed; use read_frames() for a range.
+    """
+    if episode_id in _resimulated:
+        return _read_resimulated(db, episode_id, 0, _resimulated[episode_id].steps).tobytes()
+    RESIM_CACHE_TOTAL.labels("miss").inc()
+    return _resimulate_episode(db, episode_id)[1].tobytes()
+
+
+def _read_resimulated(db: Session, episode_id: int, start: int, count: int) -> np.ndarray:
+    """Frames [start, start + count) re-simulated from the checkpoint before `start`"""
+    index = resimulation_index(db, episode_id)
+    end = min(start + count, index.steps)
+    if start >= end:
+        return np.zeros(0, dtype=FRAME)
+    first = start // RESIM_CHECKPOINT_STEPS * RESIM_CHECKPOINT_STEPS
+    blob = db.query(
+        func.substr(Episode.actions, first * ACTION_SIZE + 1, (end - first) * ACTION_SIZE)
+    ).filter(Episode.id == episode_id).scalar()
+    
+    env = _make_env(index.scenario)
+    for name, value in zip(ENV_STEP_STATE, index.checkpoints[first // RESIM_CHECKPOINT_STEPS]):
+        setattr(env, name, value)
+    frames = np.zeros(end - start, dtype=FRAME)
+    for i, frame, _ in _simulate(env, unpack_actions(bytes(blob or b"")), first, index.steps):
+        if i >= start:
+            frames[i - start] = frame
+    return frames
+
+
+def frame_state(frame) -> dict:
+    """A frame as the state dict live sessions send (LandingEnv.get_state_dict)"""
+    return {
+        "altitude": float(frame["altitude"]),
+        "x": float(frame["x"]),
+        "velocity": [float(frame["vx"]), float(frame["vy"])],
+        "tilt": float(frame["tilt"]),
+        "angular_velocity": float(frame["angular_velocity"]),
+        "fuel": float(frame["fuel"]),
+        "pad_x": float(frame["pad_x"]),
+        "time": float(frame["time"]),
+    }
+
+
+def frame_step(frame) -> dict:
+    """A frame in the stored trajectory step format"""
+    return {
+        "state": {name: float(frame[name]) for name in STATE_FIELDS},
+        "action": [float(frame["thrust"]), float(frame["angle"])],
+        "reward": float(frame["reward"]),
+    }
+
+
+def episode_frame_count(db: Session, episode_id: int, user_id: int) -> Optional[int]:
+    """
+    Number of stored frames of one of the user's episodes, or None if there is no such episode.
+    
+    Episodes stored as seed and actions are re-simulated (and verified) here,
+    so a ResimulationError surfaces before any frames are read. Episodes
+    saved before frames were stored are packed from their JSON trajectory
+    on first use.
+    """
+    row = db.query(Episode.trajectory_steps, Episode.seed).filter(Episode.id == episode_id, Episode.user_id == user_id).first()
+    if row is None:
+        return None
+    if row.seed is not None:
+        return resimulation_index(db, episode_id).steps
+    if row.trajectory_steps is not None:
+        return row.trajectory_steps
+    
+    episode = db.query(Episode).filter(Episode.id == episode_id).first()
+    steps = episode.trajectory_data or []
+    episode.trajectory_frames = pack_frames(steps)
+    episode.trajectory_steps = len(steps)
+    db.commit()
+    return len(steps)
+
+
+def read_frames(db: Session, episode_id: int, start: int, count: int) -> np.ndarray:
+    """Frames [start, start + count) of an episode, read with substr() (offsets are 1-based in SQL)"""
+    if count <= 0:
+        return np.zeros(0, dtype=FRAME)
+    if episode_id in _resimulated or db.query(Episode.seed).filter(Episode.id == episode_id).scalar() is not None:
+        return _read_resimulated(db, episode_id, start, count)
+    blob = db.query(
+        func.substr(Episode.trajectory_frames, start * FRAME.itemsize + 1, count * FRAME.itemsize)
+    ).filter(Episode.id == episode_id).scalar()
+    return unpack_frames(bytes(blob or b""))
+
+
+class ReplayCursor:
+    """Position in a stored episode, with a window of at most `chunk` decoded frames"""
+    
+    def __init__(self, db: Session, episode_id: int, total: int, chunk: int = REPLAY_CHUNK_STEPS):
+        self.db = db
+        self.episode_id = episode_id
+        self.total = total
+        self.chunk = chunk
+        self.position = 0
+        self._window_start = 0
+        self._window = np.zeros(0, dtype=FRAME)
+    
+    @property
+    def finished(self) -> bool:
+        return self.position >= self.total
+    
+    def seek(self, step: int):
+        self.position = min(max(0, step), self.total)
+    
+    def _frame(self, index: int):
+        if not self._window_start <= index < self._window_start + len(self._window):
+            self._window_start = index
+            self._window = read_frames(self.db, self.episode_id, index, min(self.chunk, self.total - index))
+        return self._window[index - self._window_start]
+    
+    def peek(self):
+        """Frame at the current position without advancing (the last frame once finished)"""
+        return self._frame(min(self.position, self.total - 1))
+    
+    def next(self) -> Tuple[int, object, Optional[float]]:
+        """(step index, frame, seconds of episode time until the following frame or None at the end)"""
+        index = self.position
+        frame = self._frame(index)
+        self.position += 1
+        gap = None
+        if self.position < self.total:
+            gap = float(self._frame(self.position)["time"] - frame["time"])
+        return index, frame, gap
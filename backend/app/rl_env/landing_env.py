@@ -1,7 +1,14 @@
 import gymnasium as gym
 from gymnasium import spaces
+import math
 import numpy as np
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional, Union
+
+from app.rl_env.scenarios import ResetBank, Scenario, get_scenario
+
+# Bump whenever dynamics, reward or reset change, so episodes stored as seed + actions
+# are not re-simulated with different physics
+ENV_VERSION = 1
 
 
 class LandingEnv(gym.Env):
@@ -10,23 +17,27 @@ class LandingEnv(gym.Env):
     
     A rocket descends from orbit toward a moving landing pad.
     Goal: Land softly and upright before fuel runs out.
+    
+    Physics constants and initial state ranges come from a Scenario
+    (app/rl_env/scenarios.py). With a `reset_bank`, unseeded resets take the
+    bank's states in turn, and `reset(options={"bank_index": i})` takes state i.
     """
     
     metadata = {"render_modes": ["human"], "render_fps": 30}
     
-    def __init__(self):
+    def __init__(
+        self,
+        record_trajectory: bool = True,
+        early_termination: bool = False,
+        scenario: Union[str, Scenario, None] = None,
+        reset_bank: Optional[ResetBank] = None,
+    ):
         super().__init__()
         
-        # Environment parameters
-        self.gravity = 9.81  # m/s^2
-        self.max_thrust = 30.0  # N
-        self.max_fuel = 100.0  # fuel units
-        self.mass = 1000.0  # kg
-        self.moment_of_inertia = 1000.0  # kg*m^2
-        
-        # Landing pad parameters (sinusoidal movement)
-        self.pad_amplitude = 50.0  # m
-        self.pad_period = 20.0  # seconds
+        # Per-step history is only needed when episodes are persisted or replayed
+        self.record_trajectory = record_trajectory
+        # End episodes as soon as an upright touchdown is out of reach (see _landing_feasible)
+        self.early_termination = early_termination
         
         # World boundaries
         self.max_altitude = 500.0  # m
@@ -37,12 +48,13 @@ class LandingEnv(gym.Env):
         self.max_landing_tilt = 0.1  # radians (~6 degrees)
         self.landing_radius = 5.0  # m
         
-        # Observation space: [altitude, vx, vy, tilt, angular_velocity, fuel, pad_x]
-        self.observation_space = spaces.Box(
-            low=np.array([0, -50, -50, -np.pi, -5, 0, -self.max_horizontal]),
-            high=np.array([self.max_altitude, 50, 50, np.pi, 5, self.max_fuel, self.max_horizontal]),
-            dtype=np.float32
-        )
+        # Added to the reward of the step an episode is ended as infeasible, like a crash
+        self.infeasible_penalty = -500.0
+        
+        # Physics constants, initial state ranges and the observation space
+        self.use_scenario(scenario if reset_bank is None else reset_bank.scenario)
+        self.reset_bank = reset_bank
+        self._bank_cursor = 0
         
         # Action space: [thrust_magnitude (0-1), thrust_angle (-1 to 1)]
         self.action_space = spaces.Box(
@@ -59,23 +71,66 @@ class LandingEnv(gym.Env):
         self.tilt = 0.0
         self.angular_velocity = 0.0
         self.fuel = 0.0
+        self.initial_fuel = 0.0
         self.pad_x = 0.0
         self.time = 0.0
         
         # Episode tracking
         self.trajectory = []
+        # Seed of the current episode; unseeded resets draw one from _seed_source so the
+        # episode can be reproduced from its seed and actions
+        self.episode_seed = None
+        self._seed_source = np.random.default_rng()
+    
+    def use_scenario(self, scenario: Union[str, Scenario, None]):
+        """Switch to a scenario's physics and initial state ranges (takes effect from the next reset)"""
+        scenario = get_scenario(scenario)
+        if getattr(self, "reset_bank", None) is not None and self.reset_bank.scenario != scenario:
+            raise ValueError(f"Reset bank is for scenario {self.reset_bank.scenario.name!r}, not {scenario.name!r}")
+        if getattr(self, "scenario", None) is scenario:
+            return
+        self.scenario = scenario
+        self.gravity = scenario.gravity
+        self.max_thrust = scenario.max_thrust
+        self.max_fuel = scenario.max_fuel
+        self.mass = scenario.mass
+        self.moment_of_inertia = scenario.moment_of_inertia
+        # Landing pad parameters (sinusoidal movement)
+        self.pad_amplitude = scenario.pad_amplitude
+        self.pad_period = scenario.pad_period
+        self._reset_ranges = [tuple(map(float, bounds)) for bounds in scenario.reset_ranges()]
         
+        # Observation space: [altitude, vx, vy, tilt, angular_velocity, fuel, pad_x]
+        self.observation_space = spaces.Box(
+            low=np.array([0, -50, -50, -np.pi, -5, 0, -self.max_horizontal]),
+            high=np.array([self.max_altitude, 50, 50, np.pi, 5, self.max_fuel, self.max_horizontal]),
+            dtype=np.float32
+        )
+    
     def reset(self, seed=None, options=None):
-        super().reset(seed=seed)
-        
-        # Random initial state
-        self.altitude = self.np_random.uniform(200, self.max_altitude)
-        self.x = self.np_random.uniform(-self.max_horizontal * 0.5, self.max_horizontal * 0.5)
-        self.vx = self.np_random.uniform(-10, 10)
-        self.vy = self.np_random.uniform(-5, 0)
-        self.tilt = self.np_random.uniform(-0.5, 0.5)
-        self.angular_velocity = self.np_random.uniform(-0.5, 0.5)
-        self.fuel = self.max_fuel
+        options = options or {}
+        if "bank_index" in options and self.reset_bank is None:
+            raise ValueError("bank_index requires a reset_bank")
+        if "bank_index" in options or (seed is None and self.reset_bank is not None):
+            # Precomputed initial state; nothing is drawn
+            index = options.get("bank_index", self._bank_cursor)
+            self._bank_cursor = (index + 1) % len(self.reset_bank)
+            initial = self.reset_bank[index]
+            self.episode_seed = None
+            super().reset()
+        else:
+            if seed is None:
+                seed = int(self._seed_source.integers(2**31))
+            else:
+                # Keeps sequences of resets after a seeded one reproducible
+                self._seed_source = np.random.default_rng(seed)
+            self.episode_seed = seed
+            super().reset(seed=seed)
+            # Random initial state, drawn in RESET_FIELDS order
+            initial = [self.np_random.uniform(low, high) for low, high in self._reset_ranges]
+        
+        self.altitude, self.x, self.vx, self.vy, self.tilt, self.angular_velocity = (float(value) for value in initial)
+        self.fuel = self.initial_fuel = self.scenario.start_fuel
         self.pad_x = 0.0
         self.time = 0.0
         self.trajectory = []
@@ -88,6 +143,9 @@ class LandingEnv(gym.Env):
     def step(self, action):
         dt = 0.1  # timestep in seconds
         
+        # Actions are float32 (the action space dtype), so stored actions replay exactly
+        action = np.asarray(action, dtype=np.float32)
+        
         # Parse action
         thrust_magnitude = np.clip(action[0], 0.0, 1.0)
         thrust_angle = np.clip(action[1], -1.0, 1.0)
@@ -168,33 +226,111 @@ class LandingEnv(gym.Env):
         if self.fuel <= 0 and self.altitude > 0:
             truncated = True
         
+        # Optionally end episodes that can no longer succeed, as if they had crashed
+        infeasible = self.early_termination and not (terminated or truncated) and not self._landing_feasible()
+        if infeasible:
+            terminated = True
+            reward += self.infeasible_penalty
+        
         # Store trajectory
-        state = {
-            'altitude': float(self.altitude),
-            'x': float(self.x),
-            'vx': float(self.vx),
-            'vy': float(self.vy),
-            'tilt': float(self.tilt),
-            'angular_velocity': float(self.angular_velocity),
-            'fuel': float(self.fuel),
-            'pad_x': float(self.pad_x),
-            'time': float(self.time)
-        }
-        self.trajectory.append({
-            'state': state,
-            'action': action.tolist(),
-            'reward': float(reward)
-        })
+        if self.record_trajectory:
+            state = {
+                'altitude': float(self.altitude),
+                'x': float(self.x),
+                'vx': float(self.vx),
+                'vy': float(self.vy),
+                'tilt': float(self.tilt),
+                'angular_velocity': float(self.angular_velocity),
+                'fuel': float(self.fuel),
+                'pad_x': float(self.pad_x),
+                'time': float(self.time)
+            }
+            self.trajectory.append({
+                'state': state,
+                'action': action.tolist(),
+                'reward': float(reward)
+            })
         
         observation = self._get_observation()
+        success = terminated and self.altitude <= 0 and abs(self.tilt) < self.max_landing_tilt
         info = {
-            'success': terminated and self.altitude <= 0 and abs(self.tilt) < self.max_landing_tilt,
-            'fuel_used': self.max_fuel - self.fuel,
-            'trajectory': self.trajectory.copy()
+            'success': success,
+            'fuel_used': self.initial_fuel - self.fuel,
+            'trajectory': self.trajectory.copy() if self.record_trajectory else [],
+            'termination_reason': 'infeasible' if infeasible else self._termination_reason(success, terminated, truncated),
+            'seed': self.episode_seed,
+            'scenario': self.scenario.name
         }
         
         return observation, reward, terminated, truncated, info
     
+    def _termination_reason(self, success, terminated, truncated):
+        """Why the episode ended: landed, crash, out_of_bounds or fuel_depleted (None while running; step() adds infeasible)"""
+        if not (terminated or truncated):
+            return None
+        if self.altitude <= 0:
+            return 'landed' if success else 'crash'
+        if abs(self.x) > self.max_horizontal or self.altitude > self.max_altitude:
+            return 'out_of_bounds'
+        return 'fuel_depleted'
+    
+    def _landing_feasible(self) -> bool:
+        """
+        Whether an upright touchdown inside the world can still happen under some sequence of actions.
+        
+        Returns False only when that is provably impossible. Over n more steps of
+        the semi-implicit Euler update in step(), per-step accelerations of at most
+        `a` move a position by at most a * dt^2 * n(n+1)/2, which bounds altitude,
+        x and tilt exactly. The checks are:
+        - the window of steps in which touchdown can occur
+        - that no tilt reachable in that window is within max_landing_tilt of upright
+          (the criterion of info['success'])
+        - whether x must leave the world before the earliest touchdown
+        Touchdown speed and distance to the pad are not checked. Thrust is at most
+        max_thrust / mass = 0.03 m/s^2 against 9.81 m/s^2 of gravity, so a descent
+        can never be arrested, and those criteria would rule out every episode.
+        """
+        dt = 0.1
+        thrust_accel = self.max_thrust / self.mass
+        angular_accel = self.max_thrust * 0.1 / self.moment_of_inertia
+        min_fall_accel = self.gravity - thrust_accel
+        if min_fall_accel <= 0 or self.altitude <= 0:
+            return True
+        
+        def steps_to_ground(fall_accel):
+            # Smallest n with altitude + n*dt*vy - fall_accel*dt^2*n(n+1)/2 <= 0
+            a = fall_accel * dt * dt / 2
+            b = a - dt * self.vy
+            return (-b + math.sqrt(b * b + 4 * a * self.altitude)) / (2 * a)
+        
+        # Widened by a step each way against rounding
+        first = max(1, math.ceil(steps_to_ground(self.gravity + thrust_accel)) - 1)
+        last = math.ceil(steps_to_ground(min_fall_accel)) + 1
+        # Without fuel the dynamics change (no control, damped rotation); make no claim
+        if self.fuel <= last * dt * 0.5:
+            return True
+        
+        spread = lambda n: dt * dt * n * (n + 1) / 2
+        upright = False
+        for n in range(first, last + 1):
+            tilt = self.tilt + n * dt * self.angular_velocity
+            # Distance to the nearest upright (multiple of 2*pi) orientation
+            offset = abs(tilt - 2 * math.pi * round(tilt / (2 * math.pi)))
+            if offset <= angular_accel * spread(n) + self.max_landing_tilt + 1e-9:
+                upright = True
+                break
+        if not upright:
+            return False
+        
+        # Distance beyond the boundary the rocket must reach at step k (k < first) is concave in k;
+        # check the ends of the range and the steps either side of its peak
+        for side in (1.0, -1.0):
+            peak = side * self.vx / (thrust_accel * dt) - 0.5
+            for k in {1, first - 1, math.floor(peak), math.ceil(peak)}:
+                if 1 <= k < first and side * (self.x + k * dt * self.vx) - thrust_accel * spread(k) > self.max_horizontal + 1e-9:
+                    return False
+        return True
+    
     def _get_observation(self):
         """Get current observation"""
         return np.array([
@@ -0,0 +1,114 @@
+"""
+Named LandingEnv workloads.
+
+A Scenario fixes the physics constants and the uniform ranges initial
+states are drawn from. `LandingEnv(scenario=...)` takes a registered name
+or a Scenario. "default" reproduces the original environment exactly, so
+seeded resets and stored episodes are unaffected.
+
+A ResetBank holds a scenario's initial states for many episodes, drawn at
+once from one recorded seed. Batched environments (evaluation, training
+actors) reset by indexing it instead of drawing each state value through
+the environment's RNG.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+# Initial state values drawn on reset, in the order LandingEnv.reset draws them
+RESET_FIELDS = ("altitude", "x", "vx", "vy", "tilt", "angular_velocity")
+
+Range = Tuple[float, float]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str = ""
+    
+    # Physics
+    gravity: float = 9.81  # m/s^2
+    max_thrust: float = 30.0  # N
+    mass: float = 1000.0  # kg
+    moment_of_inertia: float = 1000.0  # kg*m^2
+    max_fuel: float = 100.0  # fuel units
+    initial_fuel: Optional[float] = None  # defaults to max_fuel
+    pad_amplitude: float = 50.0  # m
+    pad_period: float = 20.0  # seconds
+    
+    # Uniform ranges of the initial state
+    altitude: Range = (200.0, 500.0)
+    x: Range = (-100.0, 100.0)
+    vx: Range = (-10.0, 10.0)
+    vy: Range = (-5.0, 0.0)
+    tilt: Range = (-0.5, 0.5)
+    angular_velocity: Range = (-0.5, 0.5)
+    
+    @property
+    def start_fuel(self) -> float:
+        return self.max_fuel if self.initial_fuel is None else self.initial_fuel
+    
+    def reset_ranges(self) -> np.ndarray:
+        """(len(RESET_FIELDS), 2) array of (low, high)"""
+        return np.array([getattr(self, name) for name in RESET_FIELDS], dtype=np.float64)
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def register(scenario: Scenario) -> Scenario:
+    SCENARIOS[scenario.name] = scenario
+    return scenario
+
+
+def get_scenario(scenario: Union[str, Scenario, None]) -> Scenario:
+    """A Scenario by name (None means "default"); Scenario instances pass through"""
+    if isinstance(scenario, Scenario):
+        return scenario
+    try:
+        return SCENARIOS[scenario or "default"]
+    except KeyError:
+        raise ValueError(f"Unknown scenario {scenario!r}, expected one of {', '.join(SCENARIOS)}")
+
+
+DEFAULT_SCENARIO = register(Scenario("default", "The original environment"))
+register(Scenario(
+    "calm",
+    "Starts nearly upright with little drift or spin",
+    vx=(-2.0, 2.0),
+    vy=(-2.0, 0.0),
+    tilt=(-0.05, 0.05),
+    angular_velocity=(-0.02, 0.02),
+))
+register(Scenario(
+    "windy-pad",
+    "The pad swings twice as far, three times as fast, and the rocket starts with more sideways drift",
+    pad_amplitude=100.0,
+    pad_period=20.0 / 3,
+    vx=(-15.0, 15.0),
+))
+register(Scenario(
+    "low-fuel",
+    "Starts with 5% of a full tank",
+    initial_fuel=5.0,
+))
+
+
+class ResetBank:
+    """Initial states of `size` episodes of a scenario, drawn together from `seed`"""
+    
+    def __init__(self, scenario: Union[str, Scenario, None], size: int, seed: int):
+        self.scenario = get_scenario(scenario)
+        self.seed = seed
+        ranges = self.scenario.reset_ranges()
+        rng = np.random.default_rng(seed)
+        # (size, len(RESET_FIELDS))
+        self.states = rng.uniform(ranges[:, 0], ranges[:, 1], size=(size, len(RESET_FIELDS)))
+    
+    def __len__(self) -> int:
+        return len(self.states)
+    
+    def __getitem__(self, index: int) -> np.ndarray:
+        return self.states[index]
@@ -0,0 +1,124 @@
+"""
+Vectorized LandingEnv dynamics and reward.
+
+`LandingDynamics` advances a batch of states at once with NumPy, following
+LandingEnv.step and LandingEnv._calculate_reward operation for operation,
+so planners can score hundreds of candidate action sequences per control
+step. A batch is a float64 array of shape (STATE_SIZE, n), one row per
+field in STATE_FIELDS, which keeps every field contiguous in memory.
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+from app.rl_env.landing_env import LandingEnv
+
+STATE_FIELDS = ("altitude", "x", "vx", "vy", "tilt", "angular_velocity", "fuel", "pad_x", "time")
+STATE_SIZE = len(STATE_FIELDS)
+ALTITUDE, X, VX, VY, TILT, ANGULAR_VELOCITY, FUEL, PAD_X, TIME = range(STATE_SIZE)
+
+# LandingEnv.step's fixed timestep
+DT = 0.1
+
+
+class LandingDynamics:
+    """Batched copy of one LandingEnv's physics and reward"""
+    
+    def __init__(self, env: LandingEnv):
+        self.gravity = env.gravity
+        self.max_thrust = env.max_thrust
+        self.mass = env.mass
+        self.moment_of_inertia = env.moment_of_inertia
+        self.pad_amplitude = env.pad_amplitude
+        self.pad_period = env.pad_period
+        self.max_altitude = env.max_altitude
+        self.max_horizontal = env.max_horizontal
+        self.max_landing_velocity = env.max_landing_velocity
+        self.max_landing_tilt = env.max_landing_tilt
+        self.landing_radius = env.landing_radius
+    
+    @staticmethod
+    def state_from_env(env: LandingEnv) -> np.ndarray:
+        """The environment's current state as a (STATE_SIZE,) vector"""
+        return np.array([getattr(env, name) for name in STATE_FIELDS], dtype=np.float64)
+    
+    def step(self, states: np.ndarray, thrust: np.ndarray, angle: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Advance `states` in place by one timestep.
+        
+        `thrust` and `angle` hold one action component per state. Returns
+        (reward, terminated, truncated) arrays with the same meaning as
+        LandingEnv.step.
+        """
+        altitude, x, vx, vy, tilt, angular_velocity, fuel, pad_x, t = states
+        thrust_magnitude = np.clip(thrust, 0.0, 1.0)
+        thrust_angle = np.clip(angle, -1.0, 1.0)
+        
+        force = thrust_magnitude * self.max_thrust
+        np.maximum(fuel - thrust_magnitude * DT * 0.5, 0.0, out=fuel)
+        has_fuel = fuel > 0
+        
+        direction = tilt + thrust_angle * 0.5
+        thrust_x = force * np.sin(direction)
+        thrust_y = force * np.cos(direction)
+        fx = np.where(has_fuel, thrust_x, 0.0)
+        fy = np.where(has_fuel, thrust_y - self.gravity * self.mass, -self.gravity * self.mass)
+        torque = thrust_x * 0.1 * thrust_angle
+        
+        vx += (fx / self.mass) * DT
+        vy += (fy / self.mass) * DT
+        # Out of fuel, rotation is damped instead of driven
+        angular_velocity[:] = np.where(has_fuel, angular_velocity + (torque / self.moment_of_inertia) * DT, angular_velocity * 0.99)
+        
+        x += vx * DT
+        altitude += vy * DT
+        tilt += angular_velocity * DT
+        tilt[:] = np.arctan2(np.sin(tilt), np.cos(tilt))
+        
+        pad_x[:] = self.pad_amplitude * np.sin(2 * np.pi * t / self.pad_period)
+        t += DT
+        
+        # Reward, in the same order as LandingEnv._calculate_reward
+        distance_to_pad = np.abs(x - pad_x)
+        velocity_magnitude = np.sqrt(vx**2 + vy**2)
+        abs_tilt = np.abs(tilt)
+        reward = -thrust_magnitude * 0.1
+        reward -= distance_to_pad * 0.01
+        reward -= velocity_magnitude * 0.1
+        reward -= abs_tilt * 0.5
+        
+        terminated = altitude <= 0
+        landed = (
+            (distance_to_pad < self.landing_radius)
+            & (velocity_magnitude < self.max_landing_velocity)
+            & (abs_tilt < self.max_landing_tilt)
+        )
+        reward += np.where(terminated, np.where(landed, 1000.0, -500.0), 0.0)
+        
+        truncated = (
+            (altitude < 0)
+            | (np.abs(x) > self.max_horizontal)
+            | (altitude > self.max_altitude)
+            | ((fuel <= 0) & (altitude > 0))
+        )
+        return reward, terminated, truncated
+    
+    def rollout(self, state: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """
+        Total reward of each action sequence played from `state`.
+        
+        `actions` has shape (n, horizon, 2). Rewards stop accumulating once a
+        sequence's episode terminates or is truncated.
+        """
+        count, horizon, _ = actions.shape
+        states = np.repeat(state[:, None], count, axis=1)
+        returns = np.zeros(count)
+        alive = np.ones(count, dtype=bool)
+        for step in range(horizon):
+            reward, terminated, truncated = self.step(states, actions[:, step, 0], actions[:, step, 1])
+            returns += np.where(alive, reward, 0.0)
+            alive &= ~(terminated | truncated)
+            if not alive.any():
+                break
+        return returns
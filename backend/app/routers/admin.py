@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import Response
+from datetime import datetime, timezone
+from typing import Optional
+from app.agent.evaluation import EVAL_BANK_SIZE, compare_reports, evaluate_file
+from app.agent.ppo_agent import PPOAgent
+from app.agent.student_policy import STUDENT_SUFFIX
+from app.auth import require_admin
+from app.profiling import MAX_CAPTURE_SECONDS, ProfilerBusy, capture_cprofile, capture_sampling
+from app.rl_env.scenarios import get_scenario
+import asyncio
+import logging
+import os
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+logger = logging.getLogger(__name__)
+
+# Evaluations use every CPU, so only one runs at a time
+evaluation_lock = asyncio.Lock()
+
+
+@router.post("/profile")
+async def profile_process(
+    seconds: float = Query(10.0, gt=0, le=MAX_CAPTURE_SECONDS),
+    format: str = Query("pstats", pattern="^(pstats|collapsed)$"),
+    admin: dict = Depends(require_admin),
+):
+    """
+    Profile every live session in this worker for `seconds`.
+    
+    `pstats` returns a cProfile dump readable with `python -m pstats` or
+    snakeviz; `collapsed` returns sampled stacks for flame graph tools.
+    """
+    logger.info("Profiling capture (%s, %.1fs) requested by %s", format, seconds, admin.get("email"))
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    
+    if format == "collapsed":
+        data = await capture_sampling(seconds)
+        return Response(
+            content=data,
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.collapsed"'},
+        )
+    
+    try:
+        data = await capture_cprofile(seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.pstats"'},
+    )
+
+
+def resolve_model(name: str) -> str:
+    """Path of a model zip or distilled student (.npz) in the models directory; rejects anything outside it"""
+    models_dir = os.path.dirname(PPOAgent().model_path)
+    if os.path.basename(name) != name or not name.endswith((".zip", STUDENT_SUFFIX)):
+        raise HTTPException(status_code=400, detail=f"Invalid model name {name!r}")
+    path = os.path.join(models_dir, name)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"Model {name} not found")
+    return path
+
+
+@router.post("/evaluate")
+async def evaluate_models(
+    model: str = Query("ppo_landing.zip", description="Model zip or distilled .npz in the models directory"),
+    compare: Optional[str] = Query(None, description="Second model to compare against"),
+    episodes: int = Query(EVAL_BANK_SIZE, gt=0, le=EVAL_BANK_SIZE),
+    scenario: str = Query("default", description="Scenario of the episode bank"),
+    admin: dict = Depends(require_admin),
+):
+    """
+    Evaluate one model, or compare two, on the seeded episode bank.
+    
+    Results are cached per model file, so repeating a request for unchanged
+    models returns immediately.
+    """
+    paths = [resolve_model(name) for name in filter(None, [model, compare])]
+    try:
+        get_scenario(scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if evaluation_lock.locked():
+        raise HTTPException(status_code=409, detail="An evaluation is already running")
+    
+    logger.info("Evaluation of %s on %d episodes requested by %s", ", ".join(filter(None, [model, compare])), episodes, admin.get("email"))
+    async with evaluation_lock:
+        reports = [await asyncio.to_thread(evaluate_file, path, episodes, scenario=scenario) for path in paths]
+    
+    return {
+        "reports": [{key: value for key, value in report.items() if key != "records"} for report in reports],
+        "comparison": compare_reports(*reports) if len(reports) == 2 else None,
+    }
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, EmailStr, field_validator
 from sqlalchemy.orm import Session
 from typing import Optional
 import re
 from app.database import get_db
 from app.models import User
-from app.auth import create_access_token, verify_token
-from app.utils.password import hash_password, verify_password
+from app.auth import create_access_token, get_current_user_id, verify_token
+from app.http_cache import cached_json
+from app.utils.password import PasswordHasherBusy, hash_password_async, verify_password_async
 from datetime import datetime
 from jose import jwt
 
@@ -75,15 +76,21 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Hash the password
-    password_hash_str = hash_password(request.password)
+    # Return the connection to the pool while hashing so waiting requests cannot exhaust it
+    db.rollback()
+    
+    # Hash the password off the event loop
+    try:
+        password_hash_str = await hash_password_async(request.password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
     
     # Create new user
     user = User(email=request.email, password_hash=password_hash_str)
     db.add(user)
     db.commit()
     db.refresh(user)
-
+    
     return UserCreatedResponse(user_id=user.id)
 
 
@@ -94,47 +101,42 @@ async def signin(request: SigninRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == request.email).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    user_id, user_email, password_hash_str = user.id, user.email, user.password_hash
     
-    # Verify password
-    if not verify_password(request.password, user.password_hash):
+    # Return the connection to the pool while hashing so waiting requests cannot exhaust it
+    db.rollback()
+    
+    # Verify password off the event loop
+    try:
+        password_valid, upgraded_hash = await verify_password_async(request.password, password_hash_str)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+    if not password_valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    # Transparently upgrade hashes made with outdated Argon2 parameters
+    if upgraded_hash:
+        db.query(User).filter(User.id == user_id).update({User.password_hash: upgraded_hash})
+        db.commit()
+    
     # Create JWT token
     access_token = create_access_token(
-        data={"sub": str(user.id), "email": user.email}
+        data={"sub": str(user_id), "email": user_email}
     )
     
     return TokenResponse(token=access_token)
 
 
 @router.get("/user", response_model=UserResponse)
-async def get_current_user(authorization: Optional[str] = Header(None), db: Session = Depends(get_db)):
-    """Get current user information from JWT token"""
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Authorization header missing")
-    
-    # Extract token from "Bearer <token>" format
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid authorization format")
-    
-    token = authorization[7:]  # Remove "Bearer " prefix
-    
-    # Verify token
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    
-    # Get user from database
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Invalid token payload")
-    user_id = int(user_id)  # Convert string to int
-    
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+async def get_current_user(request: Request, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    """Get current user information from JWT token; supports ETag / If-Modified-Since revalidation"""
+    def build():
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        return UserResponse(id=user.id, email=user.email).model_dump()
     
-    return UserResponse(id=user.id, email=user.email)
+    return cached_json(request, db, user_id, "user", "self", build)
 
 
 @router.post("/debug-token", response_model=DebugTokenResponse)
@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 from app.database import get_db
 from app.models import Episode
-from app.auth import verify_token
+from app.auth import get_current_user_id
+from app.http_cache import cached_json
+from app.replay import ResimulationError, episode_frame_count, frame_step, read_frames, resimulated_frames, unpack_frames
+from app.trajectory import simplify_trajectory
 from pydantic import BaseModel
 import logging
+import os
 
 router = APIRouter(prefix="/episodes", tags=["episodes"])
 logger = logging.getLogger(__name__)
 
+# Largest step range one trajectory request may ask for
+TRAJECTORY_MAX_RANGE = int(os.getenv("TRAJECTORY_MAX_RANGE", "2000"))
+# Largest page of the episode list
+EPISODES_MAX_PAGE = int(os.getenv("EPISODES_MAX_PAGE", "500"))
+
 
 class EpisodeResponse(BaseModel):
     id: int
@@ -18,51 +27,99 @@ class EpisodeResponse(BaseModel):
     success: bool
     fuel_used: float
     landing_accuracy: float
+    scenario: Optional[str] = None
     
     class Config:
         from_attributes = True
 
 
+class TrajectoryResponse(BaseModel):
+    episode_id: int
+    error_bound: float
+    compression_ratio: float
+    steps: List[dict]
+    # Index of the first returned step and the episode's stored step count
+    start: int = 0
+    total_steps: Optional[int] = None
+
+
 @router.get("", response_model=List[EpisodeResponse])
 async def get_episodes(
-    authorization: Optional[str] = Header(None),
+    request: Request,
+    limit: Optional[int] = Query(None, gt=0, le=EPISODES_MAX_PAGE, description="Page size (all episodes if omitted)"),
+    offset: int = Query(0, ge=0, description="Episodes to skip, newest first"),
+    user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db)
 ):
-    """Get all episodes for the authenticated user"""
-    # Log received authorization header
-    if authorization:
-        auth_preview = authorization[:20] + "..." if len(authorization) > 20 else authorization
-        logger.info(f"Received Authorization header: {auth_preview}")
-    else:
-        logger.warning("No Authorization header received")
-    
-    # Extract token from Authorization header
-    if not authorization:
-        logger.warning("Missing Authorization header")
-        raise HTTPException(status_code=401, detail="Missing authorization header")
-    
-    if not authorization.startswith("Bearer "):
-        logger.warning(f"Invalid authorization header format. Header: {authorization[:50]}...")
-        raise HTTPException(status_code=401, detail="Invalid authorization header format. Expected 'Bearer <token>'")
-    
-    token = authorization.split(" ")[1]
-    logger.debug(f"Extracted token from header. Token preview: {token[:10]}...{token[-10:]}")
+    """Get the authenticated user's episodes, newest first; supports ETag / If-Modified-Since revalidation"""
+    def build():
+        logger.debug("Fetching episodes for user_id: %s", user_id)
+        query = db.query(Episode).filter(Episode.user_id == user_id).order_by(Episode.timestamp.desc(), Episode.id.desc())
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        episodes = query.all()
+        logger.debug("Found %d episodes for user_id: %s", len(episodes), user_id)
+        return [EpisodeResponse.model_validate(episode).model_dump(mode="json") for episode in episodes]
     
-    payload = verify_token(token)
-    if not payload:
-        logger.warning("Token verification failed in get_episodes")
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user_id = payload.get("sub")
-    if not user_id:
-        logger.warning(f"Token payload missing 'sub' field. Payload keys: {payload.keys()}")
-        raise HTTPException(status_code=401, detail="Invalid token: missing user ID")
+    page = f"{offset}-{limit if limit is not None else 'all'}"
+    return cached_json(request, db, user_id, "episodes", page, build)
+
+
+@router.get("/{episode_id}/trajectory", response_model=TrajectoryResponse)
+async def get_episode_trajectory(
+    episode_id: int,
+    max_error: Optional[float] = Query(None, gt=0, le=1, description="Further simplify to this error bound for transmission"),
+    start: Optional[int] = Query(None, ge=0, description="First step of a range (reads only that range from storage)"),
+    count: Optional[int] = Query(None, gt=0, le=TRAJECTORY_MAX_RANGE, description="Number of steps in the range"),
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db)
+):
+    """Get the stored trajectory of one of the authenticated user's episodes, or a range of its steps"""
+    try:
+        if start is None and count is None:
+            episode = db.query(Episode).filter(Episode.id == episode_id, Episode.user_id == user_id).first()
+            if not episode:
+                raise HTTPException(status_code=404, detail="Episode not found")
+            if episode.seed is not None:
+                # Stored as seed and actions
+                steps = [frame_step(frame) for frame in unpack_frames(resimulated_frames(db, episode_id))]
+            else:
+                steps = episode.trajectory_data or []
+            error_bound = episode.trajectory_error_bound
+            compression = episode.trajectory_compression
+            start = 0
+            total = len(steps)
+        else:
+            total = episode_frame_count(db, episode_id, user_id)
+            if total is None:
+                raise HTTPException(status_code=404, detail="Episode not found")
+            start = start or 0
+            count = count or TRAJECTORY_MAX_RANGE
+            steps = [frame_step(frame) for frame in read_frames(db, episode_id, start, min(count, total - start))]
+            error_bound, compression = db.query(
+                Episode.trajectory_error_bound, Episode.trajectory_compression
+            ).filter(Episode.id == episode_id).one()
+    except ResimulationError as e:
+        raise HTTPException(status_code=409, detail=f"Episode cannot be reconstructed: {e}")
     
-    logger.info(f"Fetching episodes for user_id: {user_id}")
+    # Episodes stored before simplification existed are full resolution
+    error_bound = error_bound or 0.0
+    compression = compression or 1.0
     
-    # Query episodes for user
-    episodes = db.query(Episode).filter(Episode.user_id == user_id).order_by(Episode.timestamp.desc()).all()
-    logger.info(f"Found {len(episodes)} episodes for user_id: {user_id}")
+    if max_error is not None and max_error > error_bound:
+        replay = simplify_trajectory(steps, "simplify", error_bound=max_error)
+        steps = replay.steps
+        # Errors of the stored and transmitted simplifications can add up
+        error_bound += replay.error_bound
+        compression *= replay.compression_ratio
     
-    return episodes
-
+    return TrajectoryResponse(
+        episode_id=episode_id,
+        error_bound=error_bound,
+        compression_ratio=compression,
+        steps=steps,
+        start=start,
+        total_steps=total,
+    )
@@ -1,34 +1,51 @@
 import asyncio
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
+from typing import Optional, Union
 from app.database import get_db
 from app.models import Episode
-from app.auth import verify_token
+from app.auth import extract_bearer_token, is_admin, verify_token
+from app.http_cache import bump_user_version
 from app.rl_env.landing_env import LandingEnv
+from app.agent.mpc_agent import MPC_BUDGET_MS, MPCAgent, parse_budget_ms
 from app.agent.ppo_agent import PPOAgent
+from app.metrics import (
+    ACTIVE_WEBSOCKETS,
+    ENV_STEP_SECONDS,
+    ENV_STEPS_TOTAL,
+    EPISODE_COMMIT_SECONDS,
+    EPISODES_TOTAL,
+    FRAMES_SENT_TOTAL,
+    RUNNING_SIMULATIONS,
+    SEND_STATE_SECONDS,
+)
+from app.pool import PoolExhausted, agent_pool, env_pool
+from app.profiling import ProfilerBusy, SessionProfile, section
+from app.replay import (
+    REPLAY_DEFAULT_SPEED,
+    ReplayCursor,
+    ResimulationError,
+    episode_frame_count,
+    frame_state,
+    landing_accuracy,
+    pack_actions,
+    pack_frames,
+    parse_speed,
+)
+from app.rl_env.landing_env import ENV_VERSION
+from app.rl_env.scenarios import get_scenario
+from app.serialization import dumps_str, send_json
+from app.trajectory import TRAJECTORY_STORAGE_MODE, simplify_trajectory
+from app.workers.manager import NoWorkerAvailable, RemoteSession, worker_manager
+from app.workers.protocol import MessageType, decode_json, unpack_state
 import numpy as np
 import logging
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-
-def convert_to_json_serializable(obj):
-    """Recursively convert numpy types to Python native types for JSON serialization."""
-    if isinstance(obj, np.bool):
-        return bool(obj)
-    elif isinstance(obj, np.integer):
-        return int(obj)
-    elif isinstance(obj, np.floating):
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return [convert_to_json_serializable(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_to_json_serializable(value) for key, value in obj.items()}
-    elif isinstance(obj, (list, tuple)):
-        return [convert_to_json_serializable(item) for item in obj]
-    else:
-        return obj
+# Modes a "start" message may ask for, besides "replay"
+SIMULATION_MODES = ("auto", "mpc", "train", "manual")
 
 
 @router.websocket("/ws/simulate")
@@ -43,17 +60,14 @@ async def websocket_endpoint(
     
     if authorization:
         # Check Authorization header first
-        if not authorization.startswith("Bearer "):
-            logger.warning(f"Invalid authorization header format. Header: {authorization[:50]}...")
+        token = extract_bearer_token(authorization)
+        if not token:
+            logger.warning("Invalid WebSocket authorization header format")
             await websocket.close(code=1008, reason="Invalid authorization header format. Expected 'Bearer <token>'")
             return
-        token = authorization[7:]
-        logger.debug(f"Extracted token from header. Token preview: {token[:10]}...{token[-10:]}")
     else:
         # Fall back to query parameter
         token = websocket.query_params.get("token")
-        if token:
-            logger.debug(f"Extracted token from query parameter. Token preview: {token[:10]}...{token[-10:]}")
     
     if not token:
         logger.warning("No Authorization header or token query parameter received")
@@ -63,18 +77,19 @@ async def websocket_endpoint(
     # Verify JWT token
     payload = verify_token(token)
     if not payload:
-        logger.warning(f"WebSocket token verification failed. Token preview: {token[:10]}...{token[-10:]}")
+        logger.warning("WebSocket token verification failed")
         await websocket.close(code=1008, reason="Invalid token")
         return
     
     user_id = payload.get("sub")
     if not user_id:
-        logger.warning(f"WebSocket token payload missing 'sub' field. Payload keys: {payload.keys()}")
+        logger.warning("WebSocket token payload missing 'sub' field")
         await websocket.close(code=1008, reason="Invalid token: missing user ID")
         return
     
-    logger.info(f"WebSocket connection accepted for user_id: {user_id}")
+    logger.info("WebSocket connection accepted for user_id: %s", user_id)
     await websocket.accept()
+    ACTIVE_WEBSOCKETS.inc()
     
     # Get database session
     db = next(get_db())
@@ -82,38 +97,88 @@ async def websocket_endpoint(
     env = None
     agent = None
     running = False
+    profile = None
     
     try:
+        if worker_manager.enabled:
+            await run_remote_session(websocket, user_id, payload, db)
+            return
+        
+        # A message received during a replay that the replay does not handle itself
+        pending = None
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            data = pending or await websocket.receive_json()
+            pending = None
             message_type = data.get("type")
             
             if message_type == "start":
                 mode = data.get("mode", "auto")
-                running = True
+                if mode != "replay" and mode not in SIMULATION_MODES:
+                    await websocket.send_json({"type": "error", "message": f"Unknown mode: {mode!r}"})
+                    continue
                 
-                # Initialize environment
-                env = LandingEnv()
-                obs, _ = env.reset()
+                # Return objects from a previous episode before checking out new ones
+                env, agent = await release_session_objects(env, agent)
+                
+                if mode == "replay":
+                    if running:
+                        RUNNING_SIMULATIONS.dec()
+                    running = False
+                    pending = await run_replay(websocket, data, user_id, db)
+                    continue
                 
-                # Initialize agent based on mode
-                if mode == "auto":
-                    agent = PPOAgent()
+                try:
+                    scenario = get_scenario(data.get("scenario"))
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    continue
+                
+                # The MPC autopilot plans with the environment's own dynamics, so needs no pooled model
+                planner = None
+                if mode == "mpc":
                     try:
-                        agent.load()
-                    except:
-                        agent = None  # Use random actions if no model
+                        planner = MPCAgent(budget_ms=parse_budget_ms(data.get("mpc_budget_ms", MPC_BUDGET_MS)))
+                    except ValueError as e:
+                        await websocket.send_json({"type": "error", "message": str(e)})
+                        continue
+                
+                # Check out a pre-built environment (and policy for auto mode)
+                try:
+                    env = await env_pool.acquire()
+                    if mode == "auto":
+                        agent = await agent_pool.acquire()
+                except PoolExhausted as e:
+                    env, agent = await release_session_objects(env, agent)
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    continue
+                env.use_scenario(scenario)
+                obs, _ = env.reset()
+                
+                if not running:
+                    RUNNING_SIMULATIONS.inc()
+                running = True
+                
+                # Optional per-episode timing breakdown and (admin only) cProfile capture
+                if profile is not None:
+                    profile.close()
+                profile = await create_session_profile(websocket, data, payload)
                 
                 # Start simulation loop
-                if mode == "auto":
-                    await run_auto_simulation(websocket, env, agent, user_id, db)
+                if mode in ("auto", "mpc"):
+                    await run_auto_simulation(websocket, env, planner or agent, user_id, db, profile)
+                    running = False
+                    RUNNING_SIMULATIONS.dec()
+                    env, agent = await release_session_objects(env, agent)
                 elif mode == "train":
                     await run_train_simulation(websocket, env, user_id, db)
+                    running = False
+                    RUNNING_SIMULATIONS.dec()
+                    env, agent = await release_session_objects(env, agent)
                 elif mode == "manual":
-                    await send_state_update(websocket, env)
+                    await send_state_update(websocket, env, profile)
                     running = True  # Wait for manual commands
-                
+            
             elif message_type == "action" and running and env is not None:
                 # Manual mode: receive action from client
                 if env is None:
@@ -124,15 +189,20 @@ async def websocket_endpoint(
                 angle = float(data.get("angle", 0.0))
                 action = np.array([thrust, angle])
                 
-                obs, reward, terminated, truncated, info = env.step(action)
+                with section(profile, "env_step"):
+                    obs, reward, terminated, truncated, info = step_env(env, action)
                 
-                await send_state_update(websocket, env)
+                await send_state_update(websocket, env, profile)
                 
                 if terminated or truncated:
-                    await handle_episode_end(websocket, env, info, user_id, db)
+                    await handle_episode_end(websocket, env, info, user_id, db, profile)
                     running = False
+                    RUNNING_SIMULATIONS.dec()
+                    env, agent = await release_session_objects(env, agent)
             
             elif message_type == "stop":
+                if running:
+                    RUNNING_SIMULATIONS.dec()
                 running = False
                 await websocket.send_json({"type": "stopped"})
     
@@ -144,30 +214,260 @@ async def websocket_endpoint(
         except:
             pass
     finally:
+        if running:
+            RUNNING_SIMULATIONS.dec()
+        if profile is not None:
+            profile.close()
+        await release_session_objects(env, agent)
+        ACTIVE_WEBSOCKETS.dec()
         db.close()
 
 
-async def run_auto_simulation(websocket: WebSocket, env: LandingEnv, agent: PPOAgent, user_id: int, db: Session):
+async def release_session_objects(env: Optional[LandingEnv], agent: Optional[PPOAgent]):
+    """Return a session's environment and agent to their pools; returns (None, None)"""
+    if env is not None:
+        await env_pool.release(env)
+    if agent is not None:
+        # Agents without a model are not kept, so a newly trained model is picked up
+        await agent_pool.release(agent, discard=agent.model is None)
+    return None, None
+
+
+async def run_remote_session(websocket: WebSocket, user_id: int, payload: dict, db: Session):
+    """Run the session's simulations in a worker process, relaying frames and persisting results here"""
+    session: Optional[RemoteSession] = None
+    running = False
+    profile = None
+    
+    pending = None
+    try:
+        while True:
+            data = pending or await websocket.receive_json()
+            pending = None
+            message_type = data.get("type")
+            
+            if message_type == "start":
+                mode = data.get("mode", "auto")
+                if mode != "replay" and mode not in SIMULATION_MODES:
+                    await websocket.send_json({"type": "error", "message": f"Unknown mode: {mode!r}"})
+                    continue
+                if mode == "replay":
+                    # Replays read stored episodes; no worker involved
+                    if session is not None:
+                        await session.close()
+                        session = None
+                    if running:
+                        RUNNING_SIMULATIONS.dec()
+                    running = False
+                    pending = await run_replay(websocket, data, user_id, db)
+                    continue
+                options = {"mode": mode}
+                try:
+                    options["scenario"] = get_scenario(data.get("scenario")).name
+                    if mode == "mpc":
+                        options["mpc_budget_ms"] = parse_budget_ms(data.get("mpc_budget_ms", MPC_BUDGET_MS))
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    continue
+                if session is not None:
+                    await session.close()
+                try:
+                    session = await worker_manager.open_session()
+                except NoWorkerAvailable as e:
+                    session = None
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                    continue
+                
+                if not running:
+                    RUNNING_SIMULATIONS.inc()
+                running = True
+                
+                # Timing breakdowns combine worker phases with the relay's own; cProfile
+                # would only see this process, so it is not offered for remote sessions
+                if profile is not None:
+                    profile.close()
+                if data.get("profile"):
+                    await websocket.send_json({"type": "error", "message": "Profiling is not available for sessions run by simulation workers"})
+                profile = SessionProfile() if data.get("timings") else None
+                
+                await session.start({**options, "timings": profile is not None})
+                if mode in ("auto", "mpc", "train"):
+                    await relay_worker_messages(websocket, session, user_id, db, profile)
+                elif not await relay_worker_messages(websocket, session, user_id, db, profile, until_state=True):
+                    # Manual mode: wait for the client's actions
+                    continue
+                running = False
+                RUNNING_SIMULATIONS.dec()
+            
+            elif message_type == "action" and running and session is not None:
+                await session.action(float(data.get("thrust", 0.5)), float(data.get("angle", 0.0)))
+                if await relay_worker_messages(websocket, session, user_id, db, profile, until_state=True):
+                    running = False
+                    RUNNING_SIMULATIONS.dec()
+            
+            elif message_type == "stop":
+                if session is not None:
+                    await session.close()
+                    session = None
+                if running:
+                    RUNNING_SIMULATIONS.dec()
+                running = False
+                await websocket.send_json({"type": "stopped"})
+    finally:
+        if running:
+            RUNNING_SIMULATIONS.dec()
+        if profile is not None:
+            profile.close()
+        if session is not None:
+            await session.close()
+
+
+async def relay_worker_messages(websocket: WebSocket, session: RemoteSession, user_id: int, db: Session, profile: Optional[SessionProfile] = None, until_state: bool = False) -> bool:
+    """
+    Forward a worker's messages to the client until the episode ends.
+    
+    With `until_state`, also return after a state frame that does not end the
+    episode (manual mode). Returns True when the episode ended.
+    """
+    while True:
+        message_type, body = await session.receive()
+        if message_type == MessageType.STATE:
+            state, done = unpack_state(body)
+            ENV_STEPS_TOTAL.inc()
+            await send_state_update(websocket, None, profile, state=state)
+            if until_state and not done:
+                return False
+        elif message_type == MessageType.RESULT:
+            info = decode_json(body)
+            if profile is not None:
+                profile.merge(info.pop("timings", {}))
+            await handle_episode_end(websocket, None, info, user_id, db, profile)
+        elif message_type == MessageType.EVENT:
+            await send_json(websocket, decode_json(body))
+        elif message_type == MessageType.ERROR:
+            await send_json(websocket, {"type": "error", **decode_json(body)})
+        elif message_type == MessageType.END:
+            await session.close()
+            return True
+
+
+async def run_replay(websocket: WebSocket, data: dict, user_id: int, db: Session) -> Optional[dict]:
+    """
+    Stream one of the user's stored episodes as state frames, paced by their recorded times.
+    
+    The start message gives "episode_id" and optionally "speed" and "step"
+    (where to begin). While playing, "pause", "resume", "seek" ({"step"})
+    and "speed" ({"speed"}) messages are handled here. Any other message
+    ends the replay and is returned for the caller to handle.
+    """
+    try:
+        episode_id = int(data.get("episode_id"))
+        speed = parse_speed(data.get("speed", REPLAY_DEFAULT_SPEED))
+        start = int(data.get("step", 0))
+    except (TypeError, ValueError) as e:
+        await websocket.send_json({"type": "error", "message": f"Invalid replay request: {e}"})
+        return None
+    
+    try:
+        total = episode_frame_count(db, episode_id, user_id)
+    except ResimulationError as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        return None
+    if not total:
+        await websocket.send_json({"type": "error", "message": "Episode not found" if total is None else "Episode has no stored trajectory"})
+        return None
+    
+    cursor = ReplayCursor(db, episode_id, total)
+    cursor.seek(start)
+    await send_json(websocket, {"type": "replay", "episode_id": episode_id, "steps": total, "step": cursor.position, "speed": speed})
+    
+    paused = False
+    delay = 0.0
+    receive = asyncio.create_task(websocket.receive_json())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receive}, timeout=None if paused else delay)
+            if receive in done:
+                message = receive.result()
+                receive = asyncio.create_task(websocket.receive_json())
+                message_type = message.get("type")
+                try:
+                    if message_type == "pause":
+                        paused = True
+                        await send_json(websocket, {"type": "paused", "step": cursor.position})
+                    elif message_type == "resume":
+                        paused = False
+                        delay = 0.0
+                    elif message_type == "seek":
+                        cursor.seek(int(message.get("step", 0)))
+                        delay = 0.0
+                        if paused:
+                            # Show the new position without advancing past it
+                            await send_state_update(websocket, None, state={**frame_state(cursor.peek()), "step": cursor.position})
+                    elif message_type == "speed":
+                        speed = parse_speed(message.get("speed"))
+                    else:
+                        return message
+                except (TypeError, ValueError) as e:
+                    await websocket.send_json({"type": "error", "message": str(e)})
+                continue
+            
+            if cursor.finished:
+                await send_json(websocket, {"type": "replay_complete", "episode_id": episode_id, "steps": total})
+                return None
+            step, frame, gap = cursor.next()
+            await send_state_update(websocket, None, state={**frame_state(frame), "step": step})
+            delay = max(0.0, gap or 0.0) / speed
+    finally:
+        if not receive.done():
+            receive.cancel()
+
+
+async def create_session_profile(websocket: WebSocket, data: dict, payload: dict) -> Optional[SessionProfile]:
+    """Build the session profile requested by a "start" message, if any"""
+    want_timings = bool(data.get("timings"))
+    want_cprofile = bool(data.get("profile"))
+    if not (want_timings or want_cprofile):
+        return None
+    
+    if want_cprofile and not is_admin(payload):
+        await websocket.send_json({"type": "error", "message": "Profiling requires admin privileges"})
+        want_cprofile = False
+    
+    try:
+        return SessionProfile(cprofile=want_cprofile)
+    except ProfilerBusy as e:
+        await websocket.send_json({"type": "error", "message": str(e)})
+        return SessionProfile()
+
+
+async def run_auto_simulation(websocket: WebSocket, env: LandingEnv, agent: Union[PPOAgent, MPCAgent, None], user_id: int, db: Session, profile: Optional[SessionProfile] = None):
     """Run automatic simulation with agent"""
     obs, _ = env.reset()
     
     while True:
         # Get action from agent (or random if no agent)
-        if agent and agent.model:
-            action = agent.predict(obs)
-        else:
-            action = env.action_space.sample()
+        # MPC planning awaits a thread, so it is timed by wall clock only
+        with section(profile, "inference", awaits=isinstance(agent, MPCAgent)):
+            if isinstance(agent, MPCAgent):
+                # Planning takes up to its budget; keep it off the event loop
+                action = await asyncio.to_thread(agent.plan, env)
+            elif agent and agent.model:
+                action = agent.predict(obs)
+            else:
+                action = env.action_space.sample()
         
-        obs, reward, terminated, truncated, info = env.step(action)
+        with section(profile, "env_step"):
+            obs, reward, terminated, truncated, info = step_env(env, action)
         
         # Send state update
-        await send_state_update(websocket, env)
+        await send_state_update(websocket, env, profile)
         
         # Small delay for visualization
         await asyncio.sleep(0.05)
         
         if terminated or truncated:
-            await handle_episode_end(websocket, env, info, user_id, db)
+            await handle_episode_end(websocket, env, info, user_id, db, profile)
             break
 
 
@@ -179,7 +479,7 @@ async def run_train_simulation(websocket: WebSocket, env: LandingEnv, user_id: i
     while episode < 10:  # Simulate 10 training episodes
         # Random actions for demonstration
         action = env.action_space.sample()
-        obs, reward, terminated, truncated, info = env.step(action)
+        obs, reward, terminated, truncated, info = step_env(env, action)
         
         await send_state_update(websocket, env)
         await asyncio.sleep(0.05)
@@ -201,16 +501,27 @@ async def run_train_simulation(websocket: WebSocket, env: LandingEnv, user_id: i
                 break
 
 
-async def send_state_update(websocket: WebSocket, env: LandingEnv):
-    """Send current state to client"""
-    state = env.get_state_dict()
-    await websocket.send_json({
-        "type": "state",
-        **state
-    })
+def step_env(env: LandingEnv, action):
+    """Step the environment, recording step latency and count"""
+    with ENV_STEP_SECONDS.time():
+        result = env.step(action)
+    ENV_STEPS_TOTAL.inc()
+    return result
 
 
-async def handle_episode_end(websocket: WebSocket, env: LandingEnv, info: dict, user_id: int, db: Session):
+async def send_state_update(websocket: WebSocket, env: Optional[LandingEnv], profile: Optional[SessionProfile] = None, state: Optional[dict] = None):
+    """Send current state to client (`state` relays one built by a worker instead of reading `env`)"""
+    with SEND_STATE_SECONDS.time():
+        with section(profile, "serialization"):
+            if state is None:
+                state = env.get_state_dict()
+            message = dumps_str({"type": "state", **state})
+        with section(profile, "send"):
+            await websocket.send_text(message)
+    FRAMES_SENT_TOTAL.inc()
+
+
+async def handle_episode_end(websocket: WebSocket, env: Optional[LandingEnv], info: dict, user_id: int, db: Session, profile: Optional[SessionProfile] = None):
     """Handle episode completion and save to database"""
     success = info.get("success", False)
     fuel_used = info.get("fuel_used", 0.0)
@@ -219,29 +530,53 @@ async def handle_episode_end(websocket: WebSocket, env: LandingEnv, info: dict,
     # Calculate landing accuracy (distance from pad at landing)
     if trajectory:
         last_state = trajectory[-1]["state"]
-        pad_x = last_state.get("pad_x", 0)
-        x = last_state.get("x", 0)
-        landing_accuracy = 1.0 / (1.0 + abs(x - pad_x))  # Inverse distance, max 1.0
+        accuracy = landing_accuracy(last_state.get("x", 0), last_state.get("pad_x", 0))
     else:
-        landing_accuracy = 0.0
+        accuracy = 0.0
     
-    # Save episode to database
+    # Save episode to database, as seed and actions or with states thinned per TRAJECTORY_STORAGE_MODE
+    if TRAJECTORY_STORAGE_MODE == "actions" and trajectory and info.get("seed") is not None:
+        stored_fields = {
+            "env_version": ENV_VERSION,
+            "seed": info["seed"],
+            "actions": pack_actions(trajectory),
+            "trajectory_steps": len(trajectory),
+        }
+    else:
+        stored = simplify_trajectory(trajectory, "simplify" if TRAJECTORY_STORAGE_MODE == "actions" else TRAJECTORY_STORAGE_MODE)
+        stored_fields = {
+            "trajectory_data": stored.steps,
+            "trajectory_error_bound": stored.error_bound,
+            "trajectory_compression": stored.compression_ratio,
+            "trajectory_frames": pack_frames(stored.steps),
+            "trajectory_steps": len(stored.steps),
+        }
     episode = Episode(
         user_id=user_id,
+        scenario=info.get("scenario"),
         success=success,
         fuel_used=fuel_used,
-        landing_accuracy=landing_accuracy,
-        trajectory_data=trajectory
+        landing_accuracy=accuracy,
+        **stored_fields,
     )
-    db.add(episode)
-    db.commit()
+    with section(profile, "db"), EPISODE_COMMIT_SECONDS.time():
+        db.add(episode)
+        bump_user_version(db, user_id)
+        db.commit()
+    EPISODES_TOTAL.labels("success" if success else "failure").inc()
     
     # Send result to client
     result_data = {
         "type": "result",
         "success": success,
         "fuel_used": fuel_used,
-        "landing_accuracy": landing_accuracy
+        "landing_accuracy": accuracy
     }
-    await websocket.send_json(convert_to_json_serializable(result_data))
+    if profile is not None:
+        result_data["timings"] = profile.timings()
+        profile.reset()
+    await send_json(websocket, result_data)
+    
+    if profile is not None and profile.profiler is not None:
+        await send_json(websocket, profile.profile_message())
 
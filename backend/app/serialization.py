@@ -0,0 +1,84 @@
+"""
+JSON serialization for REST and WebSocket payloads.
+
+Handles NumPy scalars and arrays in a single encoding pass. Uses orjson
+when it is installed and falls back to the standard library otherwise;
+both produce the same JSON for the payloads this app sends.
+"""
+
+import json
+from typing import Any
+
+import numpy as np
+from fastapi import WebSocket
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _default(obj: Any) -> Any:
+    """Encode values the JSON backend does not handle natively"""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize `obj` to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data):
+        """Parse JSON from bytes or str"""
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(",", ":"), ensure_ascii=False)
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize `obj` to compact UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode("utf-8")
+
+    def loads(data):
+        """Parse JSON from bytes or str"""
+        return json.loads(data)
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize `obj` to a compact JSON string (for WebSocket text frames)"""
+    return dumps(obj).decode("utf-8")
+
+
+async def send_json(websocket: WebSocket, obj: Any):
+    """Send `obj` as a JSON text frame using the fast encoder"""
+    await websocket.send_text(dumps_str(obj))
+
+
+def convert_to_json_serializable(obj):
+    """Recursively convert numpy types to Python native types for JSON serialization."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, dict):
+        return {key: convert_to_json_serializable(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [convert_to_json_serializable(item) for item in obj]
+    return obj
+
+
+class FastJSONResponse(JSONResponse):
+    """Default REST response class backed by the numpy-aware encoder"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,150 @@
+"""
+Trajectory simplification before storage and transmission.
+
+Episodes record every 0.1 s step, but long descents are nearly linear and
+compress well. Two modes thin the step list; both always keep the first and
+last steps and every step where the commanded thrust changes sharply:
+
+- "decimate": keep every Nth step
+- "simplify": per-channel error-bounded line simplification (Ramer-Douglas-
+  Peucker over time). Linear interpolation between kept steps reproduces
+  every state channel to within `error_bound` times that channel's range
+  over the episode.
+
+"full" stores every step. Kept steps are unchanged, so simplified
+trajectories have the same shape as full ones.
+
+The default storage mode, "actions", stores no states at all: episodes are
+saved as their seed and actions and re-simulated on read (app/replay.py).
+Simplification then only applies to transmission.
+"""
+
+import os
+from typing import List, NamedTuple
+
+import numpy as np
+
+# actions | full | decimate | simplify
+TRAJECTORY_STORAGE_MODE = os.getenv("TRAJECTORY_STORAGE_MODE", "actions")
+TRAJECTORY_DECIMATE_EVERY = int(os.getenv("TRAJECTORY_DECIMATE_EVERY", "5"))
+# Maximum interpolation error as a fraction of each channel's range (0.01 = 1%)
+TRAJECTORY_ERROR_BOUND = float(os.getenv("TRAJECTORY_ERROR_BOUND", "0.01"))
+# Thrust change between consecutive steps (on the 0-1 action scale) that is always kept
+TRAJECTORY_THRUST_CHANGE = float(os.getenv("TRAJECTORY_THRUST_CHANGE", "0.2"))
+
+MODES = ("full", "decimate", "simplify")
+STORAGE_MODES = ("actions", *MODES)
+
+# Fail at startup rather than when the first episode is saved
+if TRAJECTORY_STORAGE_MODE not in STORAGE_MODES:
+    raise ValueError(f"Unknown TRAJECTORY_STORAGE_MODE {TRAJECTORY_STORAGE_MODE!r}, expected one of {', '.join(STORAGE_MODES)}")
+
+# State channels the error bound applies to
+CHANNELS = ("altitude", "x", "vx", "vy", "tilt", "angular_velocity", "fuel", "pad_x")
+
+
+class SimplifiedTrajectory(NamedTuple):
+    steps: List[dict]
+    # Largest interpolation error of any channel, as a fraction of its range
+    error_bound: float
+    # Original step count divided by the stored step count
+    compression_ratio: float
+
+
+def _channels(trajectory: List[dict]) -> np.ndarray:
+    """(steps, channels) array of state values"""
+    return np.array([[step["state"][name] for name in CHANNELS] for step in trajectory], dtype=np.float64)
+
+
+def _times(trajectory: List[dict]) -> np.ndarray:
+    return np.array([step["state"].get("time", i) for i, step in enumerate(trajectory)], dtype=np.float64)
+
+
+def _forced_indices(trajectory: List[dict], thrust_change: float) -> np.ndarray:
+    """First, last and sharp thrust change steps"""
+    thrust = np.array([step["action"][0] if step.get("action") else 0.0 for step in trajectory], dtype=np.float64)
+    changes = np.flatnonzero(np.abs(np.diff(thrust)) >= thrust_change) + 1
+    return np.unique(np.concatenate(([0, len(trajectory) - 1], changes)))
+
+
+def _normalized(values: np.ndarray) -> np.ndarray:
+    """Scale each channel by its range so one error bound fits every unit"""
+    span = values.max(axis=0) - values.min(axis=0)
+    span[span == 0] = 1.0
+    return values / span
+
+
+def _segment_errors(times: np.ndarray, values: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Worst channel error of each interior step against the line from `start` to `end`"""
+    t = times[start + 1:end]
+    fraction = ((t - times[start]) / (times[end] - times[start]))[:, None]
+    line = values[start] + fraction * (values[end] - values[start])
+    return np.abs(values[start + 1:end] - line).max(axis=1)
+
+
+def max_error(trajectory: List[dict], kept: np.ndarray) -> float:
+    """Largest interpolation error over all channels when only `kept` steps are stored"""
+    if len(trajectory) < 3:
+        return 0.0
+    times = _times(trajectory)
+    values = _normalized(_channels(trajectory))
+    worst = 0.0
+    for start, end in zip(kept[:-1], kept[1:]):
+        if end - start > 1:
+            worst = max(worst, float(_segment_errors(times, values, start, end).max()))
+    return worst
+
+
+def simplify_indices(trajectory: List[dict], error_bound: float = TRAJECTORY_ERROR_BOUND, thrust_change: float = TRAJECTORY_THRUST_CHANGE) -> np.ndarray:
+    """Sorted indices of the steps kept by error-bounded simplification"""
+    forced = _forced_indices(trajectory, thrust_change)
+    if len(trajectory) < 3:
+        return forced
+    times = _times(trajectory)
+    values = _normalized(_channels(trajectory))
+    
+    keep = np.zeros(len(trajectory), dtype=bool)
+    keep[forced] = True
+    # Forced steps split the episode into segments that are simplified independently
+    stack = [(int(start), int(end)) for start, end in zip(forced[:-1], forced[1:]) if end - start > 1]
+    while stack:
+        start, end = stack.pop()
+        errors = _segment_errors(times, values, start, end)
+        worst = int(errors.argmax())
+        if errors[worst] > error_bound:
+            split = start + 1 + worst
+            keep[split] = True
+            if split - start > 1:
+                stack.append((start, split))
+            if end - split > 1:
+                stack.append((split, end))
+    return np.flatnonzero(keep)
+
+
+def decimate_indices(trajectory: List[dict], every: int = TRAJECTORY_DECIMATE_EVERY, thrust_change: float = TRAJECTORY_THRUST_CHANGE) -> np.ndarray:
+    """Sorted indices of every `every`th step plus the forced steps"""
+    regular = np.arange(0, len(trajectory), max(1, every))
+    return np.union1d(regular, _forced_indices(trajectory, thrust_change))
+
+
+def simplify_trajectory(
+    trajectory: List[dict],
+    mode: str = "simplify",
+    error_bound: float = TRAJECTORY_ERROR_BOUND,
+    every: int = TRAJECTORY_DECIMATE_EVERY,
+) -> SimplifiedTrajectory:
+    """Thin `trajectory` according to `mode` (see module docstring)"""
+    if mode not in MODES:
+        raise ValueError(f"Unknown trajectory mode {mode!r}, expected one of {', '.join(MODES)}")
+    if mode == "full" or len(trajectory) < 3:
+        return SimplifiedTrajectory(list(trajectory), 0.0, 1.0)
+    
+    if mode == "simplify":
+        kept = simplify_indices(trajectory, error_bound)
+        bound = error_bound
+    else:
+        kept = decimate_indices(trajectory, every)
+        # Decimation has no bound of its own, so record the error it actually produced
+        bound = max_error(trajectory, kept)
+    steps = [trajectory[i] for i in kept]
+    return SimplifiedTrajectory(steps, bound, len(trajectory) / len(steps))
@@ -1,10 +1,39 @@
 """Password hashing and verification utilities using Argon2."""
 
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
 from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from argon2.exceptions import InvalidHashError, VerificationError, VerifyMismatchError
+
+T = TypeVar("T")
+
+# Argon2 cost parameters (defaults match argon2-cffi's RFC 9106 low-memory profile)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# Hashing worker pool and admission control
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "5.0"))  # seconds
+
+# Initialize Argon2 password hasher with the configured cost parameters
+ph = PasswordHasher(
+    time_cost=ARGON2_TIME_COST,
+    memory_cost=ARGON2_MEMORY_COST,
+    parallelism=ARGON2_PARALLELISM,
+)
+
+# Argon2 releases the GIL while hashing, so a thread pool keeps the event loop free
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="argon2")
+_admission = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
 
-# Initialize Argon2 password hasher with secure defaults
-ph = PasswordHasher()
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool stays saturated for longer than the queue timeout"""
 
 
 def hash_password(password: str) -> str:
@@ -37,3 +66,88 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except VerifyMismatchError:
         return False
 
+
+def needs_rehash(hashed_password: str) -> bool:
+    """
+    Check whether a stored hash was produced with different cost parameters.
+    
+    Args:
+        hashed_password: The stored hashed password
+        
+    Returns:
+        True if the hash should be recomputed with the current parameters
+    """
+    try:
+        return ph.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
+
+
+def _verify_and_rehash(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and, on success, produce an upgraded hash if parameters changed."""
+    try:
+        ph.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, ph.hash(plain_password)
+    return True, None
+
+
+def _release_slot(future: "asyncio.Future") -> None:
+    """Free an admission slot once its hashing job has finished on the executor"""
+    _admission.release()
+    if not future.cancelled():
+        # Mark the outcome as retrieved when the caller was cancelled and never awaits it
+        future.exception()
+
+
+async def _run_in_pool(func: Callable[..., T], *args) -> T:
+    """Run a hashing call in the worker pool, waiting at most the queue timeout for a slot."""
+    try:
+        await asyncio.wait_for(_admission.acquire(), timeout=PASSWORD_HASH_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PasswordHasherBusy("Password hashing pool is saturated")
+    try:
+        future = asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    except BaseException:
+        _admission.release()
+        raise
+    # Hold the slot until the hash actually finishes: a cancelled caller stops
+    # waiting, but its job keeps running on the executor thread
+    future.add_done_callback(_release_slot)
+    return await asyncio.shield(future)
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Hash a password in the bounded worker pool without blocking the event loop.
+    
+    Args:
+        password: The plain text password to hash
+        
+    Returns:
+        The hashed password string
+        
+    Raises:
+        PasswordHasherBusy: If no pool slot frees up within the queue timeout
+    """
+    return await _run_in_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the bounded worker pool without blocking the event loop.
+    
+    Args:
+        plain_password: The plain text password to verify
+        hashed_password: The hashed password to compare against
+        
+    Returns:
+        A (matches, new_hash) tuple; new_hash is set when the stored hash used
+        outdated cost parameters and should be replaced
+        
+    Raises:
+        PasswordHasherBusy: If no pool slot frees up within the queue timeout
+    """
+    return await _run_in_pool(_verify_and_rehash, plain_password, hashed_password)
@@ -0,0 +1 @@
+# Simulation worker processes
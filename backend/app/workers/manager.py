@@ -0,0 +1,234 @@
+"""
+API-side management of simulation worker processes.
+
+With SIM_WORKERS > 0 the API spawns that many workers on Unix domain
+sockets and restarts any that exit; SIM_WORKER_SOCKETS connects to workers
+run as a separate service instead. Each new session is routed to the
+connected worker with the fewest sessions. When a worker connection drops,
+its sessions receive an error and the manager reconnects (respawning the
+process if it owns it). With neither setting, simulations run in the API
+process as before.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import app
+from app.metrics import Counter, Gauge
+from app.workers.protocol import (
+    MessageType,
+    ProtocolError,
+    decode_json,
+    encode_frame,
+    encode_json,
+    pack_action,
+    read_frame,
+)
+from app.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+SIM_WORKERS = int(os.getenv("SIM_WORKERS", "0"))
+SIM_WORKER_SOCKETS = [path.strip() for path in os.getenv("SIM_WORKER_SOCKETS", "").split(",") if path.strip()]
+SIM_WORKER_SOCKET_DIR = os.getenv("SIM_WORKER_SOCKET_DIR", tempfile.gettempdir())
+# How long a new session waits for a worker to (re)connect before giving up
+SIM_WORKER_WAIT_SECONDS = float(os.getenv("SIM_WORKER_WAIT_SECONDS", "5"))
+
+MAX_RESTART_BACKOFF_SECONDS = 10.0
+
+SIM_WORKERS_CONNECTED = Gauge("sim_workers_connected", "Simulation workers currently connected")
+SIM_WORKER_SESSIONS = Gauge("sim_worker_sessions", "Sessions routed to each simulation worker", ["worker"])
+SIM_WORKER_DISCONNECTS_TOTAL = Counter("sim_worker_disconnects_total", "Lost connections to simulation workers", ["worker"])
+
+# Backend directory, so spawned workers can import `app` whatever the API's cwd
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(app.__file__)))
+
+
+class NoWorkerAvailable(Exception):
+    """Raised when no simulation worker is connected"""
+
+
+class RemoteSession:
+    """One simulation session hosted by a worker process"""
+    
+    def __init__(self, worker: "Worker", session_id: int):
+        self.worker = worker
+        self.session_id = session_id
+        self.messages: asyncio.Queue = asyncio.Queue()
+    
+    async def start(self, options: dict):
+        await self.worker.send(encode_json(MessageType.START, self.session_id, options))
+    
+    async def action(self, thrust: float, angle: float):
+        await self.worker.send(encode_frame(MessageType.ACTION, self.session_id, pack_action(thrust, angle)))
+    
+    async def receive(self) -> Tuple[MessageType, bytes]:
+        """Next message from the worker for this session"""
+        return await self.messages.get()
+    
+    async def close(self):
+        """Stop the session on the worker and stop routing its messages"""
+        if self.worker.sessions.pop(self.session_id, None) is None:
+            return
+        self.worker.session_gauge.dec()
+        try:
+            await self.worker.send(encode_frame(MessageType.STOP, self.session_id))
+        except (ConnectionError, NoWorkerAvailable):
+            pass
+
+
+class Worker:
+    """Connection to one simulation worker, optionally owning its process"""
+    
+    def __init__(self, name: str, socket_path: str, spawn: bool):
+        self.name = name
+        self.socket_path = socket_path
+        self.spawn = spawn
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.sessions: Dict[int, RemoteSession] = {}
+        self.session_gauge = SIM_WORKER_SESSIONS.labels(name)
+        self.disconnect_counter = SIM_WORKER_DISCONNECTS_TOTAL.labels(name)
+    
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None
+    
+    async def send(self, frame: bytes):
+        if self.writer is None:
+            raise NoWorkerAvailable(f"Simulation worker {self.name} is not connected")
+        self.writer.write(frame)
+        await self.writer.drain()
+    
+    def open_session(self, session_id: int) -> RemoteSession:
+        session = self.sessions[session_id] = RemoteSession(self, session_id)
+        self.session_gauge.inc()
+        return session
+    
+    async def run(self):
+        """Keep a connection to the worker open, restarting the process if it is ours"""
+        backoff = 0.5
+        while True:
+            if self.spawn and (self.process is None or self.process.returncode is not None):
+                if self.process is not None:
+                    logger.warning("Simulation worker %s exited with code %s, restarting", self.name, self.process.returncode)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, MAX_RESTART_BACKOFF_SECONDS)
+                await self._spawn()
+            
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.socket_path)
+            except OSError:
+                # Not listening yet (starting up) or gone; retry shortly
+                await asyncio.sleep(0.1)
+                continue
+            
+            try:
+                message_type, _, payload = await read_frame(reader)
+                if message_type != MessageType.HELLO:
+                    raise ProtocolError(f"Expected HELLO, got {message_type.name}")
+                logger.info("Connected to simulation worker %s (pid %s)", self.name, decode_json(payload).get("pid"))
+                self.writer = writer
+                SIM_WORKERS_CONNECTED.inc()
+                backoff = 0.5
+                await self._dispatch(reader)
+            except (asyncio.IncompleteReadError, ConnectionError, ProtocolError) as e:
+                logger.warning("Lost connection to simulation worker %s: %s", self.name, e or type(e).__name__)
+            finally:
+                if self.writer is not None:
+                    self.writer = None
+                    SIM_WORKERS_CONNECTED.dec()
+                writer.close()
+                self.disconnect_counter.inc()
+                self._fail_sessions("Simulation worker restarted, please start the simulation again")
+            
+            # A worker we own that dropped its connection is unhealthy even if still running
+            if self.spawn and self.process is not None and self.process.returncode is None:
+                await self._terminate()
+    
+    async def _dispatch(self, reader: asyncio.StreamReader):
+        while True:
+            message_type, session_id, payload = await read_frame(reader)
+            session = self.sessions.get(session_id)
+            # Frames for sessions closed on this side are dropped
+            if session is not None:
+                session.messages.put_nowait((message_type, payload))
+    
+    def _fail_sessions(self, message: str):
+        error = dumps({"message": message})
+        for session in self.sessions.values():
+            session.messages.put_nowait((MessageType.ERROR, error))
+            session.messages.put_nowait((MessageType.END, b""))
+            self.session_gauge.dec()
+        self.sessions.clear()
+    
+    async def _spawn(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.workers.worker",
+            "--socket", self.socket_path,
+            "--parent-pid", str(os.getpid()),
+            env=env,
+        )
+        logger.info("Started simulation worker %s (pid %s)", self.name, self.process.pid)
+    
+    async def _terminate(self, timeout: float = 5.0):
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+class WorkerManager:
+    """Routes simulation sessions to worker processes"""
+    
+    def __init__(self, spawn_count: int = SIM_WORKERS, socket_paths: List[str] = SIM_WORKER_SOCKETS):
+        self.workers: List[Worker] = [Worker(os.path.basename(path), path, spawn=False) for path in socket_paths]
+        for i in range(spawn_count):
+            path = os.path.join(SIM_WORKER_SOCKET_DIR, f"landing-sim-{os.getpid()}-{i}.sock")
+            self.workers.append(Worker(f"worker-{i}", path, spawn=True))
+        self._tasks: List[asyncio.Task] = []
+        self._session_ids = itertools.count(1)
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.workers)
+    
+    async def start(self):
+        self._tasks = [asyncio.create_task(worker.run()) for worker in self.workers]
+    
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for worker in self.workers:
+            if worker.spawn:
+                await worker._terminate()
+    
+    async def open_session(self, wait: float = SIM_WORKER_WAIT_SECONDS) -> RemoteSession:
+        """Open a session on the least-loaded connected worker"""
+        deadline = asyncio.get_running_loop().time() + wait
+        while True:
+            connected = [worker for worker in self.workers if worker.connected]
+            if connected:
+                worker = min(connected, key=lambda w: len(w.sessions))
+                return worker.open_session(next(self._session_ids) % 0xFFFFFFFF + 1)
+            if asyncio.get_running_loop().time() >= deadline:
+                raise NoWorkerAvailable("No simulation worker available, please try again shortly")
+            await asyncio.sleep(0.1)
+
+
+worker_manager = WorkerManager()
@@ -0,0 +1,102 @@
+"""
+Framing protocol between the API process and simulation workers.
+
+Every frame is a fixed 9-byte header followed by the payload:
+
+    !I  payload length in bytes
+    !B  message type (MessageType)
+    !I  session id, chosen by the API (0 for connection-level messages)
+
+State frames, sent once per simulation step, are packed binary; rarer
+control and result messages carry JSON.
+"""
+
+import asyncio
+import struct
+from enum import IntEnum
+from typing import Tuple
+
+from app.serialization import dumps, loads
+
+HEADER = struct.Struct("!IBI")
+
+# Largest payload accepted; a full-resolution trajectory result is well below this
+MAX_PAYLOAD_BYTES = 64 * 1024 * 1024
+
+# Done flag followed by the fields of LandingEnv.get_state_dict(). Doubles keep the
+# relayed JSON identical to what an in-process session sends.
+STATE = struct.Struct("!B9d")
+ACTION = struct.Struct("!2d")
+
+
+class MessageType(IntEnum):
+    HELLO = 1    # worker -> API, JSON {"pid"}: sent once per connection
+    START = 2    # API -> worker, JSON {"mode", "scenario", "timings", "mpc_budget_ms"}: start an episode
+    ACTION = 3   # API -> worker, ACTION: apply a manual action
+    STOP = 4     # API -> worker, empty: stop the episode and release its objects
+    STATE = 5    # worker -> API, STATE: one simulation step
+    RESULT = 6   # worker -> API, JSON episode summary to persist
+    EVENT = 7    # worker -> API, JSON message relayed to the client as is
+    ERROR = 8    # worker -> API, JSON {"message"}
+    END = 9      # worker -> API, empty: the episode is over and its objects are released
+
+
+class ProtocolError(Exception):
+    """Raised on a malformed or oversized frame"""
+
+
+def encode_frame(message_type: MessageType, session_id: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(len(payload), message_type, session_id) + payload
+
+
+def encode_json(message_type: MessageType, session_id: int, obj) -> bytes:
+    return encode_frame(message_type, session_id, dumps(obj))
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[MessageType, int, bytes]:
+    """Read one frame; raises asyncio.IncompleteReadError when the peer closes"""
+    length, message_type, session_id = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD_BYTES:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_PAYLOAD_BYTES} byte limit")
+    try:
+        message_type = MessageType(message_type)
+    except ValueError:
+        raise ProtocolError(f"Unknown message type {message_type}")
+    payload = await reader.readexactly(length) if length else b""
+    return message_type, session_id, payload
+
+
+def decode_json(payload: bytes):
+    return loads(payload) if payload else {}
+
+
+def pack_state(state: dict, done: bool) -> bytes:
+    vx, vy = state["velocity"]
+    return STATE.pack(
+        done, state["altitude"], state["x"], vx, vy, state["tilt"],
+        state["angular_velocity"], state["fuel"], state["pad_x"], state["time"],
+    )
+
+
+def unpack_state(payload: bytes) -> Tuple[dict, bool]:
+    """Inverse of pack_state: (state dict as sent to clients, done flag)"""
+    done, altitude, x, vx, vy, tilt, angular_velocity, fuel, pad_x, t = STATE.unpack(payload)
+    state = {
+        "altitude": altitude,
+        "x": x,
+        "velocity": [vx, vy],
+        "tilt": tilt,
+        "angular_velocity": angular_velocity,
+        "fuel": fuel,
+        "pad_x": pad_x,
+        "time": t,
+    }
+    return state, bool(done)
+
+
+def pack_action(thrust: float, angle: float) -> bytes:
+    return ACTION.pack(thrust, angle)
+
+
+def unpack_action(payload: bytes) -> Tuple[float, float]:
+    return ACTION.unpack(payload)
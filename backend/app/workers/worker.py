@@ -0,0 +1,337 @@
+"""
+Simulation worker process.
+
+Hosts LandingEnv and policy execution for sessions relayed by the API over a
+Unix domain socket (see app/workers/protocol.py), so physics and torch
+inference do not compete with request handling for the API's GIL:
+
+    python -m app.workers.worker --socket /tmp/landing-sim-0.sock
+
+Workers are usually started and supervised by the API (SIM_WORKERS), but can
+also be run as a separate service and listed in SIM_WORKER_SOCKETS.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.agent import ppo_agent
+from app.agent.mpc_agent import MPC_BUDGET_MS, MPCAgent
+from app.logging_config import configure_logging
+from app.pool import PoolExhausted, agent_pool, env_pool
+from app.profiling import SessionProfile, section
+from app.workers.protocol import (
+    MessageType,
+    ProtocolError,
+    decode_json,
+    encode_frame,
+    encode_json,
+    pack_state,
+    read_frame,
+    unpack_action,
+)
+
+logger = logging.getLogger("app.workers.worker")
+
+
+class WorkerSession:
+    """
+    Environment, agent and running episode for one API-side session.
+    
+    Messages for the session are queued on `inbox` and handled in order by
+    its own task, so one session waiting on a pool does not hold up the
+    others sharing the API connection.
+    """
+    
+    def __init__(self, session_id: int, connection: "Connection"):
+        self.session_id = session_id
+        self.connection = connection
+        self.env = None
+        self.agent = None
+        self.planner: Optional[MPCAgent] = None
+        self.task: Optional[asyncio.Task] = None
+        self.profile: Optional[SessionProfile] = None
+        self.inbox: "asyncio.Queue[Tuple[MessageType, object]]" = asyncio.Queue()
+        self.handler = asyncio.create_task(handle_session(self))
+    
+    async def send(self, frame: bytes):
+        await self.connection.send(frame)
+    
+    async def send_state(self, done: bool):
+        with section(self.profile, "serialization"):
+            frame = encode_frame(MessageType.STATE, self.session_id, pack_state(self.env.get_state_dict(), done))
+        await self.send(frame)
+
+
+class Connection:
+    """One API process connected to this worker"""
+    
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.sessions: Dict[int, WorkerSession] = {}
+    
+    async def send(self, frame: bytes):
+        self.writer.write(frame)
+        await self.writer.drain()
+
+
+async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    connection = Connection(writer)
+    logger.info("API process connected")
+    try:
+        await connection.send(encode_json(MessageType.HELLO, 0, {"pid": os.getpid()}))
+        while True:
+            # Only decode and dispatch here; sessions handle their messages in their own tasks
+            message_type, session_id, payload = await read_frame(reader)
+            if message_type == MessageType.START:
+                message = decode_json(payload)
+            elif message_type == MessageType.ACTION:
+                message = unpack_action(payload)
+            elif message_type == MessageType.STOP:
+                message = None
+            else:
+                raise ProtocolError(f"Unexpected {message_type.name} message from API")
+            
+            session = connection.sessions.get(session_id)
+            if session is None:
+                session = connection.sessions[session_id] = WorkerSession(session_id, connection)
+            session.inbox.put_nowait((message_type, message))
+            if message_type == MessageType.STOP:
+                # Its handler stops the episode and exits after the queued messages
+                del connection.sessions[session_id]
+    except (asyncio.IncompleteReadError, ConnectionError):
+        logger.info("API process disconnected")
+    except ProtocolError:
+        logger.exception("Closing connection after a protocol error")
+    finally:
+        for session in list(connection.sessions.values()):
+            session.handler.cancel()
+            try:
+                await session.handler
+            except (asyncio.CancelledError, Exception):
+                pass
+            await stop_episode(session)
+        writer.close()
+
+
+async def handle_session(session: WorkerSession):
+    """Handle one session's messages in the order the API sent them, until it is stopped"""
+    while True:
+        message_type, message = await session.inbox.get()
+        try:
+            if message_type == MessageType.START:
+                await start_episode(session, message)
+            elif message_type == MessageType.ACTION:
+                await manual_step(session, *message)
+            elif message_type == MessageType.STOP:
+                await stop_episode(session)
+                return
+        except ConnectionError:
+            # The connection's read loop notices the disconnect and cleans up
+            return
+        except Exception:
+            logger.exception("Failed to handle %s for session %s", message_type.name, session.session_id)
+
+
+async def start_episode(session: WorkerSession, options: dict):
+    await stop_episode(session)
+    mode = options.get("mode", "auto")
+    try:
+        session.env = await env_pool.acquire()
+        if mode == "auto":
+            session.agent = await agent_pool.acquire()
+    except PoolExhausted as e:
+        await stop_episode(session)
+        await session.send(encode_json(MessageType.ERROR, session.session_id, {"message": str(e)}))
+        await session.send(encode_frame(MessageType.END, session.session_id))
+        return
+    # The scenario name was validated by the API
+    session.env.use_scenario(options.get("scenario"))
+    session.env.reset()
+    session.profile = SessionProfile() if options.get("timings") else None
+    if mode == "mpc":
+        # The budget was validated by the API
+        session.planner = MPCAgent(budget_ms=options.get("mpc_budget_ms", MPC_BUDGET_MS))
+    
+    if mode in ("auto", "mpc"):
+        session.task = asyncio.create_task(run_auto_simulation(session))
+    elif mode == "train":
+        session.task = asyncio.create_task(run_train_simulation(session))
+    elif mode == "manual":
+        await session.send_state(done=False)
+
+
+async def stop_episode(session: WorkerSession):
+    """Cancel a running episode and return its objects to the pools"""
+    task, session.task = session.task, None
+    if task is not None and task is not asyncio.current_task():
+        task.cancel()
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+    if session.env is not None:
+        await env_pool.release(session.env)
+        session.env = None
+    if session.agent is not None:
+        await agent_pool.release(session.agent, discard=session.agent.model is None)
+        session.agent = None
+    session.planner = None
+
+
+async def manual_step(session: WorkerSession, thrust: float, angle: float):
+    if session.env is None:
+        await session.send(encode_json(MessageType.ERROR, session.session_id, {"message": "Environment not initialized"}))
+        return
+    action = np.array([thrust, angle])
+    with section(session.profile, "env_step"):
+        obs, reward, terminated, truncated, info = session.env.step(action)
+    await session.send_state(terminated or truncated)
+    if terminated or truncated:
+        await finish_episode(session, info)
+
+
+async def run_auto_simulation(session: WorkerSession):
+    """Run one episode with the session's planner or agent (or random actions if no model)"""
+    env, agent, planner = session.env, session.agent, session.planner
+    obs, _ = env.reset()
+    try:
+        while True:
+            # MPC planning awaits a thread, so it is timed by wall clock only
+            with section(session.profile, "inference", awaits=planner is not None):
+                if planner is not None:
+                    action = await asyncio.to_thread(planner.plan, env)
+                elif agent and agent.model:
+                    action = agent.predict(obs)
+                else:
+                    action = env.action_space.sample()
+            
+            with section(session.profile, "env_step"):
+                obs, reward, terminated, truncated, info = env.step(action)
+            
+            await session.send_state(terminated or truncated)
+            
+            # Same pacing as in-process sessions, for visualization
+            await asyncio.sleep(0.05)
+            
+            if terminated or truncated:
+                await finish_episode(session, info)
+                break
+    except (ConnectionError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        logger.exception("Simulation failed for session %s", session.session_id)
+        await session.send(encode_json(MessageType.ERROR, session.session_id, {"message": str(e)}))
+        await stop_episode(session)
+        await session.send(encode_frame(MessageType.END, session.session_id))
+
+
+async def run_train_simulation(session: WorkerSession):
+    """Run the placeholder training loop, relaying training events"""
+    env = session.env
+    obs, _ = env.reset()
+    episode = 0
+    
+    while episode < 10:
+        action = env.action_space.sample()
+        obs, reward, terminated, truncated, info = env.step(action)
+        
+        await session.send_state(False)
+        await asyncio.sleep(0.05)
+        
+        if terminated or truncated:
+            episode += 1
+            await session.send(encode_json(MessageType.EVENT, session.session_id, {
+                "type": "training",
+                "episode": episode,
+                "reward": float(info.get("reward", 0))
+            }))
+            obs, _ = env.reset()
+    
+    await session.send(encode_json(MessageType.EVENT, session.session_id, {
+        "type": "training_complete",
+        "message": "Training simulation complete"
+    }))
+    await stop_episode(session)
+    await session.send(encode_frame(MessageType.END, session.session_id))
+
+
+async def finish_episode(session: WorkerSession, info: dict):
+    """Send the episode summary for the API to persist, then release the session's objects"""
+    result = {
+        "success": info.get("success", False),
+        "fuel_used": info.get("fuel_used", 0.0),
+        "trajectory": info.get("trajectory", []),
+        "seed": info.get("seed"),
+        "scenario": info.get("scenario"),
+    }
+    if session.profile is not None:
+        result["timings"] = session.profile.timings()
+    await session.send(encode_json(MessageType.RESULT, session.session_id, result))
+    await stop_episode(session)
+    await session.send(encode_frame(MessageType.END, session.session_id))
+
+
+async def warm_up():
+    """Pre-build pooled environments and agents so the first sessions do not wait"""
+    await env_pool.prefill()
+    try:
+        await asyncio.to_thread(ppo_agent.warm_up)
+        await agent_pool.prefill()
+    except Exception:
+        logger.exception("ML warm-up failed; models will be loaded on demand")
+
+
+async def watch_parent(parent_pid: int, stop: asyncio.Event):
+    """Exit when the API process that spawned this worker goes away"""
+    while os.getppid() == parent_pid:
+        await asyncio.sleep(1.0)
+    logger.warning("Parent process %s exited, shutting down", parent_pid)
+    stop.set()
+
+
+async def serve(socket_path: str, parent_pid: Optional[int] = None):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(handle_connection, path=socket_path)
+    logger.info("Simulation worker %s listening on %s", os.getpid(), socket_path)
+    
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    background = [asyncio.create_task(warm_up())]
+    if parent_pid:
+        background.append(asyncio.create_task(watch_parent(parent_pid, stop)))
+    
+    try:
+        await stop.wait()
+    finally:
+        for task in background:
+            task.cancel()
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a simulation worker")
+    parser.add_argument("--socket", required=True, help="Unix domain socket path to listen on")
+    parser.add_argument("--parent-pid", type=int, default=None, help="Exit when this process is no longer the parent")
+    args = parser.parse_args()
+    
+    configure_logging()
+    asyncio.run(serve(args.socket, args.parent_pid))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Tunable permessage-deflate for WebSocket connections.
+
+uvicorn negotiates permessage-deflate with fixed settings and compresses
+every message. `CompressedWebSocketsProtocol` negotiates it with the
+window, level and memory settings below, and sends messages smaller than
+WS_DEFLATE_MIN_SIZE uncompressed (RSV1 clear), where deflate would cost
+more CPU than it saves. Select it with:
+
+    uvicorn app.main:app --ws app.ws_compression:CompressedWebSocketsProtocol
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Sequence
+
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CONT, CTRL_OPCODES, Frame
+from websockets.server import ServerProtocol
+
+WS_DEFLATE = os.getenv("WS_DEFLATE", "true").lower() in ("1", "true", "yes")
+# zlib compression level (1 = fastest, 9 = smallest)
+WS_DEFLATE_LEVEL = int(os.getenv("WS_DEFLATE_LEVEL", "6"))
+# LZ77 window for server-to-client messages (9-15); larger compresses repeated frames better
+WS_DEFLATE_WINDOW_BITS = int(os.getenv("WS_DEFLATE_WINDOW_BITS", "12"))
+WS_DEFLATE_MEM_LEVEL = int(os.getenv("WS_DEFLATE_MEM_LEVEL", "5"))
+# Messages smaller than this many bytes are sent uncompressed
+WS_DEFLATE_MIN_SIZE = int(os.getenv("WS_DEFLATE_MIN_SIZE", "128"))
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """PerMessageDeflate that leaves messages below `min_size` bytes uncompressed"""
+    
+    def __init__(self, *args, min_size: int = WS_DEFLATE_MIN_SIZE, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        # Whether the message being sent in continuation frames was left raw
+        self._raw_message = False
+    
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        if frame.opcode is not CONT:
+            # The first frame decides for the whole message
+            self._raw_message = frame.fin and len(frame.data) < self.min_size
+        if self._raw_message:
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdServerPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negotiates permessage-deflate and hands out ThresholdPerMessageDeflate extensions"""
+    
+    def __init__(self, min_size: int = WS_DEFLATE_MIN_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+    
+    def process_request_params(self, params: Sequence[Any], accepted_extensions: Sequence[Any]):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def deflate_factory(
+    level: int = WS_DEFLATE_LEVEL,
+    window_bits: int = WS_DEFLATE_WINDOW_BITS,
+    mem_level: int = WS_DEFLATE_MEM_LEVEL,
+    min_size: int = WS_DEFLATE_MIN_SIZE,
+) -> ThresholdServerPerMessageDeflateFactory:
+    compress_settings: Dict[str, Any] = {"level": level, "memLevel": mem_level}
+    return ThresholdServerPerMessageDeflateFactory(
+        min_size=min_size,
+        server_max_window_bits=window_bits,
+        client_max_window_bits=window_bits,
+        compress_settings=compress_settings,
+    )
+
+
+class CompressedWebSocketsProtocol(WebSocketsSansIOProtocol):
+    """uvicorn's websockets protocol with the permessage-deflate settings above"""
+    
+    def __init__(self, config, server_state, app_state, _loop: Optional[Any] = None):
+        super().__init__(config, server_state, app_state, _loop)
+        # Rebuild the connection state machine with our extension; nothing has been
+        # received yet, so no other state refers to the default one
+        extensions = [deflate_factory()] if WS_DEFLATE and config.ws_per_message_deflate else []
+        self.conn = ServerProtocol(
+            extensions=extensions,
+            max_size=config.ws_max_size,
+            logger=logging.getLogger("uvicorn.error"),
+        )
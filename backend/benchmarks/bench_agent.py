@@ -0,0 +1,53 @@
+"""PPOAgent.predict latency, single observation and batched, for a PPO model and a distilled student."""
+
+import numpy as np
+
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+BATCH_SIZE = 64
+
+
+@benchmark("agent")
+def predict(ctx: BenchContext):
+    from stable_baselines3 import PPO
+    
+    from app.agent.ppo_agent import PPOAgent
+    from app.rl_env.landing_env import LandingEnv
+    
+    # An untrained policy has the same architecture, hence the same cost, as a trained one
+    env = LandingEnv()
+    agent = PPOAgent(model_path="benchmark-unused.zip")
+    agent.model = PPO("MlpPolicy", env, verbose=0, seed=0, device="cpu")
+    
+    obs, _ = env.reset(seed=0)
+    batch = np.stack([env.observation_space.sample() for _ in range(BATCH_SIZE)])
+    
+    single = time_per_op(lambda: agent.predict(obs))
+    batched = time_per_op(lambda: agent.predict(batch))
+    return {
+        "predict_single": timing(single),
+        "predict_batch": timing(batched, batch_size=BATCH_SIZE, per_observation=batched / BATCH_SIZE),
+    }
+
+
+@benchmark("agent")
+def predict_student(ctx: BenchContext):
+    from app.agent.distill import DISTILL_HIDDEN
+    from app.agent.ppo_agent import PPOAgent
+    from app.rl_env.landing_env import LandingEnv
+    from benchmarks.bench_memory import random_student
+    
+    env = LandingEnv()
+    agent = PPOAgent(model_path="benchmark-unused.npz")
+    agent.model = random_student()
+    
+    obs, _ = env.reset(seed=0)
+    batch = np.stack([env.observation_space.sample() for _ in range(BATCH_SIZE)])
+    
+    single = time_per_op(lambda: agent.predict(obs))
+    batched = time_per_op(lambda: agent.predict(batch))
+    return {
+        "student_predict_single": timing(single, hidden=list(DISTILL_HIDDEN)),
+        "student_predict_batch": timing(batched, batch_size=BATCH_SIZE, per_observation=batched / BATCH_SIZE),
+        "student_weight_bytes": measurement(agent.model.nbytes, "bytes"),
+    }
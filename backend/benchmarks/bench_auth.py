@@ -0,0 +1,35 @@
+"""JWT verification and Argon2 hashing cost."""
+
+from app.auth import create_access_token, token_cache, verify_token
+from app.utils.password import hash_password, verify_password
+from benchmarks.harness import BenchContext, benchmark, time_per_op, timing
+
+
+@benchmark("auth")
+def tokens(ctx: BenchContext):
+    token = create_access_token({"sub": "1", "email": "bench@example.com"})
+
+    def uncached():
+        token_cache.clear()
+        verify_token(token)
+
+    token_cache.clear()
+    verify_token(token)
+    cached = time_per_op(lambda: verify_token(token))
+    results = {
+        "verify_token_uncached": timing(time_per_op(uncached)),
+        "verify_token_cached": timing(cached),
+    }
+    token_cache.clear()
+    return results
+
+
+@benchmark("auth")
+def argon2(ctx: BenchContext):
+    password = "Benchmark1!"
+    hashed = hash_password(password)
+    repeat = 3 if ctx.quick else 5
+    return {
+        "hash_password": timing(time_per_op(lambda: hash_password(password), repeat=repeat, number=1)),
+        "verify_password": timing(time_per_op(lambda: verify_password(password, hashed), repeat=repeat, number=1)),
+    }
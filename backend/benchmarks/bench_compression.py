@@ -0,0 +1,89 @@
+"""Bytes on the wire with permessage-deflate on WebSocket frames and gzip on REST responses."""
+
+import gzip
+import os
+from datetime import datetime
+
+from websockets.frames import Frame, Opcode
+
+from app.serialization import dumps, dumps_str
+from app.ws_compression import (
+    WS_DEFLATE_LEVEL,
+    WS_DEFLATE_MEM_LEVEL,
+    WS_DEFLATE_MIN_SIZE,
+    WS_DEFLATE_WINDOW_BITS,
+    ThresholdPerMessageDeflate,
+)
+from benchmarks.bench_trajectory import smooth_episode
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+
+def frame_header_bytes(payload_size: int) -> int:
+    """Server-to-client frame header size (unmasked)"""
+    if payload_size < 126:
+        return 2
+    return 4 if payload_size < 65536 else 10
+
+
+def deflate_extension(min_size: int = WS_DEFLATE_MIN_SIZE) -> ThresholdPerMessageDeflate:
+    """The server side of a connection negotiated with the configured settings"""
+    return ThresholdPerMessageDeflate(
+        False, False, WS_DEFLATE_WINDOW_BITS, WS_DEFLATE_WINDOW_BITS,
+        {"level": WS_DEFLATE_LEVEL, "memLevel": WS_DEFLATE_MEM_LEVEL},
+        min_size=min_size,
+    )
+
+
+def wire_bytes(messages, extension=None) -> int:
+    total = 0
+    for message in messages:
+        frame = Frame(Opcode.TEXT, message.encode("utf-8"))
+        if extension is not None:
+            frame = extension.encode(frame)
+        total += frame_header_bytes(len(frame.data)) + len(frame.data)
+    return total
+
+
+@benchmark("compression")
+def websocket_frames(ctx: BenchContext):
+    trajectory = smooth_episode()
+    # The frames one auto episode sends: a state per step, then the result
+    messages = [dumps_str({"type": "state", **step["state"]}) for step in trajectory]
+    messages.append(dumps_str({"type": "result", "success": False, "fuel_used": 12.5, "landing_accuracy": 0.4}))
+    
+    raw = wire_bytes(messages)
+    compressed = wire_bytes(messages, deflate_extension())
+    
+    state_message = messages[len(messages) // 2]
+    extension = deflate_extension(min_size=0)
+    state_frame = Frame(Opcode.TEXT, state_message.encode("utf-8"))
+    return {
+        "episode_raw_bytes": measurement(raw, "bytes", messages=len(messages)),
+        "episode_deflate_bytes": measurement(compressed, "bytes", messages=len(messages), window_bits=WS_DEFLATE_WINDOW_BITS, level=WS_DEFLATE_LEVEL),
+        "episode_deflate_ratio": measurement(raw / compressed, "x", higher_is_better=True),
+        "deflate_state_frame": timing(time_per_op(lambda: extension.encode(state_frame))),
+    }
+
+
+@benchmark("compression")
+def rest_responses(ctx: BenchContext):
+    trajectory = smooth_episode()
+    episodes = [
+        {"id": i, "timestamp": datetime(2026, 1, 1, 12, i % 60).isoformat(), "success": i % 3 == 0, "fuel_used": 10.0 + i * 0.37, "landing_accuracy": 1.0 / (1 + i)}
+        for i in range(100)
+    ]
+    bodies = {
+        "episode_list": dumps(episodes),
+        "trajectory": dumps({"episode_id": 1, "error_bound": 0.0, "compression_ratio": 1.0, "steps": trajectory}),
+    }
+    
+    results = {}
+    for name, body in bodies.items():
+        compressed = gzip.compress(body, GZIP_LEVEL)
+        results[f"{name}_raw_bytes"] = measurement(len(body), "bytes")
+        results[f"{name}_gzip_bytes"] = measurement(len(compressed), "bytes", level=GZIP_LEVEL)
+        results[f"{name}_gzip_ratio"] = measurement(len(body) / len(compressed), "x", higher_is_better=True)
+        results[f"{name}_gzip"] = timing(time_per_op(lambda: gzip.compress(body, GZIP_LEVEL)))
+    return results
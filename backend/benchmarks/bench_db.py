@@ -0,0 +1,130 @@
+"""Episode insert and list query time against SQLite at increasing table sizes, with and without the response cache."""
+
+import os
+import random
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+from app import http_cache
+from app.database import Base
+from app.models import Episode, User
+from app.routers.episodes import EpisodeResponse
+from app.serialization import dumps_str, loads
+from benchmarks.harness import BenchContext, benchmark, time_per_op, timing
+
+USERS = 10
+TRAJECTORY_STEPS = 5
+BULK_CHUNK = 5_000
+
+
+def _trajectory(rng: random.Random):
+    return [
+        {
+            "state": {
+                "altitude": rng.uniform(0, 500), "x": rng.uniform(-100, 100),
+                "vx": rng.uniform(-10, 10), "vy": rng.uniform(-50, 0),
+                "tilt": rng.uniform(-0.5, 0.5), "angular_velocity": rng.uniform(-0.5, 0.5),
+                "fuel": rng.uniform(0, 100), "pad_x": rng.uniform(-50, 50), "time": step * 0.1,
+            },
+            "action": [rng.random(), rng.uniform(-1, 1)],
+            "reward": rng.uniform(-10, 0),
+        }
+        for step in range(TRAJECTORY_STEPS)
+    ]
+
+
+def _populate(session_factory, rows: int):
+    rng = random.Random(0)
+    with session_factory() as db:
+        db.execute(insert(User), [
+            {"id": user_id, "email": f"bench{user_id}@example.com", "password_hash": "x"}
+            for user_id in range(1, USERS + 1)
+        ])
+        for start in range(0, rows, BULK_CHUNK):
+            db.execute(insert(Episode), [
+                {
+                    "user_id": 1 + (i % USERS),
+                    "success": rng.random() < 0.1,
+                    "fuel_used": rng.uniform(0, 100),
+                    "landing_accuracy": rng.random(),
+                    "trajectory_data": _trajectory(rng),
+                }
+                for i in range(start, min(rows, start + BULK_CHUNK))
+            ])
+        db.commit()
+
+
+@benchmark("db")
+def episodes(ctx: BenchContext):
+    results = {}
+    row_counts = ctx.db_rows[:1] if ctx.quick else ctx.db_rows
+    for rows in row_counts:
+        path = os.path.join(ctx.tmp_dir, f"bench_episodes_{rows}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        engine = create_engine(
+            f"sqlite:///{path}",
+            connect_args={"check_same_thread": False},
+            json_serializer=dumps_str,
+            json_deserializer=loads,
+        )
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        started = time.perf_counter()
+        _populate(session_factory, rows)
+        populate_seconds = time.perf_counter() - started
+
+        rng = random.Random(1)
+        db = session_factory()
+        try:
+            def insert_one():
+                db.add(Episode(
+                    user_id=1, success=False, fuel_used=1.0, landing_accuracy=0.5,
+                    trajectory_data=_trajectory(rng),
+                ))
+                db.commit()
+
+            def list_user():
+                # The query GET /episodes runs for one user
+                db.query(Episode).filter(Episode.user_id == 2).order_by(Episode.timestamp.desc()).all()
+                db.expunge_all()
+
+            def build():
+                episodes = db.query(Episode).filter(Episode.user_id == 2).order_by(Episode.timestamp.desc()).all()
+                return [EpisodeResponse.model_validate(episode).model_dump(mode="json") for episode in episodes]
+
+            def get(headers=()):
+                request = Request({"type": "http", "method": "GET", "headers": list(headers)})
+                response = http_cache.cached_json(request, db, 2, "episodes", "0-all", build)
+                db.expunge_all()
+                return response
+
+            results[f"insert_{rows}"] = timing(time_per_op(insert_one, repeat=3, min_time=0.1))
+            results[f"list_user_{rows}"] = timing(
+                time_per_op(list_user, repeat=3, min_time=0.1),
+                rows_returned=rows // USERS,
+                populate_seconds=round(populate_seconds, 3),
+            )
+
+            # GET /episodes: serialized on a miss, served from the cache, and revalidated to a 304
+            http_cache._responses.clear()
+            body_bytes = len(get().body)
+            results[f"list_serialize_{rows}"] = timing(
+                time_per_op(lambda: (http_cache._responses.clear(), get()), repeat=3, min_time=0.1),
+                body_bytes=body_bytes,
+            )
+            results[f"list_cached_{rows}"] = timing(time_per_op(get, repeat=3, min_time=0.1))
+            etag = get().headers["etag"].encode()
+            results[f"list_not_modified_{rows}"] = timing(
+                time_per_op(lambda: get([(b"if-none-match", etag)]), repeat=3, min_time=0.1)
+            )
+            http_cache._responses.clear()
+        finally:
+            db.close()
+            engine.dispose()
+            os.remove(path)
+    return results
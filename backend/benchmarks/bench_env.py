@@ -0,0 +1,67 @@
+"""LandingEnv reset/step throughput, and the steps early termination saves."""
+
+import numpy as np
+
+from app.rl_env.landing_env import LandingEnv
+from app.rl_env.scenarios import ResetBank
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+ACTION = np.array([0.5, 0.0], dtype=np.float32)
+
+
+def _stepper(env: LandingEnv):
+    env.reset(seed=0)
+    
+    def step():
+        _, _, terminated, truncated, _ = env.step(ACTION)
+        if terminated or truncated:
+            env.reset()
+    return step
+
+
+@benchmark("env")
+def reset_and_step(ctx: BenchContext):
+    env = LandingEnv()
+    results = {"reset": timing(time_per_op(lambda: env.reset(seed=0)))}
+    # Unseeded resets with a bank take its next precomputed state
+    bank = ResetBank("default", 10_000, seed=0)
+    banked = LandingEnv(reset_bank=bank)
+    results["reset_from_bank"] = timing(time_per_op(banked.reset), bank_seed=bank.seed, bank_size=len(bank))
+    # What a session paid per start before environments were pooled
+    results["construct"] = timing(time_per_op(LandingEnv))
+    
+    # Recording copies the growing trajectory into `info` on every step
+    results["step_recording"] = timing(time_per_op(_stepper(LandingEnv(record_trajectory=True))))
+    results["step_no_recording"] = timing(time_per_op(_stepper(LandingEnv(record_trajectory=False))))
+    
+    for name in ("step_recording", "step_no_recording"):
+        results[name]["steps_per_sec"] = 1.0 / results[name]["value"]
+    return results
+
+
+def _episode_steps(env: LandingEnv, seed: int) -> int:
+    """Steps of one episode with uniformly random actions drawn from `seed`"""
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    steps = 0
+    while True:
+        steps += 1
+        _, _, terminated, truncated, _ = env.step(rng.uniform(env.action_space.low, env.action_space.high).astype(np.float32))
+        if terminated or truncated:
+            return steps
+
+
+@benchmark("env")
+def early_termination(ctx: BenchContext):
+    # The same seeds and actions with and without the feasibility check, as at the start of training
+    seeds = range(50 if ctx.quick else 500)
+    full = sum(_episode_steps(LandingEnv(record_trajectory=False), seed) for seed in seeds)
+    env = LandingEnv(record_trajectory=False, early_termination=True)
+    early = sum(_episode_steps(env, seed) for seed in seeds)
+    
+    # Most episodes end after one step, so time the check itself rather than steps
+    env.reset(seed=0)
+    return {
+        "steps_saved_per_million": measurement((full - early) / full * 1e6, "steps", higher_is_better=True, episodes=len(seeds)),
+        "feasibility_check": timing(time_per_op(env._landing_feasible)),
+    }
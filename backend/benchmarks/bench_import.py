@@ -0,0 +1,92 @@
+"""
+Cold import time of the API process.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the cumulative time plus the slowest top-level packages. Run as a
+module to regenerate the checked-in report:
+
+    python -m benchmarks.bench_import --report
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.harness import BenchContext, benchmark, timing
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_PATH = os.path.join(os.path.dirname(__file__), "importtime_report.txt")
+
+# Packages that must stay out of the API's import graph until a model is needed
+HEAVY_MODULES = ("torch", "stable_baselines3")
+
+
+def run_importtime(module: str = "app.main") -> List[Tuple[str, int, int, int]]:
+    """Import `module` in a fresh interpreter; returns (name, self_us, cumulative_us, depth) rows"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def summarize(rows) -> Dict[str, object]:
+    """Total time, heavy modules loaded and the packages that cost the most to import"""
+    loaded = {name for name, _, _, _ in rows}
+    # Sum self time per root package, so nested imports are charged to their own package
+    by_package: Dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return {
+        "total_s": sum(cumulative_us for _, _, cumulative_us, depth in rows if depth == 0) / 1e6,
+        "modules": len(rows),
+        "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded],
+        "slowest": sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:15],
+    }
+
+
+@benchmark("startup")
+def import_app(ctx: BenchContext):
+    runs = 1 if ctx.quick else 3
+    summaries = [summarize(run_importtime()) for _ in range(runs)]
+    best = min(summaries, key=lambda summary: summary["total_s"])
+    # Pulling torch back in shows up as a multi-second jump against the baseline
+    return {"import_app_main": timing(best["total_s"], modules=best["modules"], heavy_loaded=best["heavy_loaded"])}
+
+
+def write_report(path: str = REPORT_PATH):
+    summary = summarize(run_importtime())
+    lines = [
+        "# python -X importtime -c \"import app.main\"",
+        f"total: {summary['total_s']:.3f}s across {summary['modules']} modules",
+        f"heavy modules loaded: {', '.join(summary['heavy_loaded']) or 'none'}",
+        "",
+        "slowest packages (summed self time):",
+    ]
+    lines += [f"  {us / 1000:9.1f} ms  {name}" for name, us in summary["slowest"]]
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", action="store_true", help=f"Write the report to {os.path.relpath(REPORT_PATH, BACKEND_DIR)}")
+    args = parser.parse_args()
+    if args.report:
+        write_report()
+    else:
+        print(summarize(run_importtime()))
@@ -0,0 +1,159 @@
+"""
+Memory per serving process: PPO models with private or shared (memory-mapped) weights, and a distilled student.
+
+Starts `workers` fresh interpreters that each load `agents` pooled
+PPOAgents for the same model, as API or simulation worker processes do,
+and reads their RSS, PSS (shared pages divided among the processes that map
+them) and USS (private pages) from /proc/<pid>/smaps_rollup. Linux only.
+A student (app/agent/distill.py) is served with NumPy alone, so its
+processes never import torch. Run as a module for a table across modes and
+model sizes:
+
+    python -m benchmarks.bench_memory --workers 4 --agents 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.harness import BenchContext, benchmark, measurement
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Policy sizes: the default MlpPolicy, and one large enough for its weights to dominate
+NET_ARCHS = {"default": None, "large": [1024, 1024]}
+
+# Loads `agents` PPOAgents, runs one prediction each, reports readiness, then waits to be measured
+_WORKER_SCRIPT = """
+import sys
+from app.agent.ppo_agent import PPOAgent
+from app.rl_env.landing_env import LandingEnv
+agents = [PPOAgent(sys.argv[1]) for _ in range(int(sys.argv[2]))]
+for agent in agents:
+    agent.load()
+    agent.predict(LandingEnv().reset(seed=0)[0])
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+
+def smaps_rollup(pid: int) -> Dict[str, float]:
+    """RSS, PSS and USS of a process in MB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": values["Rss"],
+        "pss": values["Pss"],
+        "uss": values["Private_Clean"] + values["Private_Dirty"],
+    }
+
+
+def make_model(path: str, net_arch=None):
+    """
+    Save a PPO model with hidden layers `net_arch` (None for the default) to `path`.
+    
+    It trains for one short rollout first, so the file carries the optimizer
+    state a trained model has.
+    """
+    from stable_baselines3 import PPO
+    
+    from app.rl_env.landing_env import LandingEnv
+    
+    policy_kwargs = {"net_arch": net_arch} if net_arch is not None else None
+    model = PPO("MlpPolicy", LandingEnv(), verbose=0, seed=0, n_steps=64, batch_size=64, n_epochs=1, policy_kwargs=policy_kwargs)
+    model.learn(64)
+    model.save(path)
+
+
+def random_student():
+    """A student of the default size with random weights (it costs the same as a trained one)"""
+    from app.agent.distill import DISTILL_HIDDEN
+    from app.agent.student_policy import StudentPolicy
+    from app.rl_env.landing_env import LandingEnv
+    
+    env = LandingEnv()
+    rng = np.random.default_rng(0)
+    sizes = [env.observation_space.shape[0], *DISTILL_HIDDEN, env.action_space.shape[0]]
+    return StudentPolicy(
+        [rng.normal(size=(n_in, n_out)) for n_in, n_out in zip(sizes, sizes[1:])],
+        [rng.normal(size=n_out) for n_out in sizes[1:]],
+        env.action_space.low,
+        env.action_space.high,
+    )
+
+
+def measure(model_path: str, shared: bool, workers: int, agents: int) -> Dict[str, float]:
+    """Mean RSS / PSS / USS in MB of `workers` processes serving `model_path`"""
+    env = {**os.environ, "SHARED_WEIGHTS": "true" if shared else "false", "TORCH_NUM_THREADS": "1"}
+    procs: List[subprocess.Popen] = []
+    try:
+        for _ in range(workers):
+            procs.append(subprocess.Popen(
+                [sys.executable, "-c", _WORKER_SCRIPT, model_path, str(agents)],
+                cwd=BACKEND_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            ))
+        for proc in procs:
+            # PPOAgent.load prints to stdout as well
+            if "ready" not in (line.strip() for line in iter(proc.stdout.readline, "")):
+                raise RuntimeError("Memory benchmark worker failed to load the model")
+        samples = [smaps_rollup(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+    return {key: sum(sample[key] for sample in samples) / len(samples) for key in ("rss", "pss", "uss")}
+
+
+@benchmark("memory")
+def serving_processes(ctx: BenchContext):
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        return {}
+    workers, agents = (2, 2) if ctx.quick else (4, 4)
+    results = {}
+    for arch_name, net_arch in NET_ARCHS.items():
+        model_path = os.path.join(ctx.tmp_dir, f"bench_memory_{arch_name}.zip")
+        make_model(model_path, net_arch)
+        for mode in ("private", "shared"):
+            usage = measure(model_path, mode == "shared", workers, agents)
+            for key, value in usage.items():
+                results[f"{arch_name}_{mode}_{key}_mb"] = measurement(round(value, 1), "MB", workers=workers, agents=agents)
+    student_path = os.path.join(ctx.tmp_dir, "bench_memory_student.npz")
+    random_student().save(student_path)
+    for key, value in measure(student_path, True, workers, agents).items():
+        results[f"student_{key}_mb"] = measurement(round(value, 1), "MB", workers=workers, agents=agents)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="serving processes to start")
+    parser.add_argument("--agents", type=int, default=8, help="pooled agents per process")
+    args = parser.parse_args(argv)
+    
+    print(f"{args.workers} processes x {args.agents} agents, mean MB per process")
+    print(f"{'model':<10}{'weights':<10}{'RSS':>10}{'PSS':>10}{'USS':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for arch_name, net_arch in NET_ARCHS.items():
+            model_path = os.path.join(tmp_dir, f"{arch_name}.zip")
+            make_model(model_path, net_arch)
+            for mode in ("private", "shared"):
+                usage = measure(model_path, mode == "shared", args.workers, args.agents)
+                print(f"{arch_name:<10}{mode:<10}{usage['rss']:>10.1f}{usage['pss']:>10.1f}{usage['uss']:>10.1f}")
+        student_path = os.path.join(tmp_dir, "student.npz")
+        random_student().save(student_path)
+        usage = measure(student_path, True, args.workers, args.agents)
+        print(f"{'student':<10}{'numpy':<10}{usage['rss']:>10.1f}{usage['pss']:>10.1f}{usage['uss']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
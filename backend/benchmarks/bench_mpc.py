@@ -0,0 +1,104 @@
+"""Vectorized dynamics throughput and MPC autopilot latency and landing performance."""
+
+import os
+
+import numpy as np
+
+from app.agent.mpc_agent import MPC_BUDGET_MS, MPC_HORIZON, MPC_SAMPLES, MPCAgent
+from app.rl_env.landing_env import LandingEnv
+from app.rl_env.vector_dynamics import LandingDynamics
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+MODEL_PATH = "models/ppo_landing.zip"
+
+
+def dynamics_deviation(episodes: int = 5) -> float:
+    """Largest state or reward difference between LandingEnv and LandingDynamics on random episodes"""
+    env = LandingEnv(record_trajectory=False)
+    dynamics = LandingDynamics(env)
+    worst = 0.0
+    for seed in range(episodes):
+        env.reset(seed=seed)
+        rng = np.random.default_rng(seed)
+        states = LandingDynamics.state_from_env(env)[:, None].copy()
+        while True:
+            action = rng.uniform([0.0, -1.0], [1.0, 1.0])
+            _, reward, terminated, truncated, _ = env.step(action)
+            rewards, _, _ = dynamics.step(states, action[:1], action[1:])
+            worst = max(worst, float(np.abs(LandingDynamics.state_from_env(env) - states[:, 0]).max()), abs(reward - rewards[0]))
+            if terminated or truncated:
+                break
+    return worst
+
+
+def run_episodes(policy, episodes: int) -> dict:
+    """Success rate, mean return and mean length of `policy(env, obs)` over seeded episodes"""
+    env = LandingEnv(record_trajectory=False)
+    successes, returns, lengths = 0, [], []
+    for seed in range(episodes):
+        obs, _ = env.reset(seed=seed)
+        env.action_space.seed(seed)
+        total, steps = 0.0, 0
+        while True:
+            obs, reward, terminated, truncated, info = env.step(policy(env, obs, seed))
+            total += reward
+            steps += 1
+            if terminated or truncated:
+                break
+        successes += bool(info["success"])
+        returns.append(total)
+        lengths.append(steps)
+    return {"success_rate": successes / episodes, "mean_return": float(np.mean(returns)), "mean_length": float(np.mean(lengths))}
+
+
+@benchmark("mpc")
+def rollouts(ctx: BenchContext):
+    env = LandingEnv(record_trajectory=False)
+    env.reset(seed=0)
+    dynamics = LandingDynamics(env)
+    state = LandingDynamics.state_from_env(env)
+    actions = np.random.default_rng(0).uniform([0.0, -1.0], [1.0, 1.0], size=(MPC_SAMPLES, MPC_HORIZON, 2))
+    
+    seconds = time_per_op(lambda: dynamics.rollout(state, actions))
+    return {
+        "rollout_batch": timing(seconds, sequences=MPC_SAMPLES, horizon=MPC_HORIZON),
+        "rollout_steps_per_sec": measurement(MPC_SAMPLES * MPC_HORIZON / seconds, "steps/s", higher_is_better=True),
+        # Must stay 0: the planner is only as good as its copy of the physics
+        "dynamics_max_deviation": measurement(dynamics_deviation(), "abs"),
+    }
+
+
+@benchmark("mpc")
+def autopilot(ctx: BenchContext):
+    episodes = 3 if ctx.quick else 10
+    planners = {}
+    
+    def mpc_policy(env, obs, seed):
+        if seed not in planners:
+            planners[seed] = MPCAgent(seed=seed)
+        return planners[seed].plan(env)
+    
+    env = LandingEnv(record_trajectory=False)
+    env.reset(seed=0)
+    planner = MPCAgent(seed=0)
+    results = {
+        "plan": timing(time_per_op(lambda: planner.plan(env), repeat=3), budget_ms=MPC_BUDGET_MS),
+        "plan_iterations": measurement(planner.last_iterations, "iterations", higher_is_better=True),
+    }
+    
+    policies = {
+        "mpc": mpc_policy,
+        "random": lambda env, obs, seed: env.action_space.sample(),
+    }
+    if os.path.exists(MODEL_PATH):
+        from app.agent.ppo_agent import PPOAgent
+        
+        agent = PPOAgent(MODEL_PATH)
+        agent.load()
+        policies["ppo"] = lambda env, obs, seed: agent.predict(obs)
+    
+    for name, policy in policies.items():
+        summary = run_episodes(policy, episodes)
+        results[f"{name}_success_rate"] = measurement(summary["success_rate"], "ratio", higher_is_better=True, episodes=episodes)
+        results[f"{name}_mean_return"] = measurement(summary["mean_return"], "reward", higher_is_better=True, mean_length=summary["mean_length"])
+    return results
@@ -0,0 +1,67 @@
+"""Payload conversion and JSON encoding cost for WebSocket messages."""
+
+import json
+
+import numpy as np
+
+from app.rl_env.landing_env import LandingEnv
+from app.serialization import JSON_BACKEND, convert_to_json_serializable, dumps, dumps_str
+from app.workers.protocol import HEADER, MessageType, encode_frame, pack_state, unpack_state
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+
+def sample_episode(seed: int = 0):
+    """Run one episode with a fixed hover-ish policy and return (env, final info)"""
+    env = LandingEnv()
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    while True:
+        action = np.array([0.9, rng.uniform(-0.2, 0.2)], dtype=np.float32)
+        _, _, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            return env, info
+
+
+def send_json_encode(message) -> str:
+    """The encoding Starlette's WebSocket.send_json performs"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+@benchmark("serialization")
+def payloads(ctx: BenchContext):
+    env, info = sample_episode()
+    state_frame = {"type": "state", **env.get_state_dict()}
+    result = {
+        "type": "result",
+        "success": np.bool_(info["success"]),
+        "fuel_used": np.float64(info["fuel_used"]),
+        "landing_accuracy": 0.5,
+    }
+    trajectory = info["trajectory"]
+    # A long stored trajectory, as returned by trajectory/replay responses
+    large_trajectory = (trajectory * (2000 // len(trajectory) + 1))[:2000]
+    observations = np.random.default_rng(0).normal(size=(2000, 7)).astype(np.float32)
+
+    results = {
+        # Two-pass path: convert numpy types, then encode with the stdlib
+        "convert_result": timing(time_per_op(lambda: convert_to_json_serializable(result))),
+        "convert_trajectory": timing(time_per_op(lambda: convert_to_json_serializable(trajectory)), steps=len(trajectory)),
+        "encode_state_frame": timing(time_per_op(lambda: send_json_encode(state_frame))),
+        "encode_trajectory": timing(time_per_op(lambda: send_json_encode(trajectory)), steps=len(trajectory)),
+        "encode_large_trajectory": timing(time_per_op(lambda: send_json_encode(large_trajectory)), steps=len(large_trajectory)),
+        # Single-pass numpy-aware encoder used by the app
+        "fast_state_frame": timing(time_per_op(lambda: dumps_str(state_frame)), backend=JSON_BACKEND),
+        "fast_result": timing(time_per_op(lambda: dumps_str(result)), backend=JSON_BACKEND),
+        "fast_trajectory": timing(time_per_op(lambda: dumps(trajectory)), steps=len(trajectory), backend=JSON_BACKEND),
+        "fast_large_trajectory": timing(time_per_op(lambda: dumps(large_trajectory)), steps=len(large_trajectory), backend=JSON_BACKEND),
+        "fast_numpy_array": timing(time_per_op(lambda: dumps({"observations": observations})), shape=list(observations.shape), backend=JSON_BACKEND),
+    }
+    # Packed state frames relayed from simulation workers
+    state = env.get_state_dict()
+    worker_frame = encode_frame(MessageType.STATE, 1, pack_state(state, False))
+    results["worker_state_frame"] = timing(time_per_op(lambda: encode_frame(MessageType.STATE, 1, pack_state(state, False))))
+    results["worker_state_unpack"] = timing(time_per_op(lambda: unpack_state(worker_frame[HEADER.size:])))
+    results["worker_state_frame_bytes"] = measurement(len(worker_frame), "bytes")
+    results["state_frame_bytes"] = measurement(len(send_json_encode(state_frame).encode()), "bytes")
+    results["trajectory_bytes"] = measurement(len(send_json_encode(trajectory).encode()), "bytes", steps=len(trajectory))
+    return results
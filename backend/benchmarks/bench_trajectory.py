@@ -0,0 +1,53 @@
+"""Trajectory simplification and seed + actions storage: cost and how much they shrink stored episodes."""
+
+import numpy as np
+
+from app.replay import pack_actions, resimulate, unpack_actions
+from app.rl_env.landing_env import LandingEnv
+from app.serialization import dumps
+from app.trajectory import MODES, simplify_trajectory
+from benchmarks.harness import BenchContext, benchmark, measurement, time_per_op, timing
+
+
+def smooth_episode(seed: int = 0):
+    """Trajectory of a constant-thrust descent, the nearly linear case simplification targets"""
+    env = LandingEnv()
+    env.reset(seed=seed)
+    action = np.array([0.95, 0.05], dtype=np.float32)
+    while True:
+        _, _, terminated, truncated, info = env.step(action)
+        if terminated or truncated:
+            return info["trajectory"]
+
+
+@benchmark("trajectory")
+def simplification(ctx: BenchContext):
+    trajectory = smooth_episode()
+    # A long episode, as a slow descent from the top of the world would produce
+    long_trajectory = (trajectory * (2000 // len(trajectory) + 1))[:2000]
+    for i, step in enumerate(long_trajectory):
+        long_trajectory[i] = {**step, "state": {**step["state"], "time": i * 0.1}}
+    full_bytes = len(dumps(trajectory))
+    
+    results = {}
+    for mode in MODES:
+        stored = simplify_trajectory(trajectory, mode)
+        results[f"{mode}_episode"] = timing(time_per_op(lambda: simplify_trajectory(trajectory, mode)), steps=len(trajectory))
+        results[f"{mode}_compression"] = measurement(stored.compression_ratio, "x", higher_is_better=True, error_bound=stored.error_bound)
+        results[f"{mode}_bytes"] = measurement(len(dumps(stored.steps)), "bytes", full_bytes=full_bytes)
+    results["simplify_long_episode"] = timing(time_per_op(lambda: simplify_trajectory(long_trajectory, "simplify")), steps=len(long_trajectory))
+    return results
+
+
+@benchmark("trajectory")
+def resimulation(ctx: BenchContext):
+    trajectory = smooth_episode(seed=0)
+    actions = unpack_actions(pack_actions(trajectory))
+    stored_bytes = len(pack_actions(trajectory)) + 8  # plus seed and environment version
+    full_bytes = len(dumps(trajectory))
+    simplified_bytes = len(dumps(simplify_trajectory(trajectory, "simplify").steps))
+    return {
+        "actions_bytes": measurement(stored_bytes, "bytes", full_bytes=full_bytes, simplified_bytes=simplified_bytes),
+        "actions_compression": measurement(full_bytes / stored_bytes, "x", higher_is_better=True),
+        "resimulate_episode": timing(time_per_op(lambda: resimulate(0, actions)), steps=len(actions)),
+    }
@@ -0,0 +1,107 @@
+"""Registration, timing and baseline comparison helpers for the benchmark suite."""
+
+import gc
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+# Registered benchmarks in definition order: name -> (group, function)
+BENCHMARKS: Dict[str, "Benchmark"] = {}
+
+
+@dataclass
+class BenchContext:
+    """Options shared by every benchmark in a run"""
+    
+    quick: bool = False
+    db_rows: List[int] = field(default_factory=lambda: [10_000, 100_000])
+    tmp_dir: str = "."
+
+
+@dataclass
+class Benchmark:
+    name: str
+    group: str
+    func: Callable[[BenchContext], Dict[str, dict]]
+
+
+def benchmark(group: str):
+    """
+    Register a benchmark function.
+    
+    The function receives a BenchContext and returns a dict mapping result
+    names to result dicts built with `timing()` or `measurement()`.
+    """
+    def decorator(func):
+        BENCHMARKS[f"{group}.{func.__name__}"] = Benchmark(func.__name__, group, func)
+        return func
+    return decorator
+
+
+def time_per_op(func: Callable[[], object], repeat: int = 5, min_time: float = 0.2, number: Optional[int] = None) -> float:
+    """
+    Median wall time of one call to `func`, in seconds.
+    
+    The loop count is grown until one repetition takes at least `min_time`,
+    then `repeat` repetitions are timed with the garbage collector disabled.
+    """
+    if number is None:
+        number = 1
+        while True:
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            if time.perf_counter() - started >= min_time:
+                break
+            number *= 2
+    
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter() - started) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return statistics.median(samples)
+
+
+def timing(seconds: float, **extra) -> dict:
+    """Result for a latency measurement (lower is better)"""
+    return {"value": seconds, "unit": "s", "higher_is_better": False, **extra}
+
+
+def measurement(value: float, unit: str, higher_is_better: bool = False, **extra) -> dict:
+    """Result for a non-timing measurement such as bytes or a ratio"""
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better, **extra}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[dict]:
+    """
+    Compare results to a baseline and return one row per shared result.
+    
+    A row is a regression when the value moved in the wrong direction by
+    more than `threshold` (a fraction, e.g. 0.25 for 25%).
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or not base.get("value"):
+            continue
+        # abs() keeps the sign meaningful for negative values such as rewards
+        change = (result["value"] - base["value"]) / abs(base["value"])
+        worse = -change if result.get("higher_is_better") else change
+        rows.append({
+            "name": name,
+            "baseline": base["value"],
+            "current": result["value"],
+            "unit": result.get("unit", ""),
+            "change": change,
+            "regression": worse > threshold,
+        })
+    return rows
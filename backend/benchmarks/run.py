@@ -0,0 +1,138 @@
+"""
+Run the backend benchmark suite and compare against a checked-in baseline.
+
+Usage (from the backend directory):
+    python -m benchmarks.run                       # run everything, compare to baseline
+    python -m benchmarks.run --quick --only env    # subset, smaller workloads
+    python -m benchmarks.run --update-baseline     # overwrite benchmarks/baseline.json
+
+Exits with status 1 when any result regressed by more than --threshold.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import warnings
+from datetime import datetime, timezone
+
+from benchmarks.harness import BENCHMARKS, BenchContext, compare
+
+BENCHMARK_MODULES = [
+    "benchmarks.bench_env",
+    "benchmarks.bench_agent",
+    "benchmarks.bench_serialization",
+    "benchmarks.bench_db",
+    "benchmarks.bench_auth",
+    "benchmarks.bench_import",
+    "benchmarks.bench_trajectory",
+    "benchmarks.bench_compression",
+    "benchmarks.bench_mpc",
+    "benchmarks.bench_memory",
+]
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def machine_info() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def format_value(value: float, unit: str) -> str:
+    if unit == "s":
+        if value < 1e-3:
+            return f"{value * 1e6:.2f} us"
+        if value < 1.0:
+            return f"{value * 1e3:.2f} ms"
+        return f"{value:.3f} s"
+    return f"{value:,.2f} {unit}"
+
+
+def run(selected, ctx: BenchContext) -> dict:
+    results = {}
+    for key, bench in BENCHMARKS.items():
+        if selected and not any(key == s or key.startswith(s + ".") or bench.group == s for s in selected):
+            continue
+        print(f"running {key} ...", flush=True)
+        for name, result in bench.func(ctx).items():
+            full_name = f"{bench.group}.{name}"
+            results[full_name] = result
+            print(f"  {full_name:<40} {format_value(result['value'], result['unit']):>14}", flush=True)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Backend benchmark suite")
+    parser.add_argument("--only", action="append", default=[], help="group or benchmark name to run (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads for a fast smoke run")
+    parser.add_argument("--db-rows", default="10000,100000", help="comma-separated Episode table sizes")
+    parser.add_argument("--output", default="benchmark-results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline results to compare against")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_REGRESSION_THRESHOLD", "0.25")),
+                        help="allowed relative slowdown before a result counts as a regression")
+    parser.add_argument("--update-baseline", action="store_true", help="write results to the baseline file")
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings("ignore")
+    for module in BENCHMARK_MODULES:
+        importlib.import_module(module)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ctx = BenchContext(
+            quick=args.quick,
+            db_rows=[int(n) for n in args.db_rows.split(",") if n],
+            tmp_dir=tmp_dir,
+        )
+        results = run(args.only, ctx)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "machine": machine_info(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"\nresults written to {args.output}")
+
+    if args.update_baseline:
+        baseline = {"results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline["created_at"] = report["created_at"]
+        baseline["machine"] = report["machine"]
+        baseline["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"baseline updated at {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("no baseline found, skipping comparison")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    rows = compare(results, baseline.get("results", {}), args.threshold)
+    print(f"\ncomparison against {args.baseline} (threshold {args.threshold:.0%}):")
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"  {row['name']:<40} {format_value(row['baseline'], row['unit']):>14} -> "
+              f"{format_value(row['current'], row['unit']):>14} {row['change']:+7.1%}  {flag}")
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Headless load generator for the WebSocket simulation server.
+
+Signs up / signs in a set of synthetic users, opens concurrent
+`/ws/simulate` sessions with a mix of auto, mpc, manual and train modes, and
+reports connect latency, inter-frame latency, throughput, errors and
+disconnects. Used by `test_simulation.py --load`.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+MODES = ("auto", "mpc", "manual", "train")
+
+
+@dataclass
+class LoadConfig:
+    base_url: str = "http://localhost:8000"
+    users: int = 5
+    sessions: int = 20
+    mix: Dict[str, float] = field(default_factory=lambda: {"auto": 1.0})
+    duration: float = 30.0
+    manual_rate: float = 10.0  # actions per second in manual sessions
+    email_prefix: str = "loadgen"
+    password: str = "LoadGen1!"
+    ramp_up: float = 1.0  # seconds over which sessions are opened
+
+
+@dataclass
+class SessionStats:
+    mode: str
+    connect_ms: Optional[float] = None
+    frame_gaps_ms: List[float] = field(default_factory=list)
+    frames: int = 0
+    episodes: int = 0
+    errors: int = 0
+    disconnects: int = 0
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse "auto=2,manual=1" into normalized mode weights"""
+    weights = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        mode, _, weight = item.partition("=")
+        mode = mode.strip()
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {', '.join(MODES)}")
+        weights[mode] = float(weight) if weight else 1.0
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Mode mix must have a positive total weight")
+    return {mode: weight / total for mode, weight in weights.items()}
+
+
+def assign_modes(mix: Dict[str, float], sessions: int) -> List[str]:
+    """Split `sessions` across modes proportionally (largest remainder), interleaved"""
+    quotas = {mode: share * sessions for mode, share in mix.items()}
+    counts = {mode: int(quota) for mode, quota in quotas.items()}
+    remaining = sessions - sum(counts.values())
+    for mode in sorted(quotas, key=lambda m: quotas[m] - counts[m], reverse=True)[:remaining]:
+        counts[mode] += 1
+    modes = []
+    while len(modes) < sessions:
+        for mode in mix:
+            if counts[mode] > 0:
+                modes.append(mode)
+                counts[mode] -= 1
+    return modes
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def provision_users(config: LoadConfig) -> List[str]:
+    """Sign up (if needed) and sign in the synthetic users, returning their tokens"""
+    semaphore = asyncio.Semaphore(8)
+
+    async def provision(client: httpx.AsyncClient, index: int) -> Optional[str]:
+        email = f"{config.email_prefix}-{index}@example.com"
+        credentials = {"email": email, "password": config.password}
+        async with semaphore:
+            for _ in range(5):
+                await client.post("/auth/signup", json=credentials)
+                response = await client.post("/auth/signin", json=credentials)
+                if response.status_code == 200:
+                    return response.json()["token"]
+                if response.status_code != 503:
+                    break
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+        console.print(f"[red]Could not sign in {email}: {response.status_code} {response.text}[/red]")
+        return None
+
+    async with httpx.AsyncClient(base_url=config.base_url, timeout=30.0) as client:
+        tokens = await asyncio.gather(*(provision(client, i) for i in range(config.users)))
+    return [token for token in tokens if token]
+
+
+async def run_session(config: LoadConfig, token: str, mode: str, deadline: float) -> SessionStats:
+    """Drive one WebSocket session in `mode` until `deadline` (a perf_counter value)"""
+    stats = SessionStats(mode=mode)
+    ws_url = config.base_url.replace("http", "ws", 1) + "/ws/simulate"
+    headers = {"Authorization": f"Bearer {token}"}
+    finished_types = {"auto": "result", "mpc": "result", "manual": "result", "train": "training_complete"}[mode]
+
+    started = time.perf_counter()
+    try:
+        websocket = await websockets.connect(ws_url, additional_headers=headers, open_timeout=30)
+    except Exception:
+        stats.errors += 1
+        return stats
+    stats.connect_ms = (time.perf_counter() - started) * 1000.0
+
+    last_frame: Optional[float] = None
+    episode_done = asyncio.Event()
+
+    async def reader():
+        nonlocal last_frame
+        async for raw in websocket:
+            message = json.loads(raw)
+            message_type = message.get("type")
+            if message_type == "state":
+                now = time.perf_counter()
+                if last_frame is not None:
+                    stats.frame_gaps_ms.append((now - last_frame) * 1000.0)
+                last_frame = now
+                stats.frames += 1
+            elif message_type == "error":
+                stats.errors += 1
+            if message_type == finished_types:
+                stats.episodes += 1
+                last_frame = None
+                episode_done.set()
+
+    reader_task = asyncio.create_task(reader())
+    try:
+        while time.perf_counter() < deadline and not reader_task.done():
+            episode_done.clear()
+            await websocket.send(json.dumps({"type": "start", "mode": mode}))
+            if mode == "manual":
+                interval = 1.0 / config.manual_rate
+                while not episode_done.is_set() and time.perf_counter() < deadline and not reader_task.done():
+                    await websocket.send(json.dumps({"type": "action", "thrust": 0.6, "angle": 0.0}))
+                    await asyncio.sleep(interval)
+            else:
+                waiter = asyncio.create_task(episode_done.wait())
+                await asyncio.wait(
+                    [waiter, reader_task],
+                    timeout=max(deadline - time.perf_counter(), 0.0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                waiter.cancel()
+        # The server closing the connection before the deadline counts as a disconnect
+        if reader_task.done():
+            stats.disconnects += 1
+    except websockets.exceptions.ConnectionClosed:
+        stats.disconnects += 1
+    finally:
+        reader_task.cancel()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+    return stats
+
+
+def summarize(sessions: List[SessionStats], wall_seconds: float) -> Dict[str, dict]:
+    """Aggregate per-session stats by mode plus an overall row"""
+    groups: Dict[str, List[SessionStats]] = {"all": sessions}
+    for stats in sessions:
+        groups.setdefault(stats.mode, []).append(stats)
+
+    summary = {}
+    for name, group in groups.items():
+        connects = [s.connect_ms for s in group if s.connect_ms is not None]
+        gaps = [gap for s in group for gap in s.frame_gaps_ms]
+        frames = sum(s.frames for s in group)
+        summary[name] = {
+            "sessions": len(group),
+            "connect_ms_p50": percentile(connects, 50),
+            "connect_ms_p95": percentile(connects, 95),
+            "frame_gap_ms_mean": statistics.fmean(gaps) if gaps else 0.0,
+            "frame_gap_ms_p50": percentile(gaps, 50),
+            "frame_gap_ms_p95": percentile(gaps, 95),
+            "frame_gap_ms_p99": percentile(gaps, 99),
+            "frame_gap_ms_max": max(gaps, default=0.0),
+            "frames": frames,
+            "frames_per_sec": frames / wall_seconds if wall_seconds > 0 else 0.0,
+            "episodes": sum(s.episodes for s in group),
+            "errors": sum(s.errors for s in group),
+            "disconnects": sum(s.disconnects for s in group),
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, dict]):
+    table = Table(title="Load test summary (latencies in ms)")
+    columns = [
+        ("mode", None), ("sessions", "sessions"),
+        ("connect p50", "connect_ms_p50"), ("connect p95", "connect_ms_p95"),
+        ("gap p50", "frame_gap_ms_p50"), ("gap p95", "frame_gap_ms_p95"),
+        ("gap p99", "frame_gap_ms_p99"), ("gap max", "frame_gap_ms_max"),
+        ("frames/s", "frames_per_sec"), ("episodes", "episodes"),
+        ("errors", "errors"), ("disconnects", "disconnects"),
+    ]
+    for title, _ in columns:
+        table.add_column(title, justify="right")
+    for mode, row in summary.items():
+        cells = [mode]
+        for _, key in columns[1:]:
+            value = row[key]
+            cells.append(f"{value:.1f}" if isinstance(value, float) else str(value))
+        table.add_row(*cells)
+    console.print(table)
+
+
+async def run_load(config: LoadConfig) -> Dict[str, dict]:
+    """Provision users, run all sessions until the duration elapses and report"""
+    console.print(f"[cyan]Provisioning {config.users} users against {config.base_url}...[/cyan]")
+    tokens = await provision_users(config)
+    if not tokens:
+        raise RuntimeError("No synthetic user could sign in")
+
+    modes = assign_modes(config.mix, config.sessions)
+    console.print(f"[cyan]Opening {config.sessions} sessions for {config.duration:.0f}s "
+                  f"({', '.join(f'{m}={modes.count(m)}' for m in config.mix)})...[/cyan]")
+
+    started = time.perf_counter()
+    deadline = started + config.ramp_up + config.duration
+
+    async def delayed(index: int, mode: str):
+        await asyncio.sleep(config.ramp_up * index / max(config.sessions, 1))
+        return await run_session(config, tokens[index % len(tokens)], mode, deadline)
+
+    sessions = await asyncio.gather(*(delayed(i, mode) for i, mode in enumerate(modes)))
+    summary = summarize(sessions, time.perf_counter() - started)
+    print_summary(summary)
+    return summary
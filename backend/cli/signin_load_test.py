@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Load test checking that concurrent sign-ins do not stall live simulations.
+
+Keeps a manual-mode WebSocket session stepping at a fixed rate and measures
+the action -> state round-trip latency, first on an idle server and then
+while a burst of concurrent sign-ins is in flight.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+import httpx
+import websockets
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def ensure_user(client: httpx.AsyncClient, email: str, password: str) -> str:
+    """Sign up the test user if needed and return a JWT token."""
+    await client.post("/auth/signup", json={"email": email, "password": password})
+    response = await client.post("/auth/signin", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["token"]
+
+
+async def measure_frames(ws_url: str, token: str, duration: float, interval: float) -> List[float]:
+    """Step a manual session for `duration` seconds and return round-trip latencies in ms."""
+    latencies = []
+    states: asyncio.Queue = asyncio.Queue()
+    episode_over = asyncio.Event()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with websockets.connect(ws_url, additional_headers=headers) as websocket:
+        async def reader():
+            async for raw in websocket:
+                message = json.loads(raw)
+                if message.get("type") == "state":
+                    states.put_nowait(message)
+                elif message.get("type") == "result":
+                    episode_over.set()
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            episode_over.set()
+            deadline = time.perf_counter() + duration
+            while time.perf_counter() < deadline:
+                # Pausing first also lets a pending "result" arrive before the next action
+                await asyncio.sleep(interval)
+                if episode_over.is_set():
+                    episode_over.clear()
+                    await websocket.send(json.dumps({"type": "start", "mode": "manual"}))
+                    await states.get()  # initial state
+                sent_at = time.perf_counter()
+                await websocket.send(json.dumps({"type": "action", "thrust": 0.5, "angle": 0.0}))
+                try:
+                    await asyncio.wait_for(states.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    # The action raced the end of the episode and was ignored
+                    continue
+                latencies.append((time.perf_counter() - sent_at) * 1000.0)
+        finally:
+            reader_task.cancel()
+    return latencies
+
+
+async def signin_storm(client: httpx.AsyncClient, email: str, password: str, count: int) -> dict:
+    """Fire `count` concurrent sign-ins and tally response status codes."""
+    async def signin():
+        try:
+            response = await client.post("/auth/signin", json={"email": email, "password": password})
+            return response.status_code
+        except httpx.HTTPError:
+            return "error"
+
+    statuses = await asyncio.gather(*(signin() for _ in range(count)))
+    tally = {}
+    for status in statuses:
+        tally[status] = tally.get(status, 0) + 1
+    return tally
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="LoadTest1!")
+    parser.add_argument("--signins", type=int, default=100, help="concurrent sign-ins in the burst")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per phase")
+    parser.add_argument("--interval", type=float, default=0.02, help="seconds between manual actions")
+    args = parser.parse_args()
+
+    ws_url = args.base_url.replace("http", "ws", 1) + "/ws/simulate"
+    limits = httpx.Limits(max_connections=args.signins)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        token = await ensure_user(client, args.email, args.password)
+
+        console.print("[cyan]Measuring idle frame latency...[/cyan]")
+        idle = await measure_frames(ws_url, token, args.duration, args.interval)
+
+        console.print(f"[cyan]Measuring frame latency during {args.signins} concurrent sign-ins...[/cyan]")
+        storm_started = time.perf_counter()
+        storm_task = asyncio.create_task(signin_storm(client, args.email, args.password, args.signins))
+        loaded = await measure_frames(ws_url, token, args.duration, args.interval)
+        statuses = await storm_task
+        storm_seconds = time.perf_counter() - storm_started
+
+    table = Table(title="Action -> state round trip (ms)")
+    for column in ("phase", "frames", "mean", "p50", "p95", "p99", "max"):
+        table.add_column(column, justify="right")
+    for name, values in (("idle", idle), ("sign-in burst", loaded)):
+        table.add_row(
+            name,
+            str(len(values)),
+            f"{statistics.fmean(values):.2f}" if values else "-",
+            f"{percentile(values, 50):.2f}",
+            f"{percentile(values, 95):.2f}",
+            f"{percentile(values, 99):.2f}",
+            f"{max(values, default=0.0):.2f}",
+        )
+    console.print(table)
+    console.print(f"Sign-in statuses: {statuses} (burst finished after {storm_seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
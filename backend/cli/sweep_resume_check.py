@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Check that a killed hyperparameter sweep resumes without re-promoting rungs.
+
+Starts a tiny grid sweep (9 trials, eta 3) with `python -m app.agent.sweep`,
+kills its whole process group as soon as rung 0 has been promoted, reruns
+the same command and checks how many trials survived each rung. A correct
+resume stops 6 trials at rung 0 and 2 at rung 1, and completes 1.
+"""
+
+import argparse
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from rich.console import Console
+
+console = Console()
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nine trials that differ only in learning rate, with rollouts small enough to train in seconds
+SPACE = {
+    "learning_rate": [1e-4, 2e-4, 3e-4, 5e-4, 7e-4, 1e-3, 2e-3, 3e-3, 5e-3],
+    "n_steps": [64],
+    "batch_size": [32],
+    "n_epochs": [1],
+}
+ETA = 3
+
+
+def sweep_command(space_path: str, out_dir: str, workers: int) -> list:
+    return [
+        sys.executable, "-m", "app.agent.sweep",
+        "--space", space_path, "--mode", "grid",
+        "--min-timesteps", "64", "--max-timesteps", str(64 * ETA * ETA), "--eta", str(ETA),
+        "--eval-episodes", "2", "--workers", str(workers), "--out", out_dir,
+    ]
+
+
+def read_state(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, "trials.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def run_until_rung_promoted(command: list, out_dir: str, rung: int, timeout: float) -> bool:
+    """Run the sweep and kill it (pool processes included) once `rung` is promoted"""
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, start_new_session=True,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    try:
+        while time.monotonic() < deadline:
+            state = read_state(out_dir)
+            if state is not None and rung in state["config"].get("promoted_rungs", []):
+                return True
+            if process.poll() is not None:
+                return False
+            time.sleep(0.02)
+        return False
+    finally:
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a killed sweep resumes with the right survivors")
+    parser.add_argument("--workers", type=int, default=3, help="Concurrent trials")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Seconds to wait for each sweep run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        space_path = os.path.join(tmp, "space.json")
+        with open(space_path, "w") as f:
+            json.dump(SPACE, f)
+        out_dir = os.path.join(tmp, "sweep")
+        command = sweep_command(space_path, out_dir, args.workers)
+
+        console.print("Running the sweep until rung 0 is promoted, then killing it...")
+        if not run_until_rung_promoted(command, out_dir, 0, args.timeout):
+            console.print("[red]The sweep exited or timed out before promoting rung 0[/red]")
+            sys.exit(1)
+
+        console.print("Resuming the sweep...")
+        subprocess.run(command, cwd=BACKEND_DIR, check=True, timeout=args.timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        trials = read_state(out_dir)["trials"]
+
+    total = math.prod(len(values) for values in SPACE.values())
+    expected_stopped = {}
+    running = total
+    for rung in range(2):
+        survivors = math.ceil(running / ETA)
+        expected_stopped[rung] = running - survivors
+        running = survivors
+    stopped = {rung: sum(1 for t in trials if t.get("stopped_at_rung") == rung) for rung in expected_stopped}
+    completed = sum(1 for t in trials if t["status"] == "completed")
+
+    ok = stopped == expected_stopped and completed == running
+    for rung in expected_stopped:
+        console.print(f"Stopped at rung {rung}: {stopped[rung]} (expected {expected_stopped[rung]})")
+    console.print(f"Completed: {completed} (expected {running})")
+    if not ok:
+        console.print("[red]Resume changed the number of survivors[/red]")
+        sys.exit(1)
+    console.print("[green]Resume kept the survivors of every rung[/green]")
+
+
+if __name__ == "__main__":
+    main()
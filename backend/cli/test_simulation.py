@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
 Interactive CLI tool for testing the WebSocket simulation server.
+
+Run without arguments for the interactive prompts, or with --load for a
+headless multi-connection load test (see --help).
 """
 
+import argparse
 import asyncio
 import json
+import os
+import sys
 import websockets
 from datetime import datetime
 from typing import Optional
@@ -15,15 +21,22 @@ from rich.json import JSON
 from rich.panel import Panel
 from rich.text import Text
 
+# The load generator lives next to this script; import it whatever the working directory
+CLI_DIR = os.path.dirname(os.path.abspath(__file__))
+if CLI_DIR not in sys.path:
+    sys.path.insert(0, CLI_DIR)
+
 console = Console()
 
+DEFAULT_BASE_URL = "http://localhost:8000"
+
 
-async def authenticate(email: str, password: str) -> Optional[str]:
+async def authenticate(email: str, password: str, base_url: str = DEFAULT_BASE_URL) -> Optional[str]:
     """Authenticate user with email and password, get JWT token."""
     try:
         async with httpx.AsyncClient() as client:
             response = await client.post(
-                "http://localhost:8000/auth/signin",
+                f"{base_url}/auth/signin",
                 json={"email": email, "password": password},
                 timeout=10.0
             )
@@ -38,7 +51,7 @@ async def authenticate(email: str, password: str) -> Optional[str]:
                 console.print(f"[red]Authentication failed: {response.status_code} - {response.text}[/red]")
                 return None
     except httpx.ConnectError:
-        console.print("[red]Error: Could not connect to server. Is it running on http://localhost:8000?[/red]")
+        console.print(f"[red]Error: Could not connect to server. Is it running on {base_url}?[/red]")
         return None
     except Exception as e:
         console.print(f"[red]Authentication error: {str(e)}[/red]")
@@ -79,7 +92,7 @@ def display_message(message: dict, message_num: int):
 
 
 async def run_auto_mode(websocket, mode: str):
-    """Run auto or train mode simulation."""
+    """Run auto, mpc or train mode simulation."""
     await websocket.send(json.dumps({"type": "start", "mode": mode}))
     message_num = 0
     
@@ -185,7 +198,7 @@ async def run_manual_mode(websocket):
         console.print(f"\n[red]Error: {str(e)}[/red]")
 
 
-async def main():
+async def main(base_url: str = DEFAULT_BASE_URL):
     """Main CLI entry point."""
     console.print("[bold cyan]WebSocket Simulation Test CLI[/bold cyan]\n")
     
@@ -209,7 +222,7 @@ async def main():
     
     # Authenticate
     console.print(f"\n[dim]Authenticating as {email}...[/dim]")
-    token = await authenticate(email, password)
+    token = await authenticate(email, password, base_url)
     
     if not token:
         console.print("[red]Authentication failed. Exiting.[/red]")
@@ -223,6 +236,7 @@ async def main():
             "Select simulation mode:",
             choices=[
                 questionary.Choice("Auto Mode (agent runs automatically)", "auto"),
+                questionary.Choice("MPC Mode (model-predictive autopilot, no trained model needed)", "mpc"),
                 questionary.Choice("Train Mode (10 training episodes)", "train"),
                 questionary.Choice("Manual Mode (you control thrust and angle)", "manual"),
             ]
@@ -237,7 +251,7 @@ async def main():
     
     # Connect to WebSocket
     try:
-        uri = "ws://localhost:8000/ws/simulate"
+        uri = base_url.replace("http", "ws", 1) + "/ws/simulate"
         headers = {"Authorization": f"Bearer {token}"}
         
         async with websockets.connect(uri, additional_headers=headers) as websocket:
@@ -265,6 +279,45 @@ async def main():
     console.print("\n[dim]Goodbye![/dim]")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Test the WebSocket simulation server.")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="backend URL (default: %(default)s)")
+    load = parser.add_argument_group("headless load test")
+    load.add_argument("--load", action="store_true", help="run a non-interactive load test instead of the prompts")
+    load.add_argument("--users", type=int, default=5, help="synthetic users to sign up / sign in")
+    load.add_argument("--sessions", type=int, default=20, help="concurrent WebSocket sessions")
+    load.add_argument("--mix", default="auto=1", help='mode weights, e.g. "auto=2,manual=1,train=1"')
+    load.add_argument("--duration", type=float, default=30.0, help="seconds to keep sessions running")
+    load.add_argument("--manual-rate", type=float, default=10.0, help="actions per second in manual sessions")
+    load.add_argument("--ramp-up", type=float, default=1.0, help="seconds over which sessions are opened")
+    load.add_argument("--json", dest="json_path", help="also write the summary to this JSON file")
+    return parser.parse_args()
+
+
+async def run_load_test(args):
+    """Run the headless load generator with the CLI arguments."""
+    from load_generator import LoadConfig, parse_mix, run_load
+
+    config = LoadConfig(
+        base_url=args.base_url,
+        users=args.users,
+        sessions=args.sessions,
+        mix=parse_mix(args.mix),
+        duration=args.duration,
+        manual_rate=args.manual_rate,
+        ramp_up=args.ramp_up,
+    )
+    summary = await run_load(config)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        console.print(f"[dim]Summary written to {args.json_path}[/dim]")
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.load:
+        asyncio.run(run_load_test(args))
+    else:
+        asyncio.run(main(args.base_url))
 